@@ -0,0 +1,59 @@
+from typing import Any, List, Tuple, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+
+from config import settings
+from db_types import canonical_key
+from models import BatchResult
+
+def check_batch_size(rows: List[Any]) -> None:
+    """Rejects batches larger than the configured maximum."""
+    if len(rows) > settings.batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.batch_max_size} rows",
+        )
+
+def validate_rows(model: Type[BaseModel], rows: List[Any]) -> Tuple[List[Tuple[int, BaseModel]], List[BatchResult]]:
+    """Validates each row on its own so one bad row does not reject the batch.
+
+    Returns the (index, payload) pairs that passed and a 422 result per row that failed.
+    """
+    check_batch_size(rows)
+    valid, failed = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, model.model_validate(row)))
+        except ValidationError as e:
+            failed.append(BatchResult(index=index, status=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors(include_url=False, include_context=False)))
+    return valid, failed
+
+def reject_duplicate_ids(valid: List[Tuple[int, BaseModel]], failed: List[BatchResult]) -> List[Tuple[int, BaseModel]]:
+    """Keeps the first row for each id and reports a 409 for every later row repeating it.
+
+    Ids are compared in canonical form, so differently written forms of one UUID count as repeats.
+    Returns the rows to write; the conflicts are appended to ``failed``.
+    """
+    seen, unique = set(), []
+    for index, row in valid:
+        key = canonical_key(row.id)
+        if key in seen:
+            failed.append(BatchResult(index=index, id=row.id, status=status.HTTP_409_CONFLICT, detail="Duplicate id in batch"))
+        else:
+            seen.add(key)
+            unique.append((index, row))
+    return unique
+
+def results_by_id(indexed_ids: List[Tuple[int, str]], found_ids, found_status: int, failed: List[BatchResult]) -> List[BatchResult]:
+    """Builds per-row results, reporting 404 for ids the service did not find.
+
+    ``found_ids`` are keys as read from the database; requested ids are matched in canonical form.
+    """
+    results = list(failed)
+    for index, row_id in indexed_ids:
+        if canonical_key(row_id) in found_ids:
+            results.append(BatchResult(index=index, id=row_id, status=found_status))
+        else:
+            results.append(BatchResult(index=index, id=row_id, status=status.HTTP_404_NOT_FOUND, detail="Not found"))
+    return sorted(results, key=lambda result: result.index)
@@ -0,0 +1,65 @@
+"""Bulk import throughput into a fresh SQLite file, per format and with or without search indexing.
+
+    python -m benchmarks.imports --rows 200000 --output imports.json
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+
+import orjson
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from base import Base
+from benchmarks import seed
+from imports import import_records, open_records
+
+FIELDS = ("name", "description", "price", "tax")
+
+def write_source(directory: str, import_format: str, rows: int) -> str:
+    path = os.path.join(directory, f"items.{import_format}")
+    records = ({field: row[field] for field in FIELDS} for row in map(seed.item_row, range(rows)))
+    if import_format == "ndjson":
+        with open(path, "wb") as source:
+            source.writelines(orjson.dumps(record) + b"\n" for record in records)
+    else:
+        with open(path, "w", newline="") as source:
+            writer = csv.DictWriter(source, FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    return path
+
+def measure(directory: str, path: str, import_format: str, index_search: bool) -> dict:
+    database_path = os.path.join(directory, "import.db")
+    if os.path.exists(database_path):
+        os.remove(database_path)
+    engine = create_engine(f"sqlite:///{database_path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db, open(path, "rb") as source:
+        report = import_records(db, "items", open_records(source, import_format), index_search=index_search)
+    engine.dispose()
+    assert report.failed == 0
+    return {"rows": report.imported, "seconds": round(report.seconds, 2), "rows_per_second": round(report.rows_per_second)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for import_format in ("ndjson", "csv"):
+            path = write_source(directory, import_format, args.rows)
+            for index_search in (False, True):
+                name = f"{import_format}{'' if index_search else ' (no search index)'}"
+                results[name] = measure(directory, path, import_format, index_search)
+                print(f"{name:28}{results[name]['rows_per_second']:>10,} rows/s")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"rows": args.rows, "results": results}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Insert throughput and index size with random VARCHAR(36) keys versus UUIDv7 BINARY(16) keys.
+
+    python -m benchmarks.keys --rows 200000 --output keys.json
+
+Each key scheme gets its own SQLite file holding a posts table, keyed and
+indexed on (created_at, id) like the application tables, and a post_tags
+association table whose composite primary key and tag index hold two keys.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, String, create_engine, text
+from sqlalchemy.orm import Session, declarative_base
+
+from db_types import UUIDKey, new_id
+from rows import bulk_insert
+
+SCHEMES = {
+    "uuid4 VARCHAR(36)": (lambda: String(36), lambda: str(uuid.uuid4())),
+    "uuid4 BINARY(16)": (UUIDKey, lambda: str(uuid.uuid4())),
+    "uuid7 BINARY(16)": (UUIDKey, new_id),
+}
+TAGS = 200
+TAGS_PER_POST = 3
+CHUNK_SIZE = 1000
+
+def models(key_type: Callable):
+    """A fresh posts/post_tags pair of mapped classes keyed by the given column type."""
+    Base = declarative_base()
+
+    class Post(Base):
+        __tablename__ = "posts"
+        __table_args__ = (Index("ix_posts_created_at_id", "created_at", "id"),)
+
+        id = Column(key_type(), primary_key=True)
+        title = Column(String(255), nullable=False)
+        created_at = Column(DateTime)
+
+    class PostTag(Base):
+        __tablename__ = "post_tags"
+        __table_args__ = (Index("ix_post_tags_tag_id", "tag_id"),)
+
+        post_id = Column(key_type(), ForeignKey("posts.id"), primary_key=True)
+        tag_id = Column(key_type(), primary_key=True)
+
+    return Base.metadata, Post, PostTag
+
+def measure(path: str, key_type: Callable, make_key: Callable[[], str], rows: int) -> Dict:
+    """Inserts rows posts with their tags, CHUNK_SIZE per transaction, then reads page sizes from dbstat."""
+    engine = create_engine(f"sqlite:///{path}")
+    metadata, Post, PostTag = models(key_type)
+    metadata.create_all(engine)
+    tag_ids = [make_key() for _ in range(TAGS)]
+    chunk_rates = []
+    with Session(engine) as db:
+        for start in range(0, rows, CHUNK_SIZE):
+            started_at = time.perf_counter()
+            chunk = [{"id": make_key(), "title": f"Post {n}"} for n in range(start, min(start + CHUNK_SIZE, rows))]
+            bulk_insert(db, Post, chunk, created_at=datetime.now())
+            bulk_insert(db, PostTag, [
+                {"post_id": post["id"], "tag_id": tag_ids[(start + offset * 7 + tag) % TAGS]}
+                for offset, post in enumerate(chunk) for tag in range(TAGS_PER_POST)
+            ])
+            db.commit()
+            chunk_rates.append(len(chunk) / (time.perf_counter() - started_at))
+        sizes = dict(db.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+    engine.dispose()
+    index_bytes = sum(size for name, size in sizes.items() if name.startswith(("ix_", "sqlite_autoindex_")))
+    tail = chunk_rates[-max(len(chunk_rates) // 10, 1):]
+    return {
+        "rows_per_second": round(rows / sum(CHUNK_SIZE / rate for rate in chunk_rates)),
+        "last_10pct_rows_per_second": round(sum(tail) / len(tail)),
+        "index_mib": round(index_bytes / 2**20, 1),
+        "total_mib": round(sum(sizes.values()) / 2**20, 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'':20}{'rows/s':>10}{'last 10%':>10}{'indexes':>12}{'total':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (key_type, make_key) in SCHEMES.items():
+            path = os.path.join(directory, f"{name.split()[0]}-{len(results)}.db")
+            result = results[name] = measure(path, key_type, make_key, args.rows)
+            print(
+                f"{name:20}{result['rows_per_second']:>10,}{result['last_10pct_rows_per_second']:>10,}"
+                f"{result['index_mib']:>8} MiB{result['total_mib']:>8} MiB"
+            )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"rows": args.rows, "results": results}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
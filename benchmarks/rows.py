@@ -0,0 +1,69 @@
+"""Memory and time of one 1,000-row page read as ORM instances versus lightweight rows.
+
+    python -m benchmarks.rows --output rows.json
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks import seed
+from services import blog_post_service, item_service, todo_service, user_service
+
+PAIRS = {
+    "todos": (todo_service.get_todos, todo_service.get_todo_rows),
+    "items": (item_service.get_items, item_service.get_item_rows),
+    "users": (user_service.get_users, user_service.get_user_rows),
+    "blog_posts": (blog_post_service.get_blog_posts, blog_post_service.get_blog_post_rows),
+}
+
+def measure(session_factory, read: Callable, page_size: int, repeat: int) -> Dict[str, Any]:
+    """Peak and retained allocations of reading one page, plus the best time over repeat runs."""
+    seconds = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            started_at = time.perf_counter()
+            read(db, limit=page_size, cursor="")
+            seconds.append(time.perf_counter() - started_at)
+    with session_factory() as db:
+        gc.collect()
+        tracemalloc.start()
+        page = read(db, limit=page_size, cursor="")
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(page) == page_size
+    return {"peak_kib": round(peak / 1024), "retained_kib": round(retained / 1024), "ms": round(min(seconds) * 1000, 2)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    volumes = {**seed.scaled_volumes(0.01), "users": args.page_size}
+    seed.seed_database(engine, volumes, password_hash="x" * 60)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    results = {}
+    print(f"{'':12}{'ORM peak':>12}{'rows peak':>12}{'ORM kept':>12}{'rows kept':>12}{'ORM ms':>10}{'rows ms':>10}")
+    for name, (orm_read, row_read) in PAIRS.items():
+        orm, rows = measure(session_factory, orm_read, args.page_size, args.repeat), measure(session_factory, row_read, args.page_size, args.repeat)
+        results[name] = {"orm": orm, "rows": rows}
+        print(
+            f"{name:12}{orm['peak_kib']:>8} KiB{rows['peak_kib']:>8} KiB{orm['retained_kib']:>8} KiB{rows['retained_kib']:>8} KiB"
+            f"{orm['ms']:>10}{rows['ms']:>10}"
+        )
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"page_size": args.page_size, "results": results}, output, indent=2)
+
+if __name__ == "__main__":
+    main()
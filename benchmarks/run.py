@@ -0,0 +1,335 @@
+"""Throughput and latency benchmarks for the API, served in-process.
+
+    python -m benchmarks.run --scale 0.01 --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.1
+
+The app runs on an httpx ASGI transport against a seeded database (an SQLite
+file by default, or any URL passed with --database-url, e.g. a local MySQL).
+Nothing leaves the machine. Seeding only happens on an empty database or with
+--seed; reuse a database only with the --scale it was seeded at.
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+from PIL import Image as PILImage
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks import seed
+from config import settings
+from database import get_db
+from main import app
+from models import Item, Todo
+from security import get_password_hash
+from services import category_service, image_service, tag_service
+from storage import LocalStorageBackend
+
+FAMILIES = ("list", "detail", "create", "update", "delete", "login", "upload")
+REQUEST_ID_HEADER = "x-benchmark-request"
+# Walks the seeded rows in a scattered but repeatable order
+STRIDE = 7919
+# Latency changes smaller than this are treated as noise when comparing
+LATENCY_NOISE_MS = 0.5
+
+class Scenario(NamedTuple):
+    name: str
+    family: str
+    # Keyword arguments for httpx.AsyncClient.request for the k-th request
+    build: Callable[[int], Dict[str, Any]]
+    expected_status: int = 200
+    # Called with the number of requests before timing starts, e.g. to insert rows to delete
+    prepare: Optional[Callable[[int], None]] = None
+
+def _response_timer(asgi_app, finished: Dict[str, float]):
+    """Records when each response body is complete, before any background task runs."""
+
+    async def timed_app(scope, receive, send):
+        request_id = dict(scope.get("headers", [])).get(REQUEST_ID_HEADER.encode(), b"").decode()
+
+        async def send_timed(message):
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished[request_id] = time.perf_counter()
+            await send(message)
+
+        await asgi_app(scope, receive, send_timed)
+
+    return timed_app
+
+def make_png(k: int) -> bytes:
+    """A 1024x768 gradient that is unique per k, so uploads are not deduplicated."""
+    image = PILImage.linear_gradient("L").resize((1024, 768)).convert("RGB")
+    image.putpixel((0, 0), (k & 0xFF, (k >> 8) & 0xFF, (k >> 16) & 0xFF))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def build_scenarios(engine, volumes: Dict[str, int], auth: Dict[str, str]) -> List[Scenario]:
+    def scattered(kind: str, k: int) -> str:
+        return seed.seeded_id(kind, k * STRIDE % volumes[kind + "s"])
+
+    owner_id = seed.seeded_id("user", 0)
+    fresh: Dict[str, List[str]] = {}
+
+    def prepare_rows(key: str, model, row):
+        def prepare(count: int):
+            fresh[key] = [str(uuid.uuid4()) for _ in range(count)]
+            seed.insert_rows(engine, model, (row(k, id=row_id) for k, row_id in enumerate(fresh[key])))
+        return prepare
+
+    def prepare_posts(key: str):
+        def prepare(count: int):
+            fresh[key] = [str(uuid.uuid4()) for _ in range(count)]
+            rows = [seed.blog_post_row(k, volumes, id=row_id, author_id=owner_id) for k, row_id in enumerate(fresh[key])]
+            seed.insert_blog_posts(engine, rows, volumes)
+        return prepare
+
+    images: List[bytes] = []
+
+    def prepare_images(count: int):
+        images[:] = [make_png(int(time.time()) + k) for k in range(count)]
+
+    post_body = lambda k: {
+        "title": f"Benchmark post {k}", "content": seed.POST_CONTENT, "category_id": seed.seeded_id("category", k % volumes["categories"]),
+        "tag_ids": seed.post_tag_ids(k, volumes), "published": True,
+    }
+    expand = "author,category,tags"
+    return [
+        Scenario("todos.list", "list", lambda k: {"method": "GET", "url": "/api/v1/todos", "params": {"limit": 50}}),
+        Scenario("items.list", "list", lambda k: {"method": "GET", "url": "/api/v1/items", "params": {"limit": 50}}),
+        Scenario("blog_posts.list", "list", lambda k: {"method": "GET", "url": "/api/v1/blog_posts", "params": {"limit": 20, "expand": expand}}),
+        Scenario("categories.list", "list", lambda k: {"method": "GET", "url": "/api/v1/categories"}),
+        Scenario("tags.list", "list", lambda k: {"method": "GET", "url": "/api/v1/tags"}),
+        Scenario("users.list", "list", lambda k: {"method": "GET", "url": "/api/v1/users", "params": {"limit": 50}, "headers": auth}),
+        Scenario("todos.detail", "detail", lambda k: {"method": "GET", "url": f"/api/v1/todos/{scattered('todo', k)}"}),
+        Scenario("items.detail", "detail", lambda k: {"method": "GET", "url": f"/api/v1/items/{scattered('item', k)}"}),
+        Scenario("blog_posts.detail", "detail", lambda k: {"method": "GET", "url": f"/api/v1/blog_posts/{scattered('blog_post', k)}", "params": {"expand": expand}}),
+        Scenario("users.detail", "detail", lambda k: {"method": "GET", "url": f"/api/v1/users/{scattered('user', k)}", "headers": auth}),
+        Scenario("todos.create", "create", lambda k: {"method": "POST", "url": "/api/v1/todos", "json": {"title": f"New todo {k}"}}, 201),
+        Scenario("items.create", "create", lambda k: {"method": "POST", "url": "/api/v1/items", "json": {"name": f"New item {k}", "price": 10}}, 201),
+        Scenario("blog_posts.create", "create", lambda k: {"method": "POST", "url": "/api/v1/blog_posts", "json": post_body(k), "headers": auth}, 201),
+        Scenario("todos.update", "update", lambda k: {"method": "PUT", "url": f"/api/v1/todos/{scattered('todo', k)}", "json": {"completed": k % 2 == 0}}),
+        Scenario("items.update", "update", lambda k: {"method": "PUT", "url": f"/api/v1/items/{scattered('item', k)}", "json": {"name": f"Renamed item {k}", "price": 12}}),
+        Scenario(
+            "blog_posts.update", "update",
+            lambda k: {"method": "PUT", "url": f"/api/v1/blog_posts/{fresh['blog_posts.update'][k]}", "json": post_body(k + 1), "headers": auth},
+            prepare=prepare_posts("blog_posts.update"),
+        ),
+        Scenario(
+            "todos.delete", "delete", lambda k: {"method": "DELETE", "url": f"/api/v1/todos/{fresh['todos.delete'][k]}"}, 204,
+            prepare=prepare_rows("todos.delete", Todo, seed.todo_row),
+        ),
+        Scenario(
+            "items.delete", "delete", lambda k: {"method": "DELETE", "url": f"/api/v1/items/{fresh['items.delete'][k]}"}, 204,
+            prepare=prepare_rows("items.delete", Item, seed.item_row),
+        ),
+        Scenario(
+            "blog_posts.delete", "delete",
+            lambda k: {"method": "DELETE", "url": f"/api/v1/blog_posts/{fresh['blog_posts.delete'][k]}", "headers": auth}, 204,
+            prepare=prepare_posts("blog_posts.delete"),
+        ),
+        Scenario(
+            "users.login", "login",
+            lambda k: {"method": "POST", "url": "/api/v1/users/login", "data": {"username": f"user{k % volumes['users']:07d}", "password": seed.PASSWORD}},
+        ),
+        Scenario(
+            "images.upload", "upload",
+            lambda k: {"method": "POST", "url": "/api/v1/images/upload", "files": {"file": (f"photo-{k}.png", images[k], "image/png")}, "headers": auth},
+            201, prepare=prepare_images,
+        ),
+    ]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+async def measure(client: httpx.AsyncClient, scenario: Scenario, finished: Dict[str, float], requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    if scenario.prepare:
+        scenario.prepare(warmup + requests)
+    latencies: List[float] = []
+    errors = 0
+
+    async def send(k: int) -> Optional[float]:
+        request_id = f"{scenario.name}-{k}"
+        kwargs = scenario.build(k)
+        headers = {**kwargs.pop("headers", {}), REQUEST_ID_HEADER: request_id}
+        started_at = time.perf_counter()
+        response = await client.request(headers=headers, **kwargs)
+        ended_at = finished.pop(request_id, time.perf_counter())
+        return ended_at - started_at if response.status_code == scenario.expected_status else None
+
+    for k in range(warmup):
+        await send(k)
+    counter = itertools.count(warmup)
+
+    async def worker():
+        nonlocal errors
+        for k in counter:
+            if k >= warmup + requests:
+                return
+            latency = await send(k)
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    latencies.sort()
+    milliseconds = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "family": scenario.family,
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "latency_ms": {
+            "mean": milliseconds(sum(latencies) / len(latencies)) if latencies else None,
+            **{name: milliseconds(percentile(latencies, fraction)) if latencies else None for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+            "max": milliseconds(latencies[-1]) if latencies else None,
+        },
+    }
+
+def _session_dependency(engine, use_async: bool):
+    """A get_db override on the benchmark database, plus the async engine behind it if any."""
+    if not use_async:
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def get_benchmark_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        return get_benchmark_db, None
+    backend = engine.url.get_backend_name()
+    driver = "sqlite+aiosqlite" if backend == "sqlite" else f"{backend}+{settings.mysql_async_driver}"
+    async_engine = create_async_engine(engine.url.set(drivername=driver))
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_benchmark_db():
+        async with session_factory() as db:
+            yield db
+
+    return get_async_benchmark_db, async_engine
+
+async def run_benchmarks(
+    database_url: str, scale: float = 1.0, families=FAMILIES, requests: int = 200, concurrency: int = 8,
+    warmup: int = 20, use_async: bool = False, reseed: bool = False,
+) -> Dict[str, Any]:
+    volumes = seed.scaled_volumes(scale)
+    # Sync sessions are opened in the threadpool but queried on the event loop thread
+    engine = create_engine(database_url, connect_args={"check_same_thread": False} if database_url.startswith("sqlite") else {})
+    if reseed or not seed.is_seeded(engine):
+        print(f"Seeding {database_url} with {volumes}...", file=sys.stderr)
+        seed.seed_database(engine, volumes, get_password_hash(seed.PASSWORD))
+    category_service.category_snapshot.invalidate()
+    tag_service.tag_snapshot.invalidate()
+
+    dependency, async_engine = _session_dependency(engine, use_async)
+    finished: Dict[str, float] = {}
+    previous_storage, previous_sessions = image_service.storage, image_service.UPLOAD_SESSION_DIRECTORY
+    app.dependency_overrides[get_db] = dependency
+    results: Dict[str, Any] = {}
+    try:
+        with tempfile.TemporaryDirectory() as storage_root:
+            image_service.storage = LocalStorageBackend(f"{storage_root}/images", base_url="/static/images")
+            image_service.UPLOAD_SESSION_DIRECTORY = f"{storage_root}/sessions"
+            transport = httpx.ASGITransport(app=_response_timer(app, finished))
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                login = await client.post("/api/v1/users/login", data={"username": "user0000000", "password": seed.PASSWORD})
+                login.raise_for_status()
+                auth = {"Authorization": f"Bearer {login.json()['access_token']}"}
+                for scenario in build_scenarios(engine, volumes, auth):
+                    if scenario.family in families:
+                        results[scenario.name] = await measure(client, scenario, finished, requests, concurrency, warmup)
+                        print(f"{scenario.name:20} {results[scenario.name]['requests_per_second']:>9} req/s  p95 {results[scenario.name]['latency_ms']['p95']} ms", file=sys.stderr)
+    finally:
+        image_service.storage, image_service.UPLOAD_SESSION_DIRECTORY = previous_storage, previous_sessions
+        app.dependency_overrides.pop(get_db, None)
+        engine.dispose()
+        if async_engine is not None:
+            await async_engine.dispose()
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "database": make_url(database_url).get_backend_name(),
+            "async_db": use_async,
+            "scale": scale,
+            "volumes": volumes,
+            "requests": requests,
+            "concurrency": concurrency,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+        },
+        "scenarios": results,
+    }
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Lists the scenarios whose throughput dropped or p95/p99 latency grew by more than the threshold."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["requests_per_second"] < base["requests_per_second"] * (1 - threshold):
+            regressions.append(f"{name}: {base['requests_per_second']} -> {result['requests_per_second']} req/s")
+        for key in ("p95", "p99"):
+            old, new = base["latency_ms"][key], result["latency_ms"][key]
+            if old is not None and new is not None and new > old * (1 + threshold) and new - old > LATENCY_NOISE_MS:
+                regressions.append(f"{name}: {key} {old} -> {new} ms")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {base['errors']} -> {result['errors']} errors")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///benchmarks/benchmark.db")
+    parser.add_argument("--scale", type=float, default=1.0, help="fraction of the default volumes (1M todos, 100k blog posts) to seed")
+    parser.add_argument("--seed", action="store_true", help="recreate and reseed the database even if it has data")
+    parser.add_argument("--async-db", action="store_true", help="serve requests through an AsyncSession")
+    parser.add_argument("--family", action="append", choices=FAMILIES, help="only run these endpoint families (repeatable)")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per endpoint")
+    parser.add_argument("--output", default="benchmarks/results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative regression, e.g. 0.1 for 10%%")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmarks(
+        args.database_url, scale=args.scale, families=args.family or FAMILIES, requests=args.requests,
+        concurrency=args.concurrency, warmup=args.warmup, use_async=args.async_db, reseed=args.seed,
+    ))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if {key: baseline["meta"].get(key) for key in ("database", "async_db", "scale")} != {key: results["meta"][key] for key in ("database", "async_db", "scale")}:
+            print("Warning: the baseline was recorded with a different database or scale.")
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
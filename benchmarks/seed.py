@@ -0,0 +1,119 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func, insert, inspect, select
+from sqlalchemy.engine import Engine
+
+from base import Base
+from models import BlogPost, BlogPostTag, Category, Item, Tag, Todo, User
+
+# Row counts at scale 1.0
+VOLUMES = {
+    "users": 1_000,
+    "categories": 20,
+    "tags": 200,
+    "todos": 1_000_000,
+    "items": 100_000,
+    "blog_posts": 100_000,
+}
+TAGS_PER_POST = 3
+PASSWORD = "benchmark"
+CHUNK_SIZE = 10_000
+
+# Seeded rows are spread one second apart, ending well before any row the benchmark creates
+EPOCH = datetime(2020, 1, 1)
+_NAMESPACE = uuid.UUID("6f1c1bde-52a4-4d5c-9a39-1f8e2a7b0c11")
+POST_CONTENT = (
+    "Connection pools, query plans and cache hit rates decide how an API behaves under load. "
+    "This post walks through measuring a service, finding the slow path and fixing it without "
+    "changing what clients see. "
+) * 8
+
+def scaled_volumes(scale: float) -> Dict[str, int]:
+    return {table: max(int(count * scale), 1) for table, count in VOLUMES.items()}
+
+def seeded_id(kind: str, n: int) -> str:
+    """The ID of the n-th seeded row of a kind, so benchmarks can address rows without loading them."""
+    return str(uuid.uuid5(_NAMESPACE, f"{kind}-{n}"))
+
+def _timestamps(n: int) -> Dict[str, datetime]:
+    created_at = EPOCH + timedelta(seconds=n)
+    return {"created_at": created_at, "updated_at": created_at}
+
+def user_row(n: int, password_hash: str) -> dict:
+    return {
+        "id": seeded_id("user", n), "username": f"user{n:07d}", "email": f"user{n:07d}@example.com",
+        "hashed_password": password_hash, "full_name": f"User {n}", "is_active": True, **_timestamps(n),
+    }
+
+def todo_row(n: int, id: Optional[str] = None) -> dict:
+    return {
+        "id": id or seeded_id("todo", n), "title": f"Todo {n}", "description": f"Benchmark todo number {n}",
+        "completed": n % 3 == 0, **_timestamps(n),
+    }
+
+def item_row(n: int, id: Optional[str] = None) -> dict:
+    return {
+        "id": id or seeded_id("item", n), "name": f"Item {n}", "description": f"Benchmark item number {n}",
+        "price": 100 + n % 900, "tax": n % 20, **_timestamps(n),
+    }
+
+def blog_post_row(n: int, volumes: Dict[str, int], id: Optional[str] = None, author_id: Optional[str] = None) -> dict:
+    return {
+        "id": id or seeded_id("blog_post", n), "title": f"Blog post {n}", "content": POST_CONTENT[n % 100:],
+        "author_id": author_id or seeded_id("user", n % volumes["users"]),
+        "category_id": seeded_id("category", n % volumes["categories"]),
+        "published": n % 4 != 0, "published_at": EPOCH + timedelta(seconds=n) if n % 4 != 0 else None, **_timestamps(n),
+    }
+
+def post_tag_ids(n: int, volumes: Dict[str, int]) -> List[str]:
+    tags = volumes["tags"]
+    return sorted({seeded_id("tag", (n * 7 + offset) % tags) for offset in range(TAGS_PER_POST)})
+
+def insert_rows(engine: Engine, model, rows: Iterable[dict]):
+    """Inserts rows with executemany, committing every CHUNK_SIZE rows."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            with engine.begin() as connection:
+                connection.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as connection:
+            connection.execute(insert(model), chunk)
+
+def insert_blog_posts(engine: Engine, rows: List[dict], volumes: Dict[str, int], first_n: int = 0):
+    insert_rows(engine, BlogPost, rows)
+    insert_rows(engine, BlogPostTag, (
+        {"blog_post_id": row["id"], "tag_id": tag_id}
+        for n, row in enumerate(rows, first_n) for tag_id in post_tag_ids(n, volumes)
+    ))
+
+def is_seeded(engine: Engine) -> bool:
+    if not inspect(engine).has_table(Todo.__tablename__):
+        return False
+    with engine.connect() as connection:
+        return connection.scalar(select(func.count()).select_from(Todo)) > 0
+
+def seed_database(engine: Engine, volumes: Dict[str, int], password_hash: str):
+    """Recreates all tables and fills them with deterministic rows.
+
+    Every user shares one password hash, since hashing a million times would
+    dominate the run. Search indexes are left empty; the search endpoints are
+    not benchmarked.
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    insert_rows(engine, User, (user_row(n, password_hash) for n in range(volumes["users"])))
+    insert_rows(engine, Category, (
+        {"id": seeded_id("category", n), "name": f"Category {n}", "description": None, **_timestamps(n)}
+        for n in range(volumes["categories"])
+    ))
+    insert_rows(engine, Tag, ({"id": seeded_id("tag", n), "name": f"tag-{n}", **_timestamps(n)} for n in range(volumes["tags"])))
+    insert_rows(engine, Todo, (todo_row(n) for n in range(volumes["todos"])))
+    insert_rows(engine, Item, (item_row(n) for n in range(volumes["items"])))
+    for start in range(0, volumes["blog_posts"], CHUNK_SIZE):
+        numbers = range(start, min(start + CHUNK_SIZE, volumes["blog_posts"]))
+        insert_blog_posts(engine, [blog_post_row(n, volumes) for n in numbers], volumes, first_n=start)
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import UserInDB
+
+class PrincipalCache:
+    """Bounded TTL + LRU cache of authenticated users, keyed by token subject.
+
+    Lets get_current_user skip the per-request user lookup. Entries are
+    dropped as soon as user_service changes or deletes the user; other worker
+    processes see the change once their entry's TTL runs out.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, UserInDB]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a lookup racing with a user update cannot re-cache stale data
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, username: str) -> Optional[UserInDB]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[username]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, username: str, principal: UserInDB, version: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[username] = (self._clock() + self.ttl_seconds, principal)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+class Snapshot(NamedTuple):
+    version: int
+    expires_at: float
+    rows: Tuple[BaseModel, ...]
+    keys: List[Tuple]
+    by_id: Dict[str, BaseModel]
+    by_name: Dict[str, BaseModel]
+
+class ReferenceSnapshot:
+    """Immutable in-memory copy of a small, read-heavy table such as categories or tags.
+
+    Reads are served from the current snapshot. It is rebuilt from the
+    database only after invalidate() bumps the version on a write, or once
+    the TTL expires, which bounds staleness across worker processes. Names
+    are matched case-insensitively, like the MySQL unique index.
+    """
+
+    def __init__(self, model, schema: Type[BaseModel], ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.model = model
+        self.schema = schema
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._version = 0
+        self._snapshot: Optional[Snapshot] = None
+        self.rebuilds = 0
+
+    def get(self, db: Session) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version and self._clock() < snapshot.expires_at:
+            return snapshot
+        # No lock is held while loading: on the async path this runs in the
+        # event loop thread and would deadlock against itself.
+        version = self._version
+        rows = tuple(
+            self.schema.model_validate(row)
+            for row in db.query(self.model).order_by(self.model.created_at, self.model.id)
+        )
+        snapshot = Snapshot(
+            version=version,
+            expires_at=self._clock() + self.ttl_seconds,
+            rows=rows,
+            keys=[(row.created_at, row.id) for row in rows],
+            by_id={row.id: row for row in rows},
+            by_name={row.name.casefold(): row for row in rows},
+        )
+        self.rebuilds += 1
+        if version == self._version:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get_by_name(self, db: Session, name: str) -> Optional[BaseModel]:
+        return self.get(db).by_name.get(name.casefold())
+
+    def invalidate(self) -> None:
+        self._version += 1
+
+    def refresh(self, db: Session) -> Snapshot:
+        """Invalidates and immediately reloads from ``db``.
+
+        Writers call this with their primary session so that the next read,
+        which may go to a lagging replica, finds a current snapshot instead
+        of rebuilding it from stale rows.
+        """
+        self.invalidate()
+        return self.get(db)
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,10 +13,68 @@ class Settings(BaseSettings):
     mysql_port: int
     mysql_db: str
 
+    # Connection pool of each worker; connections older than the recycle time
+    # (keep it below MySQL's wait_timeout) are replaced, and pre-ping drops dead ones
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 3600
+    db_pool_pre_ping: bool = True
+
+    # Read replicas as SQLAlchemy URLs (a JSON list); GET endpoints round-robin over the healthy ones.
+    # After a write, the client reads from the primary for the read-your-writes window.
+    db_replica_urls: List[str] = []
+    db_replica_check_interval_seconds: float = 5
+    read_your_writes_seconds: float = 5
+
+    # Serve requests through an AsyncSession on a native async driver
+    use_async_db: bool = False
+    mysql_async_driver: str = "aiomysql"
+
+    # Where image files are stored: "local" (under image_storage_root) or "s3" (needs boto3)
+    image_storage_backend: str = "local"
+    image_storage_root: str = "static/images"
+    image_storage_bucket: Optional[str] = None
+    image_storage_endpoint_url: Optional[str] = None
+    image_storage_public_url: Optional[str] = None
+
+    # Image uploads are streamed to disk in chunks of this size and aborted past the maximum
+    image_upload_chunk_size: int = 1024 * 1024
+    image_upload_max_bytes: int = 20 * 1024 * 1024
+    # Unfinished resumable uploads are garbage collected this long after their last chunk
+    image_upload_session_ttl_seconds: int = 24 * 60 * 60
+    # Stored images never change under their content hash, so clients may cache them this long
+    image_cache_max_age_seconds: int = 365 * 24 * 60 * 60
+    # Processes that render resized image variants
+    image_variant_workers: int = 2
+
+    # Maximum number of rows accepted by a single batch endpoint call
+    batch_max_size: int = 1000
+    # Bulk imports commit every import_chunk_size rows and report at most import_max_errors failed rows
+    import_chunk_size: int = 20000
+    import_max_errors: int = 1000
+    # Largest request body accepted by the HTTP import endpoints
+    import_max_bytes: int = 512 * 1024 * 1024
+
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Password hashing cost and the worker pool that runs it off the event loop
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+
+    # In-process cache of authenticated users; a size or TTL of 0 disables it
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60
+
+    # Bearer token required by /metrics and /internal; while unset, those endpoints answer 404
+    internal_token: Optional[str] = None
+
+    # Longest time a worker serves categories/tags from memory without rereading them
+    reference_cache_ttl_seconds: float = 300
+
     class Config:
         env_file = ".env"
 
@@ -1,28 +1,247 @@
-from typing import Dict
+import inspect
+import itertools
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 from models import Todo
 
-from sqlalchemy import create_engine
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from config import settings
+from metrics import PoolMetrics, instrument_queries, instrumented_pool_class
 from base import Base
 
 # Construct the database URL
 SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{settings.mysql_user}:{settings.mysql_password}@{settings.mysql_host}:{settings.mysql_port}/{settings.mysql_db}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"mysql+{settings.mysql_async_driver}://{settings.mysql_user}:{settings.mysql_password}@{settings.mysql_host}:{settings.mysql_port}/{settings.mysql_db}"
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+PRIMARY_PIN_COOKIE = "read_primary_until"
+
+# Pool sizing is per engine, i.e. per worker process
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
+
+# Live pool statistics, exposed on the internal stats endpoint
+pool_metrics: Dict[str, PoolMetrics] = {"primary": PoolMetrics()}
 
 # Create the SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=instrumented_pool_class(QueuePool, pool_metrics["primary"]),
+    **POOL_OPTIONS,
+)
+pool_metrics["primary"].attach(engine)
+instrument_queries(engine)
 
 # Create a SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The async engine is only built when the deployment opts in, so the async
+# driver does not have to be installed otherwise.
+async_engine = None
+if settings.use_async_db:
+    pool_metrics["async"] = PoolMetrics()
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URL,
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, pool_metrics["async"]),
+        **POOL_OPTIONS,
+    )
+    pool_metrics["async"].attach(async_engine)
+    instrument_queries(async_engine)
+
+# Objects must stay readable after commit without an implicit (blocking) refresh
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Create a declarative base for our models
 # Base = declarative_base() # Removed to avoid circular import
 
 # Dependency to get the database session
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async database session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency used by the routers; the session flavour is chosen per deployment
+get_db = get_async_db if settings.use_async_db else get_sync_db
+
+
+class Replica:
+    def __init__(self, name: str, session_factory, health_engine: Engine):
+        self.name = name
+        self.session_factory = session_factory
+        self.health_engine = health_engine
+        self.healthy = True
+        self.failures = 0
+
+class ReplicaSet:
+    """Round-robins reads over the replicas that passed their last health check.
+
+    A background thread pings every replica; one that fails is skipped until
+    a later check succeeds. With no healthy replica, reads go to the primary.
+    """
+
+    def __init__(self, replicas: List[Replica], check_interval_seconds: float):
+        self.replicas = replicas
+        self.check_interval_seconds = check_interval_seconds
+        self._counter = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def choose(self):
+        """Returns the session factory of the next healthy replica, or None."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)].session_factory
+
+    def check(self):
+        for replica in self.replicas:
+            try:
+                with replica.health_engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                replica.healthy = True
+            except Exception:
+                replica.healthy = False
+                replica.failures += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval_seconds)
+            self.check()
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="replica-health-check", daemon=True)
+            self._thread.start()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {replica.name: {"healthy": replica.healthy, "failures": replica.failures} for replica in self.replicas}
+
+def _build_replica(index: int, url: str) -> Replica:
+    name = f"replica-{index}"
+    pool_metrics[name] = PoolMetrics()
+    sync_engine = create_engine(url, poolclass=instrumented_pool_class(QueuePool, pool_metrics[name]), **POOL_OPTIONS)
+    pool_metrics[name].attach(sync_engine)
+    instrument_queries(sync_engine)
+    if not settings.use_async_db:
+        return Replica(name, sessionmaker(autocommit=False, autoflush=False, bind=sync_engine), sync_engine)
+    # The sync engine stays around for the health-check thread
+    async_url = make_url(url).set(drivername=f"mysql+{settings.mysql_async_driver}")
+    async_name = f"{name}-async"
+    pool_metrics[async_name] = PoolMetrics()
+    async_replica_engine = create_async_engine(
+        async_url,
+        poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, pool_metrics[async_name]),
+        **POOL_OPTIONS,
+    )
+    pool_metrics[async_name].attach(async_replica_engine)
+    instrument_queries(async_replica_engine)
+    return Replica(name, async_sessionmaker(bind=async_replica_engine, autoflush=False, expire_on_commit=False), sync_engine)
+
+replica_set = ReplicaSet(
+    [_build_replica(index, url) for index, url in enumerate(settings.db_replica_urls)],
+    settings.db_replica_check_interval_seconds,
+)
+replica_set.start()
+
+def pinned_to_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that replicas may not have its changes yet."""
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+# Dependency for read-only endpoints: a replica session, or the primary one
+# when no replica is healthy or the client is inside its read-your-writes window
+async def get_read_db(request: Request, db=Depends(get_db)):
+    session_factory = None if pinned_to_primary(request) else replica_set.choose()
+    if session_factory is None:
+        yield db
+        return
+    replica_db = session_factory()
+    try:
+        yield replica_db
+    finally:
+        if isinstance(replica_db, AsyncSession):
+            await replica_db.close()
+        else:
+            await run_in_threadpool(replica_db.close)
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a while after it sends a successful write.
+
+    The pin is a cookie holding its expiry time, so it works across workers.
+    """
+
+    def __init__(self, app: ASGIApp, window_seconds: float):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS or self.window_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                # Truncated to whole milliseconds, never rounded past the window
+                pinned_until = math.floor((time.time() + self.window_seconds) * 1000) / 1000
+                headers.append(
+                    "set-cookie",
+                    f"{PRIMARY_PIN_COOKIE}={pinned_until:.3f}; Max-Age={math.ceil(self.window_seconds)}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+async def run_db(db, fn, *args, **kwargs):
+    """Run a service function against either a sync or an async session.
+
+    With an AsyncSession the function runs through ``run_sync`` so its queries
+    are awaited on the async driver instead of blocking the event loop.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
+
+@asynccontextmanager
+async def open_session(dependency=None):
+    """Opens a session outside of a request, e.g. in a background task.
+
+    Takes a ``get_db``-style dependency (sync or async generator) so callers can
+    pass along whatever the app resolves ``get_db`` to, including overrides.
+    """
+    generator = (dependency or get_db)()
+    if inspect.isasyncgen(generator):
+        try:
+            yield await generator.__anext__()
+        finally:
+            await generator.aclose()
+    else:
+        try:
+            yield next(generator)
+        finally:
+            generator.close()
@@ -0,0 +1,87 @@
+import os
+import time
+import uuid
+
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import BINARY, String, TypeDecorator
+
+# Length of a UUID in its canonical string form
+UUID_STRING_LENGTH = 36
+
+def _uuid7_int() -> int:
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    return value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+
+def uuid7() -> uuid.UUID:
+    """A UUIDv7 (RFC 9562): a 48-bit Unix timestamp in milliseconds followed by random bits.
+
+    Keys made later sort later, so new rows are appended to the end of the
+    primary key and foreign key indexes instead of landing on random pages.
+    """
+    return uuid.UUID(int=_uuid7_int())
+
+def new_id() -> str:
+    """A new UUIDv7 primary key in its canonical string form."""
+    # Formatted by hand, which takes a fraction of the time of building a UUID and calling str()
+    digits = f"{_uuid7_int():032x}"
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+def new_key() -> bytes:
+    """A new UUIDv7 primary key already in its stored 16-byte form, for bulk inserts that never show it."""
+    return _uuid7_int().to_bytes(16, "big")
+
+def binary_string(length: int):
+    """A VARCHAR compared byte for byte, for index keys that must stay distinct.
+
+    MySQL's default collation is case and accent insensitive, so "é" and "e"
+    would collide as primary key values there.
+    """
+    return String(length).with_variant(mysql.VARCHAR(length, charset="utf8mb4", collation="utf8mb4_bin"), "mysql")
+
+class UUIDKey(TypeDecorator):
+    """A UUID stored in 16 bytes (BINARY(16)) and read back as its canonical string.
+
+    Application code and the API keep seeing the usual 36-character strings.
+    A string that is not a UUID, like a malformed ID in a URL, is bound as its
+    UTF-8 bytes instead, so looking it up finds nothing rather than failing.
+    """
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if isinstance(value, uuid.UUID):
+            return value.bytes
+        if len(value) == UUID_STRING_LENGTH:
+            # Fast path for the canonical form, which is nearly every value bound
+            try:
+                key = bytes.fromhex(value.replace("-", ""))
+                if len(key) == 16:
+                    return key
+            except ValueError:
+                pass
+        try:
+            return uuid.UUID(value).bytes
+        except ValueError:
+            return value.encode()
+
+    def process_result_value(self, value, dialect):
+        # Strings are rows written before migrate_uuid_keys.py ran
+        if value is None or isinstance(value, str):
+            return value
+        return key_string(value)
+
+def canonical_key(value: str) -> str:
+    """A key as given by a client, e.g. in upper case or braces, in the form it is read back from the database."""
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return value
+
+def key_string(value: bytes) -> str:
+    """A stored key as the API shows it: the canonical UUID string, or the text of a key that is not a UUID."""
+    if len(value) != 16:
+        return value.decode()
+    return str(uuid.UUID(bytes=value))
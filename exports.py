@@ -0,0 +1,110 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence, Type
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+import database
+from database import get_db, open_session, pinned_to_primary
+from rows import ROW_CHUNK_SIZE
+from serialization import list_adapter
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+# Separator for list values, such as tag_ids, inside a CSV cell
+CSV_LIST_SEPARATOR = ";"
+
+def export_session(request: Request):
+    """A get_db-style dependency for the response body, which is streamed after the request session is closed.
+
+    Like get_read_db, it prefers a healthy replica unless the client wrote recently.
+    """
+    session_factory = None if pinned_to_primary(request) else database.replica_set.choose()
+    if session_factory is None:
+        return request.app.dependency_overrides.get(get_db, get_db)
+
+    async def replica_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            if isinstance(db, AsyncSession):
+                await db.close()
+            else:
+                await run_in_threadpool(db.close)
+
+    return replica_session
+
+async def stream_partitions(get_session, statement, chunk_size: int = ROW_CHUNK_SIZE, prepare: Optional[Callable] = None) -> AsyncIterator[Sequence]:
+    """Runs one query on a server-side cursor and yields its rows chunk by chunk.
+
+    Only one chunk is held in memory at a time, however many rows match.
+    Sync sessions fetch in the threadpool so the event loop never blocks.
+    ``prepare`` is called with the (sync) session first, on the connection the
+    query will use, e.g. to set session variables.
+    """
+    statement = statement.execution_options(yield_per=chunk_size)
+    async with open_session(get_session) as db:
+        if isinstance(db, AsyncSession):
+            if prepare is not None:
+                await db.run_sync(prepare)
+            result = await db.stream(statement)
+            async for partition in result.partitions():
+                yield partition
+        else:
+            if prepare is not None:
+                await run_in_threadpool(prepare, db)
+            result = await run_in_threadpool(db.execute, statement)
+            async for partition in iterate_in_threadpool(result.partitions()):
+                yield partition
+
+async def _validated(model: Type[BaseModel], partitions, row_mapper: Optional[Callable]) -> AsyncIterator[List[BaseModel]]:
+    adapter = list_adapter(model)
+    async for partition in partitions:
+        rows = [row_mapper(row) for row in partition] if row_mapper else partition
+        yield adapter.validate_python(rows, from_attributes=True)
+
+async def ndjson_chunks(model: Type[BaseModel], partitions, row_mapper: Optional[Callable] = None) -> AsyncIterator[bytes]:
+    """One JSON object per line, encoded exactly like the list endpoints encode each element."""
+    async for rows in _validated(model, partitions, row_mapper):
+        yield b"".join(row.__pydantic_serializer__.to_json(row) + b"\n" for row in rows)
+
+def _csv_value(value: Any):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(map(str, value))
+    return value
+
+async def csv_chunks(model: Type[BaseModel], partitions, row_mapper: Optional[Callable] = None) -> AsyncIterator[bytes]:
+    """A header row of the schema's fields, then one row per record; None becomes an empty cell."""
+    fields = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+    async for rows in _validated(model, partitions, row_mapper):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            data = row.model_dump(mode="json")
+            writer.writerow([_csv_value(data[field]) for field in fields])
+        yield buffer.getvalue().encode()
+
+def export_response(
+    request: Request, model: Type[BaseModel], statement, export_format: str, name: str,
+    row_mapper: Optional[Callable] = None, prepare: Optional[Callable] = None,
+) -> StreamingResponse:
+    """Streams every row of the statement as NDJSON or CSV, serialized through the given schema."""
+    partitions = stream_partitions(export_session(request), statement, prepare=prepare)
+    chunks = ndjson_chunks if export_format == "ndjson" else csv_chunks
+    return StreamingResponse(
+        chunks(model, partitions, row_mapper),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from imports import IMPORT_FORMATS, IMPORTERS, import_records, open_records
+
+parser = argparse.ArgumentParser(description="Bulk-load items or todos from an NDJSON or CSV file.")
+parser.add_argument("entity", choices=sorted(IMPORTERS))
+parser.add_argument("path")
+parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+parser.add_argument("--chunk-size", type=int, default=settings.import_chunk_size, help="rows committed per transaction")
+parser.add_argument("--database-url", help="defaults to the application database")
+parser.add_argument("--skip-search-index", action="store_true", help="leave the search index to rebuild_search_index.py, which is much faster for large loads")
+args = parser.parse_args()
+
+import_format = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+if import_format not in IMPORT_FORMATS:
+    parser.error(f"cannot tell the format of {args.path}; pass --format")
+
+if args.database_url:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=create_engine(args.database_url))
+else:
+    from database import SessionLocal
+
+def show_progress(report):
+    print(f"\r{report.imported:,} imported, {report.failed:,} failed, {report.rows_per_second:,.0f} rows/s", end="", flush=True)
+
+print(f"Importing {args.entity} from {args.path}...")
+db = SessionLocal()
+try:
+    with open(args.path, "rb") as source:
+        report = import_records(
+            db, args.entity, open_records(source, import_format),
+            chunk_size=args.chunk_size, index_search=not args.skip_search_index, on_progress=show_progress,
+        )
+finally:
+    db.close()
+print()
+for error in report.errors:
+    print(f"Row {error.index}: {error.detail}", file=sys.stderr)
+if report.failed > len(report.errors):
+    print(f"...and {report.failed - len(report.errors):,} more failed rows", file=sys.stderr)
+print(f"Imported {report.imported:,} {args.entity} in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s), {report.failed:,} failed.")
+if args.skip_search_index and report.imported:
+    print("Run rebuild_search_index.py to make them searchable.")
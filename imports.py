@@ -0,0 +1,199 @@
+import csv
+import gc
+import io
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from config import settings
+from models import BatchResult, ImportReport, ItemCreate, TodoCreate
+from serialization import list_adapter
+from services import item_service, todo_service
+
+IMPORT_FORMATS = ("ndjson", "csv")
+# Schema that validates each imported row, and the service that bulk-inserts the validated fields
+IMPORTERS = {
+    "items": (ItemCreate, item_service.import_items),
+    "todos": (TodoCreate, todo_service.import_todos),
+}
+# Request bodies are spooled to a temporary file once they outgrow this
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+def ndjson_records(lines: Iterable[bytes]) -> Iterator[Any]:
+    """One record per non-blank line; a line that is not valid JSON yields a ValueError in its place."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+
+def _is_utf8(row: List[str]) -> bool:
+    # Undecodable bytes come through the surrogateescape handler as lone surrogates, which cannot be encoded back
+    text = "".join(row)
+    if text.isascii():
+        return True
+    try:
+        text.encode("utf-8")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+def csv_records(lines: Iterable[str]) -> Iterator[Any]:
+    """Rows keyed by the header row. Empty cells are left out, so optional fields take their defaults.
+
+    Lines should be decoded with ``errors="surrogateescape"``: a row that is not
+    valid UTF-8 then yields a ValueError in its place instead of failing the whole file.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, [])
+    for row in reader:
+        if not row:
+            continue
+        if not _is_utf8(row):
+            yield ValueError("Invalid UTF-8")
+        elif len(row) > len(header):
+            yield ValueError(f"Row has {len(row)} cells but the header has {len(header)}")
+        else:
+            yield {key: value for key, value in zip(header, row) if value != ""}
+
+def open_records(source: BinaryIO, import_format: str) -> Iterator[Any]:
+    if import_format == "ndjson":
+        # orjson rejects invalid UTF-8, so such lines come back as ValueErrors
+        return ndjson_records(source)
+    return csv_records(io.TextIOWrapper(source, encoding="utf-8", errors="surrogateescape", newline=""))
+
+def chunked(records: Iterable[Any], chunk_size: int) -> Iterator[List[Tuple[int, Any]]]:
+    """Groups records into lists of (index, record), numbering records from 0."""
+    chunk = []
+    for index, record in enumerate(records):
+        chunk.append((index, record))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _failure(index: int, status_code: int, detail: Any) -> BatchResult:
+    return BatchResult(index=index, status=status_code, detail=detail)
+
+def validate_chunk(model, chunk: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, dict]], List[BatchResult]]:
+    """Validates a chunk with one call to the list validator and returns the valid rows' fields.
+
+    When some rows fail, their errors are reported per row, in the same form as
+    the batch endpoints, and the rest of the chunk is validated again.
+    """
+    adapter = list_adapter(model)
+    failed = [_failure(index, status.HTTP_422_UNPROCESSABLE_ENTITY, str(record)) for index, record in chunk if isinstance(record, ValueError)]
+    candidates = [(index, record) for index, record in chunk if not isinstance(record, ValueError)]
+    while True:
+        try:
+            values = adapter.dump_python(adapter.validate_python([record for _, record in candidates]))
+            return [(index, value) for (index, _), value in zip(candidates, values)], failed
+        except ValidationError as e:
+            errors = defaultdict(list)
+            for error in e.errors(include_url=False, include_context=False):
+                position, *loc = error["loc"]
+                errors[position].append({**error, "loc": tuple(loc)})
+            failed += [_failure(candidates[position][0], status.HTTP_422_UNPROCESSABLE_ENTITY, detail) for position, detail in errors.items()]
+            candidates = [candidate for position, candidate in enumerate(candidates) if position not in errors]
+
+@contextmanager
+def gc_paused():
+    """Holds off the cyclic garbage collector for the duration of the block.
+
+    Building a chunk allocates hundreds of thousands of dicts and tuples, each
+    of which counts towards the next collection, so the collector would
+    otherwise run over and over while finding nothing: the rows hold no
+    reference cycles. The switch is process wide, so keep the block short.
+    """
+    if not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+def import_chunk(db: Session, entity: str, chunk: List[Tuple[int, Any]], report: ImportReport, index_search: bool = True):
+    """Validates and inserts one chunk in its own transaction, adding the outcome to the report.
+
+    If the insert itself fails, the chunk is rolled back and each of its rows reported, and the import goes on.
+    """
+    with gc_paused():
+        _import_chunk(db, entity, chunk, report, index_search)
+
+def _import_chunk(db: Session, entity: str, chunk: List[Tuple[int, Any]], report: ImportReport, index_search: bool):
+    model, insert_rows = IMPORTERS[entity]
+    valid, failed = validate_chunk(model, chunk)
+    if valid:
+        try:
+            insert_rows(db, [value for _, value in valid], index_search=index_search)
+            report.imported += len(valid)
+        except SQLAlchemyError as e:
+            db.rollback()
+            failed += [_failure(index, status.HTTP_500_INTERNAL_SERVER_ERROR, f"Insert failed: {getattr(e, 'orig', None) or e}") for index, _ in valid]
+    report.failed += len(failed)
+    room = settings.import_max_errors - len(report.errors)
+    report.errors += sorted(failed, key=lambda result: result.index)[:max(room, 0)]
+
+def _clock(report: ImportReport, started_at: float):
+    report.seconds = time.perf_counter() - started_at
+    report.rows_per_second = (report.imported + report.failed) / report.seconds if report.seconds else 0
+
+def import_records(
+    db: Session,
+    entity: str,
+    records: Iterable[Any],
+    chunk_size: Optional[int] = None,
+    index_search: bool = True,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Imports records chunk by chunk, one bounded transaction per chunk, calling on_progress after each."""
+    report = ImportReport()
+    started_at = time.perf_counter()
+    for chunk in chunked(records, chunk_size or settings.import_chunk_size):
+        import_chunk(db, entity, chunk, report, index_search=index_search)
+        _clock(report, started_at)
+        if on_progress:
+            on_progress(report)
+    return report
+
+async def import_body(db: Session, entity: str, body: AsyncIterator[bytes], import_format: str) -> ImportReport:
+    """import_records for a streamed request body.
+
+    The body is spooled first so memory stays bounded however large it is, and
+    refused with 413 once it passes ``import_max_bytes``. It is then parsed in
+    the threadpool, and each chunk is inserted through run_sync on an
+    AsyncSession or in the threadpool on a sync one, never on the event loop.
+    """
+    report = ImportReport()
+    max_bytes = settings.import_max_bytes
+    size = 0
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        async for data in body:
+            size += len(data)
+            if size > max_bytes:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Request body exceeds {max_bytes} bytes")
+            await run_in_threadpool(spool.write, data)
+        await run_in_threadpool(spool.seek, 0)
+        started_at = time.perf_counter()
+        async for chunk in iterate_in_threadpool(chunked(open_records(spool, import_format), settings.import_chunk_size)):
+            if isinstance(db, AsyncSession):
+                await db.run_sync(import_chunk, entity, chunk, report)
+            else:
+                await run_in_threadpool(import_chunk, db, entity, chunk, report)
+            _clock(report, started_at)
+    return report
@@ -1,11 +1,19 @@
-from fastapi import FastAPI
-from routers import todos, items, users, blog_posts, categories, tags, images
+from fastapi import Depends, FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from routers import todos, items, users, blog_posts, categories, tags, images, internal
 from config import settings
-from database import engine
+from database import ReadYourWritesMiddleware, engine, pool_metrics
+from metrics import MetricsMiddleware, render_pool_metrics, request_metrics
 from models import User, BlogPost, Category, Tag, Image
+from routers.internal import require_internal_token
 from sqladmin import Admin, ModelView
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, default_response_class=ORJSONResponse)
+
+if settings.db_replica_urls:
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=settings.read_your_writes_seconds)
+# Added last so it wraps everything else and sees the final status
+app.add_middleware(MetricsMiddleware)
 
 admin = Admin(app, engine)
 
@@ -37,7 +45,14 @@ app.include_router(blog_posts.router, prefix="/api/v1", tags=["blog_posts"])
 app.include_router(categories.router, prefix="/api/v1", tags=["categories"])
 app.include_router(tags.router, prefix="/api/v1", tags=["tags"])
 app.include_router(images.router, prefix="/api/v1", tags=["images"])
+app.include_router(internal.router, prefix="/internal", include_in_schema=False)
 
 @app.get("/")
 async def root():
-    return {"message": "Hello World"}
\ No newline at end of file
+    return {"message": "Hello World"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_internal_token)])
+async def read_metrics():
+    """Prometheus metrics of this worker, for scrapers holding the internal token."""
+    lines = request_metrics.render() + render_pool_metrics(pool_metrics)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
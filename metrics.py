@@ -0,0 +1,258 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; chosen to separate an idle pool (sub-millisecond) from one that is queueing
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Seconds, for whole requests and for the database time within them
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class Histogram:
+    """Thread-safe histogram with fixed upper bounds, reported cumulatively like Prometheus."""
+
+    def __init__(self, buckets: Sequence[float], lock: Optional[threading.Lock] = None):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = lock or threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.observe_locked(value)
+
+    def observe_locked(self, value: float):
+        """observe() for callers already holding the lock passed to the constructor."""
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, buckets = 0, {}
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        """Prometheus text exposition lines for this histogram; ``labels`` is a preformatted ``k="v",`` prefix."""
+        snapshot = self.snapshot()
+        lines = [f'{name}_bucket{{{labels}le="{bound}"}} {count}' for bound, count in snapshot["buckets"].items()]
+        label_set = f"{{{labels.rstrip(',')}}}" if labels else ""
+        lines.append(f"{name}_sum{label_set} {snapshot['sum']}")
+        lines.append(f"{name}_count{label_set} {snapshot['count']}")
+        return lines
+
+class PoolMetrics:
+    """Counters for one engine's connection pool, fed by pool events and checkout timing."""
+
+    def __init__(self):
+        self.wait_time = Histogram(WAIT_TIME_BUCKETS)
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.connect_errors = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.engine = None
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def attach(self, engine: Engine):
+        """Listens to the engine's pool events; survives pool recreation on dispose."""
+        engine = getattr(engine, "sync_engine", engine)
+        self.engine = engine
+        event.listen(engine, "connect", lambda *args: self.increment("connects"))
+        event.listen(engine, "invalidate", lambda *args: self.increment("invalidations"))
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        live = {}
+        if isinstance(pool, QueuePool):
+            live = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            }
+        with self._lock:
+            counters = {
+                "connects": self.connects,
+                "connect_errors": self.connect_errors,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+            }
+        return {**live, **counters, "wait_time_seconds": self.wait_time.snapshot()}
+
+class _TimedCheckout:
+    """Pool mixin that times how long each checkout waits for a connection."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.increment("timeouts")
+            raise
+        except Exception:
+            self.metrics.increment("connect_errors")
+            raise
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - start)
+
+def instrumented_pool_class(pool_class: type, metrics: PoolMetrics) -> type:
+    """Subclasses a QueuePool flavour so checkouts report to the given metrics."""
+    return type(f"Instrumented{pool_class.__name__}", (_TimedCheckout, pool_class), {"metrics": metrics})
+
+
+# Query count and DB seconds of the request being served. The middleware sets
+# a fresh [count, seconds] pair per request; threadpool calls and async
+# run_sync greenlets inherit the context, so the cursor hooks can add to it.
+current_query_stats: ContextVar[Optional[List]] = ContextVar("current_query_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started_at"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    started_at = conn.info.pop("query_started_at", None)
+    if stats is not None and started_at is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started_at
+
+def instrument_queries(engine):
+    """Attributes every statement run on the engine to the current request."""
+    engine = getattr(engine, "sync_engine", engine)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+class RouteMetrics:
+    __slots__ = ("lock", "latency", "db_time", "queries", "statuses")
+
+    def __init__(self):
+        # One lock for the whole route, so a request is recorded with a single acquire
+        self.lock = threading.Lock()
+        self.latency = Histogram(LATENCY_BUCKETS, self.lock)
+        self.db_time = Histogram(LATENCY_BUCKETS, self.lock)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS, self.lock)
+        self.statuses: Dict[int, int] = {}
+
+class RequestMetrics:
+    """Per-route latency, status and database histograms, keyed by method and route template.
+
+    Routes are added on their first request and then only updated in place,
+    so steady-state requests allocate nothing here.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, queries: int, db_seconds: float):
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self.routes.setdefault(key, RouteMetrics())
+        with metrics.lock:
+            metrics.latency.observe_locked(seconds)
+            metrics.db_time.observe_locked(db_seconds)
+            metrics.queries.observe_locked(queries)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            routes = sorted(self.routes.items())
+        families = {
+            "http_request_duration_seconds": ("histogram", "Request latency by route.", lambda m: m.latency),
+            "http_request_db_duration_seconds": ("histogram", "Time spent in database queries per request.", lambda m: m.db_time),
+            "http_request_db_queries": ("histogram", "Database queries per request.", lambda m: m.queries),
+        }
+        lines = []
+        for name, (kind, help_text, histogram) in families.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (method, route), metrics in routes:
+                lines += histogram(metrics).render(name, f'method="{method}",route="{_escape_label(route)}",')
+        lines += ["# HELP http_requests_total Responses by route and status.", "# TYPE http_requests_total counter"]
+        for (method, route), metrics in routes:
+            with metrics.lock:
+                statuses = sorted(metrics.statuses.items())
+            for status, count in statuses:
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape_label(route)}",status="{status}"}} {count}')
+        return lines
+
+request_metrics = RequestMetrics()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and DB usage per route.
+
+    Timing stops when the response body is complete, so background tasks
+    that run afterwards are not counted against the route.
+    """
+
+    def __init__(self, app: ASGIApp, registry: RequestMetrics = request_metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+        stats = [0, 0.0]
+        token = current_query_stats.set(stats)
+        status = 500
+        finished = None
+
+        async def send_with_metrics(message: Message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif not message.get("more_body", False):
+                finished = (time.perf_counter(), stats[0], stats[1])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_query_stats.reset(token)
+            ended_at, queries, db_seconds = finished or (time.perf_counter(), stats[0], stats[1])
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"], getattr(route, "path_format", "unmatched"), status, ended_at - started_at, queries, db_seconds
+            )
+
+def render_pool_metrics(pools: Dict[str, PoolMetrics]) -> List[str]:
+    """Prometheus lines for connection pool gauges, counters and checkout wait times."""
+    gauges = {"size": "db_pool_size", "checked_out": "db_pool_checked_out", "overflow": "db_pool_overflow"}
+    counters = {
+        "connects": "db_pool_connects_total",
+        "connect_errors": "db_pool_connect_errors_total",
+        "timeouts": "db_pool_timeouts_total",
+        "invalidations": "db_pool_invalidations_total",
+    }
+    stats = {name: metrics.stats() for name, metrics in sorted(pools.items())}
+    lines = []
+    for families, kind in ((gauges, "gauge"), (counters, "counter")):
+        for key, metric in families.items():
+            lines.append(f"# TYPE {metric} {kind}")
+            lines += [f'{metric}{{pool="{name}"}} {pool_stats[key]}' for name, pool_stats in stats.items() if key in pool_stats]
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for name, metrics in sorted(pools.items()):
+        lines += metrics.wait_time.render("db_pool_wait_seconds", f'pool="{name}",')
+    return lines
@@ -0,0 +1,53 @@
+"""Moves images uploaded before storage backends were introduced into the configured backend.
+
+Run it once after upgrading:
+
+    python migrate_image_storage.py [LEGACY_DIRECTORY]
+
+The images table gained file_path, content_hash, content_type and size along
+the way, which create_db_tables.py cannot add to an existing table, so they
+are added first. Rows whose file is missing are left alone, and the script
+can be re-run after an interruption.
+"""
+import asyncio
+import sys
+from typing import List
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from models import Image as DBImage
+
+def add_image_columns(engine: Engine) -> List[str]:
+    """Adds the columns and indexes missing from an existing images table; returns the names of the columns added."""
+    table = DBImage.__table__
+    with engine.begin() as connection:
+        existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+        added = [column for column in table.columns if column.name not in existing]
+        quote = connection.dialect.identifier_preparer.quote
+        for column in added:
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type} NULL")
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    return [column.name for column in added]
+
+if __name__ == "__main__":
+    from base import Base
+    from database import SessionLocal, engine
+    from services import image_service
+
+    # Flat directory that uploads were written to before storage backends
+    legacy_directory = sys.argv[1] if len(sys.argv) > 1 else "static/images"
+
+    Base.metadata.create_all(bind=engine)
+    added = add_image_columns(engine)
+    if added:
+        print(f"Added images columns: {', '.join(added)}")
+    print(f"Moving image files from {legacy_directory} into the storage backend...")
+    db = SessionLocal()
+    try:
+        moved = asyncio.run(image_service.migrate_legacy_files(db, legacy_directory))
+    finally:
+        db.close()
+    print(f"Moved {moved} files.")
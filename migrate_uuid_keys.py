@@ -0,0 +1,131 @@
+"""Converts UUID key columns from VARCHAR(36) strings to BINARY(16), in place.
+
+Run it once after upgrading, with the application stopped and a backup taken:
+
+    python migrate_uuid_keys.py [--database-url URL]
+
+Every column typed UUIDKey in models.py is converted, primary and foreign keys
+alike. Columns that already hold 16-byte values are skipped, so the script can
+be re-run after an interruption, which on MySQL is how a failed run is finished:
+DDL is not transactional there, so nothing is rolled back.
+"""
+import argparse
+import uuid
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, inspect, update
+from sqlalchemy.engine import Connection, Engine
+
+import models  # noqa: F401 (registers every table on Base.metadata)
+from base import Base
+from db_types import UUID_STRING_LENGTH, UUIDKey
+
+def uuid_columns() -> Dict[str, List[str]]:
+    """The UUIDKey columns of each table, parents before the tables referencing them."""
+    return {
+        table.name: [column.name for column in table.columns if isinstance(column.type, UUIDKey)]
+        for table in Base.metadata.sorted_tables
+        if any(isinstance(column.type, UUIDKey) for column in table.columns)
+    }
+
+def _uuid_bytes(value):
+    return uuid.UUID(value).bytes
+
+def _binary_expression(connection: Connection, column):
+    if connection.dialect.name == "mysql":
+        return func.unhex(func.replace(column, "-", ""))
+    # SQLite before 3.41 has no unhex(), so the conversion is registered from Python
+    connection.connection.driver_connection.create_function("uuid_bytes", 1, _uuid_bytes, deterministic=True)
+    return func.uuid_bytes(column)
+
+def _modify(connection: Connection, table, column, column_type: str):
+    null = "NULL" if column.nullable else "NOT NULL"
+    connection.exec_driver_sql(f"ALTER TABLE `{table.name}` MODIFY `{column.name}` {column_type} {null}")
+
+def pending_steps(column_type: str) -> Tuple[str, ...]:
+    """What a MySQL key column of the given type still needs, in order.
+
+    A string column first becomes VARBINARY(36) so the bytes of each value
+    survive the type change, then its values are rewritten as 16 bytes, then it
+    becomes BINARY(16). Every step commits on its own (MySQL commits DDL
+    implicitly anyway), so after an interruption the column's current type says
+    where to pick up: a VARBINARY column may hold a mix of old and new values.
+    """
+    column_type = column_type.upper()
+    if column_type.startswith("BINARY"):
+        return ()
+    if column_type.startswith("VARBINARY"):
+        return ("rewrite", "binary")
+    return ("varbinary", "rewrite", "binary")
+
+def _column_type(connection: Connection, table_name: str, column_name: str) -> str:
+    return str(next(column["type"] for column in inspect(connection).get_columns(table_name) if column["name"] == column_name))
+
+def _rewrite(connection: Connection, table, column) -> int:
+    # Values already 16 bytes long are left alone, so the rewrite can be repeated
+    return connection.execute(
+        update(table).where(func.length(column) == UUID_STRING_LENGTH).values({column.name: _binary_expression(connection, column)})
+    ).rowcount
+
+def convert_column(connection: Connection, table, column) -> int:
+    """Rewrites the string values of one column as 16 bytes; returns how many were converted.
+
+    SQLite stores whatever it is given, so only the values are rewritten there.
+    """
+    if connection.dialect.name != "mysql":
+        return _rewrite(connection, table, column)
+    converted = 0
+    for step in pending_steps(_column_type(connection, table.name, column.name)):
+        if step == "varbinary":
+            _modify(connection, table, column, f"VARBINARY({UUID_STRING_LENGTH})")
+        elif step == "rewrite":
+            converted = _rewrite(connection, table, column)
+        else:
+            _modify(connection, table, column, "BINARY(16)")
+        connection.commit()
+    return converted
+
+def _convert_tables(connection: Connection) -> Dict[str, int]:
+    counts = {}
+    existing = set(inspect(connection).get_table_names())
+    for table_name, column_names in uuid_columns().items():
+        if table_name not in existing:
+            continue
+        table = Base.metadata.tables[table_name]
+        counts[table_name] = sum(convert_column(connection, table, table.columns[name]) for name in column_names)
+    return counts
+
+def migrate(engine: Engine) -> Dict[str, int]:
+    """Converts every UUIDKey column of the existing tables; returns the values converted per table.
+
+    On SQLite everything happens in one transaction. MySQL cannot roll back
+    DDL, so there each column is converted step by step and a failed run is
+    finished by running it again.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            return _convert_tables(connection)
+    if engine.dialect.name != "mysql":
+        raise ValueError(f"Unsupported database: {engine.dialect.name}")
+    with engine.connect() as connection:
+        # Parent and child key columns change type one at a time
+        connection.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            return _convert_tables(connection)
+        finally:
+            connection.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 1")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to the application database")
+    args = parser.parse_args()
+    if args.database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.database_url)
+    else:
+        from database import engine
+
+    print("Converting UUID keys to BINARY(16)...")
+    for table_name, count in migrate(engine).items():
+        print(f"  {table_name}: {count} values")
+    print("UUID keys converted.")
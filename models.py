@@ -1,10 +1,10 @@
-import uuid
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Optional, List
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from base import Base
+from db_types import UUIDKey, binary_string, new_id
 
 class TodoBase(BaseModel):
     title: str
@@ -13,8 +13,9 @@ class TodoBase(BaseModel):
 
 class Todo(Base):
     __tablename__ = "todos"
+    __table_args__ = (Index("ix_todos_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     title = Column(String(255), nullable=False)
     description = Column(String(1024), nullable=True)
     completed = Column(Boolean, default=False)
@@ -29,6 +30,9 @@ class TodoUpdate(TodoBase):
     description: Optional[str] = None
     completed: Optional[bool] = None
 
+class TodoBatchUpdate(TodoUpdate):
+    id: str
+
 class TodoInDB(TodoBase):
     id: str
     created_at: datetime
@@ -46,8 +50,9 @@ class ItemBase(BaseModel):
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (Index("ix_items_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     name = Column(String(255), nullable=False)
     description = Column(String(1024), nullable=True)
     price = Column(Integer, nullable=False)
@@ -55,6 +60,16 @@ class Item(Base):
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
+# Inverted trigram index behind the substring filters on todos and items.
+# On SQLite the rows are stored in primary key order, as InnoDB does, rather than in a rowid table plus a separate key index.
+class SearchTrigram(Base):
+    __tablename__ = "search_trigrams"
+    __table_args__ = (Index("ix_search_trigrams_entity_id", "entity", "entity_id"), {"sqlite_with_rowid": False})
+
+    entity = Column(String(32), primary_key=True)
+    trigram = Column(binary_string(3), primary_key=True)
+    entity_id = Column(UUIDKey, primary_key=True)
+
 class ItemCreate(ItemBase):
     pass
 
@@ -64,6 +79,9 @@ class ItemUpdate(ItemBase):
     price: Optional[float] = None
     tax: Optional[float] = None
 
+class ItemBatchUpdate(ItemUpdate):
+    id: str
+
 class ItemInDB(ItemBase):
     id: str
     created_at: datetime
@@ -73,6 +91,21 @@ class ItemInDB(ItemBase):
         from_attributes = True
 
 
+# Per-row outcome of a batch create/update/delete request
+class BatchResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: int
+    detail: Optional[Any] = None
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[BatchResult] = []
+    seconds: float = 0
+    rows_per_second: float = 0
+
+
 # User Models
 class UserBase(BaseModel):
     username: str
@@ -107,8 +140,9 @@ class TokenData(BaseModel):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     username = Column(String(255), unique=True, index=True, nullable=False)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
@@ -123,8 +157,9 @@ class User(Base):
 # Blog Post Models
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (Index("ix_categories_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     name = Column(String(255), unique=True, nullable=False)
     description = Column(String(1024), nullable=True)
     created_at = Column(DateTime, default=datetime.now)
@@ -135,8 +170,9 @@ class Category(Base):
 
 class Tag(Base):
     __tablename__ = "tags"
+    __table_args__ = (Index("ix_tags_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     name = Column(String(255), unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -146,18 +182,61 @@ class Tag(Base):
 
 class Image(Base):
     __tablename__ = "images"
+    __table_args__ = (Index("ix_images_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     url = Column(String(1024), nullable=False)
     alt_text = Column(String(512), nullable=True)
+    # Storage key of the file (e.g. "ab/cd/<hash>.png"), resolved by the image storage backend
+    file_path = Column(String(1024), nullable=True)
+    content_hash = Column(String(64), unique=True, index=True, nullable=True)
+    content_type = Column(String(255), nullable=True)
+    size = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    variants = relationship("ImageVariant", back_populates="image", cascade="all, delete-orphan")
+
+
+# Resized renditions of an image, named "<width>.<format>" (e.g. "512.webp")
+class ImageVariant(Base):
+    __tablename__ = "image_variants"
+    __table_args__ = (UniqueConstraint("image_id", "name", name="uq_image_variants_image_id_name"),)
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    image_id = Column(UUIDKey, ForeignKey("images.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String(32), nullable=False)
+    file_path = Column(String(1024), nullable=False)
+    content_type = Column(String(255), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    image = relationship("Image", back_populates="variants")
+
+
+# Resumable upload in progress; the received bytes live in a temp file named after the id
+class ImageUpload(Base):
+    __tablename__ = "image_uploads"
+    __table_args__ = (Index("ix_image_uploads_expires_at", "expires_at"),)
+
+    id = Column(UUIDKey, primary_key=True, default=new_id)
+    user_id = Column(UUIDKey, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(255), nullable=True)
+    size = Column(Integer, nullable=False)
+    offset = Column("upload_offset", Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
 
 class BlogPostTag(Base):
     __tablename__ = "blog_post_tags"
-    blog_post_id = Column(String(36), ForeignKey("blog_posts.id"), primary_key=True)
-    tag_id = Column(String(36), ForeignKey("tags.id"), primary_key=True)
+    blog_post_id = Column(UUIDKey, ForeignKey("blog_posts.id"), primary_key=True)
+    tag_id = Column(UUIDKey, ForeignKey("tags.id"), primary_key=True)
 
     blog_post = relationship("BlogPost", back_populates="blog_post_tags")
     tag = relationship("Tag", back_populates="blog_posts")
@@ -165,12 +244,13 @@ class BlogPostTag(Base):
 
 class BlogPost(Base):
     __tablename__ = "blog_posts"
+    __table_args__ = (Index("ix_blog_posts_created_at_id", "created_at", "id"),)
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=new_id)
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
-    author_id = Column(String(36), ForeignKey("users.id"))
-    category_id = Column(String(36), ForeignKey("categories.id"), nullable=True)
+    author_id = Column(UUIDKey, ForeignKey("users.id"))
+    category_id = Column(UUIDKey, ForeignKey("categories.id"), nullable=True)
     published = Column(Boolean, default=False)
     published_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
@@ -181,11 +261,40 @@ class BlogPost(Base):
     blog_post_tags = relationship("BlogPostTag", back_populates="blog_post")
     images = relationship("Image", secondary="blog_post_images", backref="blog_posts")
 
+    @property
+    def tag_ids(self):
+        return [blog_post_tag.tag_id for blog_post_tag in self.blog_post_tags]
+
+    @property
+    def image_ids(self):
+        return [image.id for image in self.images]
+
 
 class BlogPostImage(Base):
     __tablename__ = "blog_post_images"
-    blog_post_id = Column(String(36), ForeignKey("blog_posts.id"), primary_key=True)
-    image_id = Column(String(36), ForeignKey("images.id"), primary_key=True)
+    blog_post_id = Column(UUIDKey, ForeignKey("blog_posts.id"), primary_key=True)
+    image_id = Column(UUIDKey, ForeignKey("images.id"), primary_key=True)
+
+
+# Inverted index for ranked full-text search over blog posts
+class BlogPostTerm(Base):
+    __tablename__ = "blog_post_terms"
+    __table_args__ = (Index("ix_blog_post_terms_blog_post_id", "blog_post_id"),)
+
+    term = Column(binary_string(64), primary_key=True)
+    blog_post_id = Column(UUIDKey, ForeignKey("blog_posts.id"), primary_key=True)
+    term_frequency = Column(Integer, nullable=False)
+    document_length = Column(Integer, nullable=False)
+
+
+# Corpus statistics, spread over a few rows per entity so concurrent writers rarely update the same row
+class SearchStats(Base):
+    __tablename__ = "search_stats"
+
+    entity = Column(String(32), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    document_count = Column(Integer, nullable=False, default=0)
+    total_length = Column(Integer, nullable=False, default=0)
 
 
 # Pydantic Models for Blog Posts
@@ -240,12 +349,28 @@ class ImageUpdate(ImageBase):
 
 class ImageInDB(ImageBase):
     id: str
+    content_hash: Optional[str] = None
+    content_type: Optional[str] = None
+    size: Optional[int] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+class ImageUploadCreate(BaseModel):
+    filename: str
+    content_type: Optional[str] = None
+    size: int = Field(gt=0)
+
+class ImageUploadRead(ImageUploadCreate):
+    id: str
+    offset: int
+    expires_at: datetime
+
+    class Config:
+        from_attributes = True
+
 
 class BlogPostBase(BaseModel):
     title: str
@@ -275,4 +400,30 @@ class BlogPostInDB(BlogPostBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AuthorSummary(BaseModel):
+    id: str
+    username: str
+    full_name: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class BlogPostRead(BlogPostInDB):
+    author: Optional[AuthorSummary] = None
+    category: Optional[CategoryInDB] = None
+    tags: Optional[List[TagInDB]] = None
+    images: Optional[List[ImageInDB]] = None
+
+class BlogPostSearchResult(BaseModel):
+    id: str
+    title: str
+    snippet: str
+    score: float
+    author_id: str
+    category_id: Optional[str] = None
+    published: bool
+    published_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
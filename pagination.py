@@ -0,0 +1,62 @@
+import base64
+from bisect import bisect_right
+from datetime import datetime
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Encodes the (created_at, id) position of a row as an opaque cursor token."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decodes a cursor token back into its (created_at, id) position.
+
+    Timestamps are stored naive, so a cursor carrying a UTC offset was not made by encode_cursor and is rejected.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        created_at = datetime.fromisoformat(created_at)
+    except ValueError:
+        created_at = None
+    if created_at is None or created_at.tzinfo is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return created_at, row_id
+
+def paginate(query, model, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """Applies offset paging, or keyset paging on (created_at, id) when a cursor is given.
+
+    An empty cursor starts keyset paging from the first row; the composite
+    ``(created_at, id)`` index on each table keeps every page an index range scan.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    query = query.order_by(model.created_at, model.id)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(model.created_at > created_at, and_(model.created_at == created_at, model.id > row_id)))
+    return query.limit(limit)
+
+def paginate_sorted(rows: Sequence, keys: List[Tuple[datetime, str]], skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List:
+    """In-memory counterpart of paginate for rows already sorted by (created_at, id).
+
+    keys holds the (created_at, id) of each row so a cursor is resolved with a binary search.
+    """
+    if cursor is None:
+        return list(rows[skip:skip + limit])
+    start = bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+    return list(rows[start:start + limit])
+
+def set_next_cursor(response: Response, rows, limit: int, cursor: Optional[str]) -> None:
+    """Exposes the cursor of the following page in the X-Next-Cursor response header."""
+    if cursor is not None and rows and len(rows) == limit:
+        last = rows[-1]
+        if isinstance(last, Mapping):
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last["created_at"], last["id"])
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
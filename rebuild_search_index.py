@@ -0,0 +1,19 @@
+from database import SessionLocal, engine
+from models import BlogPostTerm, Item, SearchStats, SearchTrigram, Todo
+from services import blog_post_search_service, item_service, search_service, todo_service
+
+# The index tables only hold derived data, so they are recreated to pick up column changes (e.g. collations)
+INDEX_TABLES = [SearchTrigram.__table__, BlogPostTerm.__table__, SearchStats.__table__]
+
+print("Rebuilding search index...")
+for table in INDEX_TABLES:
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+db = SessionLocal()
+try:
+    search_service.rebuild_index(db, item_service.SEARCH_ENTITY, Item, Item.name)
+    search_service.rebuild_index(db, todo_service.SEARCH_ENTITY, Todo, Todo.title)
+    blog_post_search_service.rebuild_index(db)
+finally:
+    db.close()
+print("Search index rebuilt.")
@@ -0,0 +1,121 @@
+import os
+import re
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def http_date(value: datetime) -> str:
+    """Formats a datetime as an IMF-fixdate, e.g. for Last-Modified."""
+    return formatdate(value.timestamp(), usegmt=True)
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parses a single ``bytes=`` range into an inclusive (start, end) pair.
+
+    Returns None when the whole file should be served: no header, a
+    malformed header or a multi-range request, which servers may ignore.
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+def _not_modified(request_headers: Mapping[str, str], etag: str, last_modified: Optional[str]) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that honours conditional requests and single byte ranges.
+
+    The body is never loaded into memory: full responses use the ASGI
+    ``pathsend`` extension when the server offers it, ranges use
+    ``zerocopysend`` (sendfile), and otherwise the file is streamed in
+    ``chunk_size`` reads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        stat_result: os.stat_result,
+        request_headers: Mapping[str, str],
+        etag: str,
+        last_modified: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ) -> None:
+        headers = {**(headers or {}), "etag": etag, "accept-ranges": "bytes"}
+        if last_modified:
+            headers["last-modified"] = last_modified
+        super().__init__(path, headers=headers, media_type=media_type, stat_result=stat_result)
+        self.range: Optional[Tuple[int, int]] = None
+        size = stat_result.st_size
+
+        if _not_modified(request_headers, etag, last_modified):
+            self.status_code = 304
+            del self.headers["content-length"]
+            return
+        if_range = request_headers.get("if-range")
+        if if_range is not None and if_range.strip() not in (etag, last_modified):
+            return
+        try:
+            self.range = parse_range(request_headers.get("range"), size)
+        except ValueError:
+            self.status_code = 416
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            return
+        if self.range is not None:
+            start, end = self.range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.status_code == 200:
+            await super().__call__(scope, receive, send)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.status_code != 206 or scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        start, end = self.range
+        remaining = end - start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": file.wrapped.fileno(), "offset": start, "count": remaining})
+                return
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
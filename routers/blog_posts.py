@@ -1,50 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Query, Request, Response, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import FrozenSet, List, Literal, Optional
 
-from database import get_db
-from models import BlogPostCreate, BlogPostUpdate, BlogPostInDB, UserInDB
-from services import blog_post_service
+from database import get_db, get_read_db, run_db
+from exports import export_response
+from pagination import set_next_cursor
+from serialization import list_response
+from models import BlogPostCreate, BlogPostUpdate, BlogPostInDB, BlogPostRead, BlogPostSearchResult, UserInDB
+from services import blog_post_service, blog_post_search_service
 from routers.users import get_current_user
 
 router = APIRouter()
 
+def parse_expand(expand: Optional[str] = None) -> FrozenSet[str]:
+    """Parses the comma-separated expand parameter into relation names."""
+    fields = frozenset(field.strip() for field in expand.split(",") if field.strip()) if expand else frozenset()
+    unknown = fields - blog_post_service.EXPANDABLE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot expand: {', '.join(sorted(unknown))}")
+    return fields
+
 @router.post("/blog_posts", response_model=BlogPostInDB, status_code=status.HTTP_201_CREATED)
 async def create_blog_post(blog_post: BlogPostCreate, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Create a new blog post."""
-    return blog_post_service.create_blog_post(db=db, blog_post=blog_post, author_id=current_user.id)
-
-@router.get("/blog_posts", response_model=List[BlogPostInDB])
-async def read_blog_posts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Retrieve a list of blog posts."""
-    blog_posts = blog_post_service.get_blog_posts(db, skip=skip, limit=limit)
-    return blog_posts
-
-@router.get("/blog_posts/{blog_post_id}", response_model=BlogPostInDB)
-async def read_blog_post(blog_post_id: str, db: Session = Depends(get_db)):
-    """Retrieve a single blog post by ID."""
-    db_blog_post = blog_post_service.get_blog_post(db, blog_post_id=blog_post_id)
+    return await run_db(db, blog_post_service.create_blog_post, blog_post=blog_post, author_id=current_user.id)
+
+@router.get("/blog_posts", response_model=List[BlogPostRead], response_model_exclude_unset=True)
+async def read_blog_posts(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, expand: FrozenSet[str] = Depends(parse_expand), response: Response = None, db: Session = Depends(get_read_db)):
+    """Retrieve a list of blog posts, optionally embedding author, category, tags and images."""
+    if expand:
+        blog_posts = await run_db(db, blog_post_service.get_blog_posts, skip=skip, limit=limit, cursor=cursor, expand=expand)
+        rows = [blog_post_service.read_fields(blog_post, expand) for blog_post in blog_posts]
+    else:
+        rows = await run_db(db, blog_post_service.get_blog_post_rows, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, rows, limit, cursor)
+    return list_response(BlogPostRead, rows, response, exclude_unset=True)
+
+@router.get("/blog_posts/search", response_model=List[BlogPostSearchResult])
+async def search_blog_posts(q: str, published: Optional[bool] = None, skip: int = 0, limit: int = 20, db: Session = Depends(get_read_db)):
+    """Full-text search over blog post titles and content, ranked by BM25."""
+    return await run_db(db, blog_post_search_service.search_blog_posts, q=q, published=published, skip=skip, limit=limit)
+
+@router.get("/blog_posts/export", response_class=StreamingResponse)
+async def export_blog_posts(request: Request, export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format")):
+    """Stream every blog post with its tag and image IDs as NDJSON or CSV, from a single query."""
+    return export_response(
+        request, BlogPostInDB, blog_post_service.export_statement(), export_format, "blog_posts",
+        row_mapper=blog_post_service.export_fields, prepare=blog_post_service.prepare_export,
+    )
+
+@router.get("/blog_posts/{blog_post_id}", response_model=BlogPostRead, response_model_exclude_unset=True)
+async def read_blog_post(blog_post_id: str, expand: FrozenSet[str] = Depends(parse_expand), db: Session = Depends(get_read_db)):
+    """Retrieve a single blog post by ID, optionally embedding author, category, tags and images."""
+    db_blog_post = await run_db(db, blog_post_service.get_blog_post, blog_post_id=blog_post_id, expand=expand)
     if db_blog_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blog post not found")
-    return db_blog_post
+    return blog_post_service.to_read_model(db_blog_post, expand)
 
 @router.put("/blog_posts/{blog_post_id}", response_model=BlogPostInDB)
 async def update_blog_post(blog_post_id: str, blog_post: BlogPostUpdate, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Update an existing blog post."""
-    db_blog_post = blog_post_service.get_blog_post(db, blog_post_id=blog_post_id)
+    db_blog_post = await run_db(db, blog_post_service.get_blog_post, blog_post_id=blog_post_id)
     if db_blog_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blog post not found")
     if db_blog_post.author_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this blog post")
-    return blog_post_service.update_blog_post(db=db, blog_post_id=blog_post_id, blog_post=blog_post)
+    return await run_db(db, blog_post_service.update_blog_post, blog_post_id=blog_post_id, blog_post=blog_post)
 
 @router.delete("/blog_posts/{blog_post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_blog_post(blog_post_id: str, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Delete a blog post."""
-    db_blog_post = blog_post_service.get_blog_post(db, blog_post_id=blog_post_id)
+    db_blog_post = await run_db(db, blog_post_service.get_blog_post, blog_post_id=blog_post_id)
     if db_blog_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blog post not found")
     if db_blog_post.author_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this blog post")
-    blog_post_service.delete_blog_post(db, blog_post_id=blog_post_id)
+    await run_db(db, blog_post_service.delete_blog_post, blog_post_id=blog_post_id)
     return None
\ No newline at end of file
@@ -1,37 +1,142 @@
-from fastapi import APIRouter, Depends, UploadFile, File, status, HTTPException
+import os
+
+from fastapi import APIRouter, BackgroundTasks, Header, Request, Response, Depends, status, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import RedirectResponse
+from typing import List, Optional
 
-from database import get_db
-from models import ImageInDB, UserInDB
-from services import image_service
+from config import settings
+from database import get_db, get_read_db, run_db
+from pagination import set_next_cursor
+from responses import RangeFileResponse, http_date
+from serialization import list_response
+from models import ImageInDB, ImageUploadCreate, ImageUploadRead, UserInDB
+from services import image_service, image_variant_service
+from uploads import MULTIPART_OVERHEAD_BYTES, MultipartFileReader, check_content_length
 from routers.users import get_current_user
 
 router = APIRouter()
 
-@router.post("/images/upload", response_model=ImageInDB, status_code=status.HTTP_201_CREATED)
-async def upload_image_endpoint(file: UploadFile = File(...), db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
-    """Upload an image file."""
-    return await image_service.upload_image(db, file)
+# The upload body is parsed by hand as it streams in, so it is described for the OpenAPI schema here
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}},
+        "required": ["file"],
+    }}},
+}
+
+@router.post("/images/upload", response_model=ImageInDB, status_code=status.HTTP_201_CREATED, openapi_extra={"requestBody": UPLOAD_REQUEST_BODY})
+async def upload_image_endpoint(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Upload an image file in a multipart ``file`` field; resized variants are generated in the background."""
+    check_content_length(request.headers, settings.image_upload_max_bytes + MULTIPART_OVERHEAD_BYTES)
+    upload = MultipartFileReader(request.headers, request.stream())
+    await upload.open()
+    image = await image_service.upload_image(db, upload.chunks())
+    schedule_variants(request, background_tasks, image.id)
+    return image
+
+def background_session(request: Request):
+    """The get_db dependency for background tasks, which run after the request session is closed."""
+    return request.app.dependency_overrides.get(get_db, get_db)
+
+def schedule_variants(request: Request, background_tasks: BackgroundTasks, image_id: str):
+    background_tasks.add_task(image_variant_service.generate_variants, background_session(request), image_id)
+
+def set_upload_offset(response: Response, upload: ImageUploadRead):
+    response.headers[image_service.UPLOAD_OFFSET_HEADER] = str(upload.offset)
+
+@router.post("/images/uploads", response_model=ImageUploadRead, status_code=status.HTTP_201_CREATED)
+async def start_upload_endpoint(upload: ImageUploadCreate, request: Request, response: Response, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Start a resumable upload of a file of the given size."""
+    db_upload = await image_service.start_upload(db, upload, current_user.id)
+    response.headers["Location"] = str(request.url_for("get_upload_endpoint", upload_id=db_upload.id))
+    set_upload_offset(response, db_upload)
+    background_tasks.add_task(image_service.collect_expired_uploads, background_session(request))
+    return db_upload
+
+@router.get("/images/uploads/{upload_id}", response_model=ImageUploadRead)
+async def get_upload_endpoint(upload_id: str, response: Response, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Report how many bytes of a resumable upload have been received."""
+    db_upload = await image_service.get_upload(db, upload_id, current_user.id)
+    set_upload_offset(response, db_upload)
+    return db_upload
+
+@router.patch("/images/uploads/{upload_id}", response_model=ImageUploadRead)
+async def append_upload_endpoint(upload_id: str, request: Request, response: Response, upload_offset: int = Header(..., alias=image_service.UPLOAD_OFFSET_HEADER), db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Append the request body to a resumable upload at the offset given in the Upload-Offset header."""
+    db_upload = await image_service.append_upload_chunk(db, upload_id, current_user.id, upload_offset, request.stream())
+    set_upload_offset(response, db_upload)
+    return db_upload
+
+@router.post("/images/uploads/{upload_id}/complete", response_model=ImageInDB, status_code=status.HTTP_201_CREATED)
+async def complete_upload_endpoint(upload_id: str, request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Finish a fully received resumable upload and store it as an image."""
+    image = await image_service.complete_upload(db, upload_id, current_user.id)
+    schedule_variants(request, background_tasks, image.id)
+    return image
+
+@router.delete("/images/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload_endpoint(upload_id: str, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Abort a resumable upload and discard the received bytes."""
+    await image_service.cancel_upload(db, upload_id, current_user.id)
 
 @router.get("/images/{image_id}", response_model=ImageInDB)
-async def get_image_endpoint(image_id: str, db: Session = Depends(get_db)):
+async def get_image_endpoint(image_id: str, db: Session = Depends(get_read_db)):
     """Retrieve image metadata by ID."""
-    db_image = image_service.get_image(db, image_id)
+    db_image = await run_db(db, image_service.get_image, image_id)
     if db_image is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
     return db_image
 
+@router.get("/images/{image_id}/file", response_class=RangeFileResponse)
+async def download_image_endpoint(image_id: str, request: Request, variant: Optional[str] = None, db: Session = Depends(get_db)):
+    """Download an image file, or a resized variant such as ``512.webp``, with Range and conditional request support."""
+    db_image = await run_db(db, image_service.get_image, image_id)
+    if db_image is None or not db_image.file_path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    key, content_type, version = db_image.file_path, db_image.content_type, db_image.content_hash
+    if variant is not None:
+        db_variant = await image_variant_service.get_or_create_variant(db, db_image, variant)
+        key, content_type = db_variant.file_path, db_variant.content_type
+        version = f"{version}-{variant}" if version else None
+    file_path = image_service.storage.local_path(key)
+    if file_path is None:
+        return RedirectResponse(await image_service.storage.download_url(key), status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    try:
+        stat_result = await run_in_threadpool(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image file not found")
+    etag = f'"{version}"' if version else f'"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+    # Browsers must not guess the type; files recorded with anything but an image type are only offered as downloads
+    headers = {"cache-control": f"public, max-age={settings.image_cache_max_age_seconds}, immutable", "x-content-type-options": "nosniff"}
+    if content_type not in image_service.INLINE_CONTENT_TYPES:
+        content_type = "application/octet-stream"
+        headers["content-disposition"] = "attachment"
+    return RangeFileResponse(
+        file_path,
+        stat_result=stat_result,
+        request_headers=request.headers,
+        etag=etag,
+        last_modified=http_date(db_image.updated_at),
+        headers=headers,
+        media_type=content_type,
+    )
+
 @router.get("/images", response_model=List[ImageInDB])
-async def get_all_images_endpoint(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_all_images_endpoint(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, response: Response = None, db: Session = Depends(get_read_db)):
     """Retrieve a list of all image metadata."""
-    images = image_service.get_images(db, skip=skip, limit=limit)
-    return images
+    images = await run_db(db, image_service.get_images, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, images, limit, cursor)
+    return list_response(ImageInDB, images, response)
 
 @router.delete("/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_image_endpoint(image_id: str, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
-    """Delete an image by ID."""
-    db_image = image_service.delete_image(db, image_id)
-    if db_image is None:
+async def delete_image_endpoint(image_id: str, request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+    """Delete an image by ID; its files are removed after the response is sent."""
+    keys = await run_db(db, image_service.delete_image, image_id)
+    if keys is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    background_tasks.add_task(image_service.delete_stored_files, background_session(request), keys)
     return None
\ No newline at end of file
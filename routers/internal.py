@@ -0,0 +1,29 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from cache import principal_cache
+from config import settings
+from database import pool_metrics, replica_set
+from security import password_hash_pool
+
+def require_internal_token(authorization: Optional[str] = Header(None)):
+    """Guards operational endpoints: hidden unless INTERNAL_TOKEN is set, then only open to that bearer token."""
+    if not settings.internal_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.internal_token.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid internal token", headers={"WWW-Authenticate": "Bearer"})
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+@router.get("/stats")
+async def read_stats():
+    """Live per-worker statistics for sizing pools and caches."""
+    return {
+        "db_pools": {name: metrics.stats() for name, metrics in pool_metrics.items()},
+        "db_replicas": replica_set.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hash_pool": password_hash_pool.stats(),
+    }
@@ -1,32 +1,48 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status, Depends
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Literal, Optional
 from sqlalchemy.orm import Session
-from models import ItemCreate, ItemUpdate, ItemInDB
+from models import BatchResult, ImportReport, ItemBatchUpdate, ItemCreate, ItemUpdate, ItemInDB
+from batch import check_batch_size, reject_duplicate_ids, results_by_id, validate_rows
 from config import settings
-from database import get_db
+from database import get_db, get_read_db, run_db
+from exports import export_response
+from imports import import_body
+from pagination import set_next_cursor
+from serialization import list_response
 from services import item_service
+from uploads import check_content_length
 
 router = APIRouter()
 
 @router.post("/items", response_model=ItemInDB, status_code=status.HTTP_201_CREATED)
 async def create_item(item: ItemCreate, db: Session = Depends(get_db)):
     """Create a new item."""
-    return item_service.create_item(db=db, item=item)
+    return await run_db(db, item_service.create_item, item=item)
 
 @router.get("/items", response_model=List[ItemInDB])
 async def read_items(
     skip: int = 0,
     limit: int = settings.items_per_page,
     name: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    response: Response = None,
+    db: Session = Depends(get_read_db)
 ):
     """Retrieve a list of items."""
-    return item_service.get_items(db=db, skip=skip, limit=limit, name=name)
+    items = await run_db(db, item_service.get_item_rows, skip=skip, limit=limit, name=name, cursor=cursor)
+    set_next_cursor(response, items, limit, cursor)
+    return list_response(ItemInDB, items, response)
+
+@router.get("/items/export", response_class=StreamingResponse)
+async def export_items(request: Request, name: Optional[str] = None, export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format")):
+    """Stream every item matching the filters as NDJSON or CSV, from a single query."""
+    return export_response(request, ItemInDB, item_service.export_statement(name=name), export_format, "items")
 
 @router.get("/items/{item_id}", response_model=ItemInDB)
-async def read_item(item_id: str, db: Session = Depends(get_db)):
+async def read_item(item_id: str, db: Session = Depends(get_read_db)):
     """Retrieve a single item by ID."""
-    db_item = item_service.get_item(db=db, item_id=item_id)
+    db_item = await run_db(db, item_service.get_item, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
     return db_item
@@ -34,7 +50,7 @@ async def read_item(item_id: str, db: Session = Depends(get_db)):
 @router.put("/items/{item_id}", response_model=ItemInDB)
 async def update_item(item_id: str, item: ItemUpdate, db: Session = Depends(get_db)):
     """Update an existing item."""
-    db_item = item_service.update_item(db=db, item_id=item_id, item=item)
+    db_item = await run_db(db, item_service.update_item, item_id=item_id, item=item)
     if db_item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
     return db_item
@@ -42,7 +58,37 @@ async def update_item(item_id: str, item: ItemUpdate, db: Session = Depends(get_
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_item(item_id: str, db: Session = Depends(get_db)):
     """Delete an item."""
-    db_item = item_service.delete_item(db=db, item_id=item_id)
+    db_item = await run_db(db, item_service.delete_item, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
-    return
\ No newline at end of file
+    return
+
+
+@router.post("/items:batch", response_model=List[BatchResult])
+async def create_items_batch(items: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    """Create many items in one transaction, reporting a result per row."""
+    valid, failed = validate_rows(ItemCreate, items)
+    ids = await run_db(db, item_service.create_items, items=[item for _, item in valid])
+    indexed_ids = [(index, item_id) for (index, _), item_id in zip(valid, ids)]
+    return results_by_id(indexed_ids, set(ids), status.HTTP_201_CREATED, failed)
+
+@router.patch("/items:batch", response_model=List[BatchResult])
+async def update_items_batch(items: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    """Update many items in one transaction, reporting a result per row."""
+    valid, failed = validate_rows(ItemBatchUpdate, items)
+    valid = reject_duplicate_ids(valid, failed)
+    found_ids = await run_db(db, item_service.update_items, items=[item for _, item in valid])
+    return results_by_id([(index, item.id) for index, item in valid], found_ids, status.HTTP_200_OK, failed)
+
+@router.delete("/items:batch", response_model=List[BatchResult])
+async def delete_items_batch(item_ids: List[str] = Body(...), db: Session = Depends(get_db)):
+    """Delete many items in one transaction, reporting a result per ID."""
+    check_batch_size(item_ids)
+    found_ids = await run_db(db, item_service.delete_items, item_ids=item_ids)
+    return results_by_id(list(enumerate(item_ids)), found_ids, status.HTTP_204_NO_CONTENT, [])
+
+@router.post("/items:import", response_model=ImportReport)
+async def import_items(request: Request, import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: Session = Depends(get_db)):
+    """Bulk-load items from an NDJSON or CSV request body, committing in chunks and reporting the rows that failed."""
+    check_content_length(request.headers, settings.import_max_bytes)
+    return await import_body(db, "items", request.stream(), import_format)
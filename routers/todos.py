@@ -1,20 +1,24 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List, Optional
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response, status, Depends
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
-from models import Todo, TodoCreate, TodoUpdate, TodoInDB
+from models import BatchResult, ImportReport, TodoBatchUpdate, TodoCreate, TodoUpdate, TodoInDB
+from batch import check_batch_size, reject_duplicate_ids, results_by_id, validate_rows
 from config import settings
-from database import get_db
+from database import get_db, get_read_db, run_db
+from exports import export_response
+from imports import import_body
+from pagination import set_next_cursor
+from serialization import list_response
+from services import todo_service
+from uploads import check_content_length
 
 router = APIRouter()
 
 @router.post("/todos", response_model=TodoInDB, status_code=status.HTTP_201_CREATED)
 async def create_todo(todo: TodoCreate, db: Session = Depends(get_db)):
-    db_todo = Todo(**todo.model_dump())
-    db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
-    return db_todo
+    return await run_db(db, todo_service.create_todo, todo=todo)
 
 @router.get("/todos", response_model=List[TodoInDB])
 async def read_todos(
@@ -22,39 +26,71 @@ async def read_todos(
     limit: int = settings.items_per_page,
     title: Optional[str] = None,
     completed: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    response: Response = None,
+    db: Session = Depends(get_read_db)
+):
+    todos = await run_db(db, todo_service.get_todo_rows, skip=skip, limit=limit, title=title, completed=completed, cursor=cursor)
+    set_next_cursor(response, todos, limit, cursor)
+    return list_response(TodoInDB, todos, response)
+
+@router.get("/todos/export", response_class=StreamingResponse)
+async def export_todos(
+    request: Request,
+    title: Optional[str] = None,
+    completed: Optional[bool] = None,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
 ):
-    query = db.query(Todo)
-    if title:
-        query = query.filter(Todo.title.contains(title))
-    if completed is not None:
-        query = query.filter(Todo.completed == completed)
-    todos = query.offset(skip).limit(limit).all()
-    return todos
+    """Stream every todo matching the filters as NDJSON or CSV, from a single query."""
+    return export_response(request, TodoInDB, todo_service.export_statement(title=title, completed=completed), export_format, "todos")
 
 @router.get("/todos/{todo_id}", response_model=TodoInDB)
-async def read_todo(todo_id: str, db: Session = Depends(get_db)):
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+async def read_todo(todo_id: str, db: Session = Depends(get_read_db)):
+    db_todo = await run_db(db, todo_service.get_todo, todo_id=todo_id)
     if db_todo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
     return db_todo
 
 @router.put("/todos/{todo_id}", response_model=TodoInDB)
 async def update_todo(todo_id: str, todo: TodoUpdate, db: Session = Depends(get_db)):
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = await run_db(db, todo_service.update_todo, todo_id=todo_id, todo=todo)
     if db_todo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-    db.commit()
-    db.refresh(db_todo)
     return db_todo
 
 @router.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(todo_id: str, db: Session = Depends(get_db)):
-    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    db_todo = await run_db(db, todo_service.delete_todo, todo_id=todo_id)
     if db_todo is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Todo not found")
-    db.delete(db_todo)
-    db.commit()
-    return
\ No newline at end of file
+    return
+
+
+@router.post("/todos:batch", response_model=List[BatchResult])
+async def create_todos_batch(todos: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    """Create many todos in one transaction, reporting a result per row."""
+    valid, failed = validate_rows(TodoCreate, todos)
+    ids = await run_db(db, todo_service.create_todos, todos=[todo for _, todo in valid])
+    indexed_ids = [(index, todo_id) for (index, _), todo_id in zip(valid, ids)]
+    return results_by_id(indexed_ids, set(ids), status.HTTP_201_CREATED, failed)
+
+@router.patch("/todos:batch", response_model=List[BatchResult])
+async def update_todos_batch(todos: List[Dict[str, Any]] = Body(...), db: Session = Depends(get_db)):
+    """Update many todos in one transaction, reporting a result per row."""
+    valid, failed = validate_rows(TodoBatchUpdate, todos)
+    valid = reject_duplicate_ids(valid, failed)
+    found_ids = await run_db(db, todo_service.update_todos, todos=[todo for _, todo in valid])
+    return results_by_id([(index, todo.id) for index, todo in valid], found_ids, status.HTTP_200_OK, failed)
+
+@router.delete("/todos:batch", response_model=List[BatchResult])
+async def delete_todos_batch(todo_ids: List[str] = Body(...), db: Session = Depends(get_db)):
+    """Delete many todos in one transaction, reporting a result per ID."""
+    check_batch_size(todo_ids)
+    found_ids = await run_db(db, todo_service.delete_todos, todo_ids=todo_ids)
+    return results_by_id(list(enumerate(todo_ids)), found_ids, status.HTTP_204_NO_CONTENT, [])
+
+@router.post("/todos:import", response_model=ImportReport)
+async def import_todos(request: Request, import_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"), db: Session = Depends(get_db)):
+    """Bulk-load todos from an NDJSON or CSV request body, committing in chunks and reporting the rows that failed."""
+    check_content_length(request.headers, settings.import_max_bytes)
+    return await import_body(db, "todos", request.stream(), import_format)
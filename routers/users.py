@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, Response, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from typing import List
+from typing import List, Optional
+from datetime import timedelta
 from sqlalchemy.orm import Session
 from models import UserCreate, UserUpdate, UserInDB, Token, TokenData
-from database import get_db
+from cache import principal_cache
+from database import get_db, run_db
+from pagination import set_next_cursor
+from serialization import list_response
 from services import user_service
-from security import create_access_token, verify_password, verify_token
+from security import create_access_token, hash_password, verify_and_update_password, verify_token
 from config import settings
 
 router = APIRouter()
@@ -19,32 +23,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     username = verify_token(token, credentials_exception)
-    user = user_service.get_user_by_username(db, username=username)
+    user = principal_cache.get(username)
     if user is None:
-        raise credentials_exception
+        version = principal_cache.version
+        db_user = await run_db(db, user_service.get_user_by_username, username=username)
+        if db_user is None:
+            raise credentials_exception
+        user = UserInDB.model_validate(db_user)
+        principal_cache.put(username, user, version=version)
     return user
 
 @router.post("/users", response_model=UserInDB, status_code=status.HTTP_201_CREATED)
 async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
-    db_user_email = user_service.get_user_by_email(db, email=user.email)
+    db_user_email = await run_db(db, user_service.get_user_by_email, email=user.email)
     if db_user_email:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    db_user_username = user_service.get_user_by_username(db, username=user.username)
+    db_user_username = await run_db(db, user_service.get_user_by_username, username=user.username)
     if db_user_username:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already taken")
-    return user_service.create_user(db=db, user=user)
+    hashed_password = await hash_password(user.password)
+    return await run_db(db, user_service.create_user, user=user, hashed_password=hashed_password)
 
 @router.post("/users/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login for access token."""
-    user = user_service.get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db, user_service.get_user_by_username, username=form_data.username)
+    verified, new_hash = await verify_and_update_password(form_data.password, user.hashed_password) if user else (False, None)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        await run_db(db, user_service.update_password_hash, user_id=user.id, hashed_password=new_hash)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -52,15 +65,16 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users", response_model=List[UserInDB])
-async def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
+async def read_users(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, response: Response = None, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Retrieve a list of users."""
-    users = user_service.get_users(db, skip=skip, limit=limit)
-    return users
+    users = await run_db(db, user_service.get_user_rows, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, users, limit, cursor)
+    return list_response(UserInDB, users, response)
 
 @router.get("/users/{user_id}", response_model=UserInDB)
 async def read_user(user_id: str, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Retrieve a single user by ID."""
-    db_user = user_service.get_user(db, user_id=user_id)
+    db_user = await run_db(db, user_service.get_user, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
@@ -68,7 +82,8 @@ async def read_user(user_id: str, db: Session = Depends(get_db), current_user: U
 @router.put("/users/{user_id}", response_model=UserInDB)
 async def update_user(user_id: str, user: UserUpdate, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Update an existing user."""
-    db_user = user_service.update_user(db, user_id=user_id, user=user)
+    hashed_password = await hash_password(user.password) if user.password is not None else None
+    db_user = await run_db(db, user_service.update_user, user_id=user_id, user=user, hashed_password=hashed_password)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return db_user
@@ -76,7 +91,7 @@ async def update_user(user_id: str, user: UserUpdate, db: Session = Depends(get_
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(user_id: str, db: Session = Depends(get_db), current_user: UserInDB = Depends(get_current_user)):
     """Delete a user."""
-    db_user = user_service.delete_user(db, user_id=user_id)
+    db_user = await run_db(db, user_service.delete_user, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return
\ No newline at end of file
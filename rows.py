@@ -0,0 +1,64 @@
+from operator import itemgetter
+from typing import List, Type
+
+from pydantic import BaseModel
+from sqlalchemy import insert, inspect
+from sqlalchemy.orm import Session
+
+# Rows pulled from the driver per fetch; bounds the result buffer on drivers that stream
+ROW_CHUNK_SIZE = 1000
+
+def schema_columns(model, schema: Type[BaseModel]) -> tuple:
+    """The model's columns that the schema reads, in a form select() accepts."""
+    columns = inspect(model).columns
+    return tuple(getattr(model, name) for name in schema.model_fields if name in columns)
+
+def fetch_rows(db: Session, statement, chunk_size: int = ROW_CHUNK_SIZE) -> List:
+    """Runs a Core select and returns its rows as named tuples.
+
+    Unlike an ORM query, nothing is hydrated into mapped instances, added to the
+    identity map or tracked for changes, so a page of rows costs a fraction of
+    the memory. Results are fetched from the driver chunk by chunk.
+    """
+    result = db.execute(statement.execution_options(yield_per=chunk_size))
+    return [row for partition in result.partitions() for row in partition]
+
+def _bind_processor(column, dialect):
+    return column.type.dialect_impl(dialect).bind_processor(dialect)
+
+def bulk_insert(db: Session, model, rows: List[dict], **constants):
+    """Inserts plain dict rows with a single executemany on the driver cursor.
+
+    SQLAlchemy's per-row parameter handling costs more than the insert itself
+    on SQLite, so it is bypassed: only the column types' own conversions (such
+    as UUID keys to bytes) are applied to each row. Values shared by every row,
+    such as timestamps, are passed as ``constants`` and converted once. Rows
+    must cover every column with a Python-side default. Values that are
+    already bytes, such as keys from new_key(), are passed to the driver as
+    they are. Does not commit.
+    """
+    if not rows:
+        return
+    connection = db.connection()
+    dialect = connection.dialect
+    columns = model.__table__.columns
+    for key, value in constants.items():
+        processor = _bind_processor(columns[key], dialect)
+        constants[key] = processor(value) if processor else value
+    processors = [(key, processor) for key in rows[0] if (processor := _bind_processor(columns[key], dialect))]
+
+    def prepared(row: dict) -> dict:
+        values = {**row, **constants}
+        for key, processor in processors:
+            value = values[key]
+            if not isinstance(value, bytes):
+                values[key] = processor(value)
+        return values
+
+    compiled = insert(model).compile(dialect=dialect, column_keys=[*rows[0], *constants])
+    if compiled.positional:
+        ordered = itemgetter(*compiled.positiontup)
+        parameters = [ordered(prepared(row)) for row in rows]
+    else:
+        parameters = [prepared(row) for row in rows]
+    connection.exec_driver_sql(compiled.string, parameters)
@@ -0,0 +1,29 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """The List[model] adapter, built once since building it compiles the validator and serializer."""
+    return TypeAdapter(List[model])
+
+def dump_list(model: Type[BaseModel], rows: Iterable, exclude_unset: bool = False) -> bytes:
+    """Validates ORM rows (or dicts of attributes) once and encodes them straight to JSON bytes."""
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True), exclude_unset=exclude_unset)
+
+def list_response(model: Type[BaseModel], rows: Iterable, response: Optional[Response] = None, exclude_unset: bool = False) -> Response:
+    """A JSON response for a list endpoint that bypasses FastAPI's response_model handling.
+
+    FastAPI would validate the rows, dump them to Python objects, run them
+    through jsonable_encoder and then encode them; this does one validation
+    and one encode in pydantic-core, with the same output bytes as the app's
+    ORJSONResponse default. Headers set on the endpoint's injected
+    ``response`` (such as X-Next-Cursor) are kept.
+    """
+    json_response = Response(dump_list(model, rows, exclude_unset=exclude_unset), media_type="application/json")
+    if response is not None:
+        json_response.raw_headers.extend(response.raw_headers)
+    return json_response
@@ -0,0 +1,189 @@
+import math
+import re
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from models import BlogPost, BlogPostSearchResult, BlogPostTerm, SearchStats
+
+SEARCH_ENTITY = "blog_posts"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title terms count as this many occurrences in the body
+TITLE_WEIGHT = 3
+MAX_TERM_LENGTH = 64
+# Rows the corpus statistics are spread over; each post always updates the same one
+STATS_SHARDS = 16
+SNIPPET_LENGTH = 160
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Splits text into lowercase terms, dropping stopwords."""
+    if not text:
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def _term_frequencies(title: str, content: str) -> Counter:
+    frequencies = Counter(tokenize(content))
+    for term in tokenize(title):
+        frequencies[term] += TITLE_WEIGHT
+    return frequencies
+
+def stats_upsert(dialect_name: str, shard: int, document_delta: int, length_delta: int):
+    """Adds to a stats shard, creating its row on first use, in one statement.
+
+    An UPDATE followed by an INSERT when nothing matched would let two posts
+    that hash to a fresh shard both try the INSERT, and one fail on the key.
+    """
+    values = dict(entity=SEARCH_ENTITY, shard=shard, document_count=document_delta, total_length=length_delta)
+    if dialect_name == "mysql":
+        statement = mysql.insert(SearchStats).values(**values)
+        return statement.on_duplicate_key_update(
+            document_count=SearchStats.document_count + statement.inserted.document_count,
+            total_length=SearchStats.total_length + statement.inserted.total_length,
+        )
+    statement = sqlite.insert(SearchStats).values(**values)
+    return statement.on_conflict_do_update(
+        index_elements=[SearchStats.entity, SearchStats.shard],
+        set_=dict(
+            document_count=SearchStats.document_count + statement.excluded.document_count,
+            total_length=SearchStats.total_length + statement.excluded.total_length,
+        ),
+    )
+
+def _adjust_stats(db: Session, blog_post_id: str, document_delta: int, length_delta: int):
+    if not document_delta and not length_delta:
+        return
+    shard = zlib.crc32(blog_post_id.encode()) % STATS_SHARDS
+    db.execute(stats_upsert(db.get_bind().dialect.name, shard, document_delta, length_delta))
+
+def corpus_stats(db: Session):
+    """The number of indexed posts and their summed length, added up over the stats shards."""
+    return db.execute(
+        select(
+            func.coalesce(func.sum(SearchStats.document_count), 0).label("document_count"),
+            func.coalesce(func.sum(SearchStats.total_length), 0).label("total_length"),
+        ).where(SearchStats.entity == SEARCH_ENTITY)
+    ).one()
+
+def _indexed_length(db: Session, blog_post_id: str) -> Optional[int]:
+    return db.execute(
+        select(BlogPostTerm.document_length).where(BlogPostTerm.blog_post_id == blog_post_id).limit(1)
+    ).scalar()
+
+def index_blog_post(db: Session, blog_post_id: str, title: str, content: str, is_new: bool = False):
+    """Writes the postings of a blog post and updates corpus statistics. Does not commit."""
+    old_length = None
+    if not is_new:
+        old_length = _indexed_length(db, blog_post_id)
+        if old_length is not None:
+            db.execute(delete(BlogPostTerm).where(BlogPostTerm.blog_post_id == blog_post_id))
+    frequencies = _term_frequencies(title, content)
+    length = sum(frequencies.values())
+    if frequencies:
+        db.execute(insert(BlogPostTerm), [
+            {"term": term, "blog_post_id": blog_post_id, "term_frequency": frequency, "document_length": length}
+            for term, frequency in frequencies.items()
+        ])
+    was_indexed, is_indexed = old_length is not None, bool(frequencies)
+    _adjust_stats(db, blog_post_id, int(is_indexed) - int(was_indexed), (length if is_indexed else 0) - (old_length or 0))
+
+def remove_blog_post(db: Session, blog_post_id: str):
+    """Drops the postings of a blog post and updates corpus statistics. Does not commit."""
+    old_length = _indexed_length(db, blog_post_id)
+    if old_length is not None:
+        db.execute(delete(BlogPostTerm).where(BlogPostTerm.blog_post_id == blog_post_id))
+        _adjust_stats(db, blog_post_id, -1, -old_length)
+
+def _snippet(content: str, terms: List[str]) -> str:
+    lowered = content.lower()
+    positions = [match.start() for match in (re.search(rf"\b{re.escape(term)}", lowered) for term in terms) if match]
+    start = max(min(positions) - SNIPPET_LENGTH // 4, 0) if positions else 0
+    snippet = content[start:start + SNIPPET_LENGTH].strip()
+    if start > 0:
+        snippet = "…" + snippet
+    if start + SNIPPET_LENGTH < len(content):
+        snippet = snippet + "…"
+    return snippet
+
+def search_blog_posts(db: Session, q: str, published: Optional[bool] = None, skip: int = 0, limit: int = 20) -> List[BlogPostSearchResult]:
+    """Ranks blog posts against the query with BM25 over the inverted index.
+
+    Runs a fixed number of queries regardless of corpus size: corpus stats,
+    document frequencies, the scored top-k, and the matching rows.
+    """
+    terms = sorted(set(tokenize(q)))
+    if not terms:
+        return []
+    stats = corpus_stats(db)
+    if not stats.document_count:
+        return []
+    document_count = stats.document_count
+    average_length = stats.total_length / document_count
+
+    document_frequencies = dict(db.execute(
+        select(BlogPostTerm.term, func.count()).where(BlogPostTerm.term.in_(terms)).group_by(BlogPostTerm.term)
+    ).all())
+    if not document_frequencies:
+        return []
+    idf = {
+        term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+        for term, frequency in document_frequencies.items()
+    }
+
+    tf = BlogPostTerm.term_frequency
+    normalized_length = 1 - B + B * BlogPostTerm.document_length / average_length
+    score = func.sum(case(idf, value=BlogPostTerm.term, else_=0.0) * tf * (K1 + 1) / (tf + K1 * normalized_length)).label("score")
+    query = select(BlogPostTerm.blog_post_id, score).where(BlogPostTerm.term.in_(list(idf)))
+    if published is not None:
+        query = query.join(BlogPost, BlogPost.id == BlogPostTerm.blog_post_id).where(BlogPost.published == published)
+    ranked = db.execute(
+        query.group_by(BlogPostTerm.blog_post_id).order_by(score.desc(), BlogPostTerm.blog_post_id).offset(skip).limit(limit)
+    ).all()
+    if not ranked:
+        return []
+
+    posts = {post.id: post for post in db.query(BlogPost).filter(BlogPost.id.in_([row.blog_post_id for row in ranked]))}
+    results = []
+    for row in ranked:
+        post = posts[row.blog_post_id]
+        results.append(BlogPostSearchResult(
+            id=post.id,
+            title=post.title,
+            snippet=_snippet(post.content, terms),
+            score=round(row.score, 6),
+            author_id=post.author_id,
+            category_id=post.category_id,
+            published=post.published,
+            published_at=post.published_at,
+            created_at=post.created_at,
+            updated_at=post.updated_at,
+        ))
+    return results
+
+def rebuild_index(db: Session, batch_size: int = 500):
+    """Re-indexes every blog post, committing once per batch."""
+    db.execute(delete(BlogPostTerm))
+    db.execute(delete(SearchStats).where(SearchStats.entity == SEARCH_ENTITY))
+    last_id = ""
+    while True:
+        rows = db.execute(
+            select(BlogPost.id, BlogPost.title, BlogPost.content).where(BlogPost.id > last_id).order_by(BlogPost.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            index_blog_post(db, row.id, row.title, row.content, is_new=True)
+        db.commit()
+        last_id = rows[-1].id
+    db.commit()
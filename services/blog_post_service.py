@@ -1,12 +1,73 @@
-from sqlalchemy.orm import Session
-from models import BlogPost, BlogPostCreate, BlogPostUpdate, User, Category, Tag, BlogPostTag
-from typing import List, Optional
-import uuid
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import (
+    BlogPost, BlogPostCreate, BlogPostInDB, BlogPostRead, BlogPostUpdate, User, Category,
+    Tag, BlogPostTag, Image, BlogPostImage,
+)
+from db_types import key_string, new_id
+from pagination import paginate
+from rows import fetch_rows, schema_columns
+from services import blog_post_search_service
+from typing import Any, Collection, Dict, List, Optional
+from collections import defaultdict
 from datetime import datetime
 
+EXPANDABLE_FIELDS = frozenset({"author", "category", "tags", "images"})
+
+def _query_blog_posts(db: Session, expand: Collection[str] = ()):
+    """Query blog posts with their associations eager-loaded.
+
+    tag_ids and image_ids always cost one selectin query each; author and
+    category are joined in, so a page costs a fixed 3-4 queries.
+    """
+    tag_loader = selectinload(BlogPost.blog_post_tags)
+    if "tags" in expand:
+        tag_loader = tag_loader.joinedload(BlogPostTag.tag)
+    options = [tag_loader, selectinload(BlogPost.images)]
+    if "author" in expand:
+        options.append(joinedload(BlogPost.author))
+    if "category" in expand:
+        options.append(joinedload(BlogPost.category))
+    return db.query(BlogPost).options(*options)
+
+def read_fields(db_blog_post: BlogPost, expand: Collection[str] = ()) -> Dict[str, Any]:
+    """The attributes BlogPostRead is validated from, with only the requested relations present.
+
+    Relations that are not expanded are left out rather than set to None, so
+    they stay unset and are dropped by exclude_unset, and are never lazy-loaded.
+    """
+    data = {name: getattr(db_blog_post, name) for name in BlogPostInDB.model_fields}
+    if "author" in expand:
+        data["author"] = db_blog_post.author
+    if "category" in expand:
+        data["category"] = db_blog_post.category
+    if "tags" in expand:
+        data["tags"] = [blog_post_tag.tag for blog_post_tag in db_blog_post.blog_post_tags]
+    if "images" in expand:
+        data["images"] = db_blog_post.images
+    return data
+
+def to_read_model(db_blog_post: BlogPost, expand: Collection[str] = ()) -> BlogPostRead:
+    """Build the API representation of a blog post, embedding the requested relations."""
+    return BlogPostRead.model_validate(read_fields(db_blog_post, expand), from_attributes=True)
+
+def _sync_associations(db: Session, association, target_column, target_model, blog_post_id: str, target_ids: Optional[List[str]], is_new: bool = False):
+    """Make a post's association rows match target_ids, writing only the difference.
+
+    Unknown IDs are dropped. Costs at most four statements whatever the number of IDs.
+    """
+    wanted = set(db.scalars(select(target_model.id).where(target_model.id.in_(set(target_ids))))) if target_ids else set()
+    current = set() if is_new else set(db.scalars(select(target_column).where(association.blog_post_id == blog_post_id)))
+    stale = current - wanted
+    if stale:
+        db.execute(delete(association).where(association.blog_post_id == blog_post_id, target_column.in_(stale)))
+    missing = wanted - current
+    if missing:
+        db.execute(insert(association), [{"blog_post_id": blog_post_id, target_column.key: target_id} for target_id in missing])
+
 def create_blog_post(db: Session, blog_post: BlogPostCreate, author_id: str):
     db_blog_post = BlogPost(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         title=blog_post.title,
         content=blog_post.content,
         author_id=author_id,
@@ -15,49 +76,100 @@ def create_blog_post(db: Session, blog_post: BlogPostCreate, author_id: str):
         published_at=blog_post.published_at,
     )
     db.add(db_blog_post)
+    db.flush()
+    blog_post_search_service.index_blog_post(db, db_blog_post.id, db_blog_post.title, db_blog_post.content, is_new=True)
+    _sync_associations(db, BlogPostTag, BlogPostTag.tag_id, Tag, db_blog_post.id, blog_post.tag_ids, is_new=True)
+    _sync_associations(db, BlogPostImage, BlogPostImage.image_id, Image, db_blog_post.id, blog_post.image_ids, is_new=True)
     db.commit()
-    db.refresh(db_blog_post)
-
-    # Handle tags
-    if blog_post.tag_ids:
-        for tag_id in blog_post.tag_ids:
-            db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
-            if db_tag:
-                blog_post_tag = BlogPostTag(blog_post_id=db_blog_post.id, tag_id=tag_id)
-                db.add(blog_post_tag)
-        db.commit()
-        db.refresh(db_blog_post)
+    return _query_blog_posts(db).populate_existing().filter(BlogPost.id == db_blog_post.id).first()
 
-    return db_blog_post
+def get_blog_post(db: Session, blog_post_id: str, expand: Collection[str] = ()):
+    return _query_blog_posts(db, expand).filter(BlogPost.id == blog_post_id).first()
+
+def get_blog_posts(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, expand: Collection[str] = ()):
+    return paginate(_query_blog_posts(db, expand), BlogPost, skip=skip, limit=limit, cursor=cursor).all()
+
+ROW_COLUMNS = schema_columns(BlogPost, BlogPostInDB)
+
+def _associated_ids(db: Session, association, target_column, blog_post_ids: List[str]) -> Dict[str, List[str]]:
+    ids = defaultdict(list)
+    if blog_post_ids:
+        statement = select(association.blog_post_id, target_column).where(association.blog_post_id.in_(blog_post_ids))
+        for blog_post_id, target_id in db.execute(statement):
+            ids[blog_post_id].append(target_id)
+    return ids
+
+def get_blog_post_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read-only get_blog_posts without expansions, as dicts of the BlogPostInDB fields.
+
+    Same three queries as the ORM path (posts, tag links, image links), but
+    without building mapped instances or their relationship collections.
+    """
+    posts = fetch_rows(db, paginate(select(*ROW_COLUMNS), BlogPost, skip=skip, limit=limit, cursor=cursor))
+    post_ids = [post.id for post in posts]
+    tag_ids = _associated_ids(db, BlogPostTag, BlogPostTag.tag_id, post_ids)
+    image_ids = _associated_ids(db, BlogPostImage, BlogPostImage.image_id, post_ids)
+    return [{**post._mapping, "tag_ids": tag_ids[post.id], "image_ids": image_ids[post.id]} for post in posts]
+
+def _joined_ids(association, target_column):
+    return (
+        select(func.group_concat(func.hex(target_column)))
+        .where(association.blog_post_id == BlogPost.id)
+        .scalar_subquery()
+    )
+
+def export_statement():
+    """Every blog post in (created_at, id) order with its tag and image IDs, as one query for streaming exports.
+
+    The IDs are aggregated as hex with GROUP_CONCAT (SQLite and MySQL) so no
+    second query has to run while the export cursor is open. Run it after
+    prepare_export so MySQL does not cut the lists short.
+    """
+    return select(
+        *ROW_COLUMNS,
+        _joined_ids(BlogPostTag, BlogPostTag.tag_id).label("tag_ids"),
+        _joined_ids(BlogPostImage, BlogPostImage.image_id).label("image_ids"),
+    ).order_by(BlogPost.created_at, BlogPost.id)
+
+# 33 bytes per ID; MySQL's default group_concat_max_len of 1024 would silently truncate posts with over 31 tags
+EXPORT_GROUP_CONCAT_MAX_LEN = 16 * 1024 * 1024
+
+def prepare_export(db: Session):
+    """Raises MySQL's GROUP_CONCAT result limit for the connection that runs export_statement."""
+    if db.get_bind().dialect.name == "mysql":
+        db.execute(text(f"SET SESSION group_concat_max_len = {EXPORT_GROUP_CONCAT_MAX_LEN}"))
 
-def get_blog_post(db: Session, blog_post_id: str):
-    return db.query(BlogPost).filter(BlogPost.id == blog_post_id).first()
+def _split_ids(joined: Optional[str]) -> List[str]:
+    # Decoded as UUIDKey reads them, so string keys from before migrate_uuid_keys.py come back as they were
+    return [key_string(bytes.fromhex(key)) for key in joined.split(",")] if joined else []
 
-def get_blog_posts(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(BlogPost).offset(skip).limit(limit).all()
+def export_fields(row) -> Dict[str, Any]:
+    """Turns a row of export_statement into BlogPostInDB fields."""
+    return {**row._mapping, "tag_ids": _split_ids(row.tag_ids), "image_ids": _split_ids(row.image_ids)}
 
 def update_blog_post(db: Session, blog_post_id: str, blog_post: BlogPostUpdate):
     db_blog_post = db.query(BlogPost).filter(BlogPost.id == blog_post_id).first()
     if db_blog_post:
-        for key, value in blog_post.dict(exclude_unset=True).items():
+        update_data = blog_post.dict(exclude_unset=True)
+        for key, value in update_data.items():
             if key == "tag_ids":
-                # Clear existing tags and add new ones
-                db.query(BlogPostTag).filter(BlogPostTag.blog_post_id == blog_post_id).delete()
-                if value:
-                    for tag_id in value:
-                        db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
-                        if db_tag:
-                            blog_post_tag = BlogPostTag(blog_post_id=blog_post_id, tag_id=tag_id)
-                            db.add(blog_post_tag)
+                _sync_associations(db, BlogPostTag, BlogPostTag.tag_id, Tag, blog_post_id, value)
+            elif key == "image_ids":
+                _sync_associations(db, BlogPostImage, BlogPostImage.image_id, Image, blog_post_id, value)
             else:
                 setattr(db_blog_post, key, value)
+        if "title" in update_data or "content" in update_data:
+            blog_post_search_service.index_blog_post(db, blog_post_id, db_blog_post.title, db_blog_post.content)
         db.commit()
-        db.refresh(db_blog_post)
+        db_blog_post = _query_blog_posts(db).populate_existing().filter(BlogPost.id == blog_post_id).first()
     return db_blog_post
 
 def delete_blog_post(db: Session, blog_post_id: str):
     db_blog_post = db.query(BlogPost).filter(BlogPost.id == blog_post_id).first()
     if db_blog_post:
-        db.delete(db_blog_post)
+        blog_post_search_service.remove_blog_post(db, blog_post_id)
+        db.execute(delete(BlogPostTag).where(BlogPostTag.blog_post_id == blog_post_id))
+        db.execute(delete(BlogPostImage).where(BlogPostImage.blog_post_id == blog_post_id))
+        db.execute(delete(BlogPost).where(BlogPost.id == blog_post_id))
         db.commit()
     return db_blog_post
\ No newline at end of file
@@ -1,41 +1,26 @@
 from sqlalchemy.orm import Session
-from models import Category, CategoryCreate, CategoryUpdate
-from typing import List, Optional
-import uuid
-from datetime import datetime
+from models import Category, CategoryCreate, CategoryInDB, CategoryUpdate
+from cache import ReferenceSnapshot
+from config import settings
+from services import reference_service
+from typing import Optional
+
+category_snapshot = ReferenceSnapshot(Category, CategoryInDB, settings.reference_cache_ttl_seconds)
 
 def create_category(db: Session, category: CategoryCreate):
-    db_category = Category(
-        id=str(uuid.uuid4()),
-        name=category.name,
-        description=category.description,
-    )
-    db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
-    return db_category
+    return reference_service.create(db, category_snapshot, {"name": category.name, "description": category.description})
 
 def get_category(db: Session, category_id: str):
-    return db.query(Category).filter(Category.id == category_id).first()
+    return reference_service.get(db, category_snapshot, category_id)
 
 def get_category_by_name(db: Session, name: str):
-    return db.query(Category).filter(Category.name == name).first()
+    return category_snapshot.get_by_name(db, name)
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Category).offset(skip).limit(limit).all()
+def get_categories(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return reference_service.get_page(db, category_snapshot, skip=skip, limit=limit, cursor=cursor)
 
 def update_category(db: Session, category_id: str, category: CategoryUpdate):
-    db_category = db.query(Category).filter(Category.id == category_id).first()
-    if db_category:
-        for key, value in category.dict(exclude_unset=True).items():
-            setattr(db_category, key, value)
-        db.commit()
-        db.refresh(db_category)
-    return db_category
+    return reference_service.update(db, category_snapshot, category_id, category.dict(exclude_unset=True))
 
 def delete_category(db: Session, category_id: str):
-    db_category = db.query(Category).filter(Category.id == category_id).first()
-    if db_category:
-        db.delete(db_category)
-        db.commit()
-    return db_category
\ No newline at end of file
+    return reference_service.delete(db, category_snapshot, category_id)
@@ -1,18 +1,40 @@
+import hashlib
 import os
+import time
 import uuid
-from typing import List
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Set, Tuple
 
-from fastapi import UploadFile, HTTPException, status
+from fastapi import HTTPException, status
+from PIL import Image as PILImage
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 
-from models import ImageCreate, ImageInDB
-from database import get_db
+from db_types import new_id
+from models import ImageCreate, ImageInDB, ImageUpload, ImageUploadCreate, ImageVariant
+from database import get_db, open_session, run_db
 from models import Image as DBImage
+from pagination import paginate
+from config import settings
+from storage import StorageBackend, create_storage_backend, sharded_key
 
-UPLOAD_DIRECTORY = "static/images"
-
-# Ensure the upload directory exists
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+# Where finished image files are kept; Image.file_path holds their storage key
+storage: StorageBackend = create_storage_backend()
+# Uploads are staged here until complete, outside the public static directory
+UPLOAD_SESSION_DIRECTORY = "tmp/image_uploads"
+UPLOAD_OFFSET_HEADER = "Upload-Offset"
+# Formats accepted for upload, as Pillow names them, with the content type and extension they are stored under
+IMAGE_FORMATS = {
+    "PNG": ("image/png", ".png"),
+    "JPEG": ("image/jpeg", ".jpg"),
+    "GIF": ("image/gif", ".gif"),
+    "WEBP": ("image/webp", ".webp"),
+}
+# Stored files with any other content type are only served as attachments
+INLINE_CONTENT_TYPES = frozenset(content_type for content_type, _ in IMAGE_FORMATS.values())
 
 def create_image(db: Session, image: ImageCreate) -> DBImage:
     db_image = DBImage(**image.dict())
@@ -24,31 +46,368 @@ def create_image(db: Session, image: ImageCreate) -> DBImage:
 def get_image(db: Session, image_id: str) -> DBImage:
     return db.query(DBImage).filter(DBImage.id == image_id).first()
 
-def get_images(db: Session, skip: int = 0, limit: int = 100) -> List[DBImage]:
-    return db.query(DBImage).offset(skip).limit(limit).all()
+def get_images(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[DBImage]:
+    return paginate(db.query(DBImage), DBImage, skip=skip, limit=limit, cursor=cursor).all()
+
+def delete_image(db: Session, image_id: str) -> Optional[List[str]]:
+    """Deletes an image and its variants; returns the storage keys of their files, or None if not found.
 
-def delete_image(db: Session, image_id: str):
+    The files are left for the caller to remove with delete_stored_files, off the request path.
+    """
     db_image = db.query(DBImage).filter(DBImage.id == image_id).first()
-    if db_image:
-        # Delete the file from the filesystem
-        if os.path.exists(db_image.file_path):
-            os.remove(db_image.file_path)
-        db.delete(db_image)
+    if db_image is None:
+        return None
+    keys = [key for key in [db_image.file_path, *(variant.file_path for variant in db_image.variants)] if key]
+    db.delete(db_image)
+    db.commit()
+    return keys
+
+def referenced_keys(db: Session, keys: List[str]) -> Set[str]:
+    """The given storage keys that an image or variant row still points at."""
+    return set(db.scalars(
+        select(DBImage.file_path).where(DBImage.file_path.in_(keys))
+        .union(select(ImageVariant.file_path).where(ImageVariant.file_path.in_(keys)))
+    ))
+
+async def delete_stored_files(get_session, keys: List[str]):
+    """Background task that removes the files of a deleted image.
+
+    Keys are derived from the content hash, so if the same content was uploaded
+    again since the delete committed, the new row owns the file and it is kept.
+    """
+    async with open_session(get_session) as db:
+        in_use = await run_db(db, referenced_keys, keys)
+    for key in keys:
+        if key not in in_use:
+            await storage.delete(key)
+
+def get_image_by_hash(db: Session, content_hash: str) -> Optional[DBImage]:
+    return db.query(DBImage).filter(DBImage.content_hash == content_hash).first()
+
+def create_uploaded_image(db: Session, content_hash: str, file_path: str, url: str, content_type: Optional[str], size: int) -> DBImage:
+    """Records an uploaded file, returning the existing row if the same content was stored concurrently."""
+    db_image = DBImage(id=new_id(), url=url, file_path=file_path, content_hash=content_hash, content_type=content_type, size=size)
+    db.add(db_image)
+    try:
         db.commit()
+    except IntegrityError:
+        db.rollback()
+        return get_image_by_hash(db, content_hash)
+    db.refresh(db_image)
+    return db_image
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+def _too_large() -> HTTPException:
+    max_bytes = settings.image_upload_max_bytes
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Image exceeds {max_bytes} bytes")
+
+def _open_staging_file(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(path, "wb")
+
+def _discard(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+def detect_image_format(path: str) -> Tuple[str, str]:
+    """Identifies a received file by decoding it with Pillow; returns its content type and file extension.
+
+    The type the client declared is never trusted, so a file that is not one
+    of IMAGE_FORMATS is rejected with 415.
+    """
+    try:
+        with PILImage.open(path, formats=list(IMAGE_FORMATS)) as image:
+            image.verify()
+            return IMAGE_FORMATS[image.format]
+    except Exception:
+        # Pillow raises a range of errors for files it cannot read, from UnidentifiedImageError to SyntaxError
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported image; expected one of {', '.join(IMAGE_FORMATS)}",
+        )
+
+async def _store_file(db: Session, temp_path: str, content_hash: str, size: int) -> DBImage:
+    """Moves a fully received image into place under its content hash, or returns the Image already holding that content."""
+    content_type, file_extension = await run_in_threadpool(detect_image_format, temp_path)
+    db_image = await run_db(db, get_image_by_hash, content_hash)
+    if db_image is None:
+        key = sharded_key(f"{content_hash}{file_extension}")
+        await storage.save(key, temp_path)
+        db_image = await run_db(
+            db, create_uploaded_image,
+            content_hash=content_hash, file_path=key, url=storage.url(key),
+            content_type=content_type, size=size,
+        )
     return db_image
 
-async def upload_image(db: Session, file: UploadFile) -> ImageInDB:
+async def upload_image(db: Session, chunks: AsyncIterator[bytes]) -> ImageInDB:
+    """Stores an uploaded image under its SHA-256 content hash while its bytes arrive.
+
+    Chunks are buffered up to IMAGE_UPLOAD_CHUNK_SIZE, then hashed and written
+    in the threadpool. The upload is aborted as soon as it exceeds the size
+    limit, and content that is already stored returns the existing Image
+    instead of a duplicate file.
+    """
+    max_bytes = settings.image_upload_max_bytes
+    temp_path = os.path.join(UPLOAD_SESSION_DIRECTORY, f"{uuid.uuid4()}.part")
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        pending = bytearray()
+        buffer = await run_in_threadpool(_open_staging_file, temp_path)
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large()
+                pending += chunk
+                if len(pending) >= settings.image_upload_chunk_size:
+                    await run_in_threadpool(_write_chunk, buffer, digest, pending)
+                    pending = bytearray()
+            if pending:
+                await run_in_threadpool(_write_chunk, buffer, digest, pending)
+        finally:
+            await run_in_threadpool(buffer.close)
+
+        db_image = await _store_file(db, temp_path, digest.hexdigest(), size)
+        return ImageInDB.model_validate(db_image)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not upload image: {e}")
+    finally:
+        await run_in_threadpool(_discard, temp_path)
+
+
+# Files written before storage backends were introduced sit in one flat
+# directory. Rows from before uploads were content-addressed only have their
+# public URL; later ones reference the file by path. These move them into storage.
+LEGACY_URL_PREFIX = "/static/images/"
+
+def get_legacy_rows(db: Session, model, legacy_directory: str, after_id: str, limit: int) -> List:
+    prefix = legacy_directory.rstrip("/") + "/"
+    legacy = model.file_path.startswith(prefix)
+    if model is DBImage:
+        legacy = or_(legacy, and_(model.file_path.is_(None), model.url.startswith(LEGACY_URL_PREFIX)))
+    return db.query(model).filter(legacy, model.id > after_id).order_by(model.id).limit(limit).all()
+
+def legacy_file_path(image: DBImage, legacy_directory: str) -> str:
+    """Where the file of a legacy image row is on disk."""
+    if image.file_path:
+        return image.file_path
+    return os.path.join(legacy_directory, os.path.basename(image.url[len(LEGACY_URL_PREFIX):]))
+
+def relocate_row(db: Session, model, row_id: str, values: dict):
+    db.execute(update(model).where(model.id == row_id).values(**values))
+    db.commit()
+
+def _legacy_file_info(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        while chunk := source.read(settings.image_upload_chunk_size):
+            digest.update(chunk)
+    try:
+        content_type, _ = detect_image_format(path)
+    except HTTPException:
+        # Kept, but only ever served as an attachment
+        content_type = "application/octet-stream"
+    return digest.hexdigest(), content_type, os.path.getsize(path)
+
+async def migrate_legacy_files(db: Session, legacy_directory: str, batch_size: int = 100) -> int:
+    """Moves files referenced by legacy rows into the storage backend under sharded keys; returns how many moved.
+
+    The rows' content hash, type and size are filled in from the files.
+    """
+    moved = 0
+    after_id = ""
+    while images := await run_db(db, get_legacy_rows, DBImage, legacy_directory, after_id, batch_size):
+        for image in images:
+            after_id = image.id
+            path = legacy_file_path(image, legacy_directory)
+            if not await run_in_threadpool(os.path.isfile, path):
+                continue
+            content_hash, content_type, size = await run_in_threadpool(_legacy_file_info, path)
+            extension = os.path.splitext(path)[1].lower()
+            holder = await run_db(db, get_image_by_hash, content_hash)
+            if holder is not None and holder.id != image.id:
+                # Duplicate content from before uploads were deduplicated keeps its own name
+                content_hash, key = image.content_hash, sharded_key(os.path.basename(path))
+            else:
+                key = sharded_key(f"{content_hash}{extension}")
+            await storage.save(key, path)
+            values = {"file_path": key, "url": storage.url(key), "content_hash": content_hash, "content_type": content_type, "size": size}
+            await run_db(db, relocate_row, DBImage, image.id, values)
+            moved += 1
+    after_id = ""
+    while variants := await run_db(db, get_legacy_rows, ImageVariant, legacy_directory, after_id, batch_size):
+        for variant in variants:
+            after_id = variant.id
+            if not await run_in_threadpool(os.path.isfile, variant.file_path):
+                continue
+            key = sharded_key(os.path.basename(variant.file_path), prefix="variants/")
+            await storage.save(key, variant.file_path)
+            await run_db(db, relocate_row, ImageVariant, variant.id, {"file_path": key})
+            moved += 1
+    return moved
+
+# Resumable uploads: a session is created with the total size, chunks are
+# appended at the current offset, and completing it stores the file like a
+# regular upload. Received bytes survive dropped connections until expiry.
+
+def _upload_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIRECTORY, f"{upload_id}.part")
+
+def _upload_expiry() -> datetime:
+    return datetime.now() + timedelta(seconds=settings.image_upload_session_ttl_seconds)
+
+def create_upload_session(db: Session, upload: ImageUploadCreate, user_id: str) -> ImageUpload:
+    db_upload = ImageUpload(id=new_id(), user_id=user_id, **upload.model_dump(), offset=0, expires_at=_upload_expiry())
+    db.add(db_upload)
+    db.commit()
+    db.refresh(db_upload)
+    return db_upload
+
+def get_upload_session(db: Session, upload_id: str, user_id: str) -> Optional[ImageUpload]:
+    return db.query(ImageUpload).filter(
+        ImageUpload.id == upload_id, ImageUpload.user_id == user_id, ImageUpload.expires_at > datetime.now()
+    ).populate_existing().first()
+
+def advance_upload_session(db: Session, upload_id: str, offset: int, new_offset: int) -> bool:
+    """Moves the offset forward only if no other request advanced it meanwhile."""
+    updated = db.execute(
+        update(ImageUpload)
+        .where(ImageUpload.id == upload_id, ImageUpload.offset == offset)
+        .values({ImageUpload.offset: new_offset, ImageUpload.expires_at: _upload_expiry(), ImageUpload.updated_at: datetime.now()})
+    )
+    db.commit()
+    return updated.rowcount == 1
+
+def claim_upload_session(db: Session, upload_id: str) -> bool:
+    """Deletes the session row; only the request that deletes it may finish or discard its file."""
+    deleted = db.execute(delete(ImageUpload).where(ImageUpload.id == upload_id))
+    db.commit()
+    return deleted.rowcount == 1
+
+def purge_expired_upload_sessions(db: Session) -> List[str]:
+    expired_ids = list(db.scalars(select(ImageUpload.id).where(ImageUpload.expires_at <= datetime.now())))
+    if expired_ids:
+        db.execute(delete(ImageUpload).where(ImageUpload.id.in_(expired_ids)))
+        db.commit()
+    return expired_ids
+
+def _remove_stale_upload_files(upload_ids: List[str]):
+    for upload_id in upload_ids:
+        _discard(_upload_path(upload_id))
+    if not os.path.isdir(UPLOAD_SESSION_DIRECTORY):
+        return
+    # Files orphaned by a crash between writing and committing are swept by age
+    cutoff = time.time() - settings.image_upload_session_ttl_seconds
+    with os.scandir(UPLOAD_SESSION_DIRECTORY) as entries:
+        for entry in entries:
+            if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+                _discard(entry.path)
+
+async def collect_expired_uploads(get_session):
+    """Background task that deletes expired upload sessions and their partial files."""
+    async with open_session(get_session) as db:
+        expired_ids = await run_db(db, purge_expired_upload_sessions)
+    await run_in_threadpool(_remove_stale_upload_files, expired_ids)
+
+def _upload_not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+def _offset_conflict(offset: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Upload is at offset {offset}",
+        headers={UPLOAD_OFFSET_HEADER: str(offset)},
+    )
+
+async def start_upload(db: Session, upload: ImageUploadCreate, user_id: str) -> ImageUpload:
+    if upload.size > settings.image_upload_max_bytes:
+        raise _too_large()
+    db_upload = await run_db(db, create_upload_session, upload, user_id)
+    staged = await run_in_threadpool(_open_staging_file, _upload_path(db_upload.id))
+    await run_in_threadpool(staged.close)
+    return db_upload
+
+async def get_upload(db: Session, upload_id: str, user_id: str) -> ImageUpload:
+    db_upload = await run_db(db, get_upload_session, upload_id, user_id)
+    if db_upload is None:
+        raise _upload_not_found()
+    return db_upload
+
+async def append_upload_chunk(db: Session, upload_id: str, user_id: str, offset: int, chunks: AsyncIterator[bytes]) -> ImageUpload:
+    """Writes a request body into the upload at the given offset.
+
+    The body is buffered up to IMAGE_UPLOAD_CHUNK_SIZE before each write. If
+    the client disconnects midway, the bytes that did arrive are kept and
+    the offset advanced, so the client resumes from there.
+    """
+    db_upload = await get_upload(db, upload_id, user_id)
+    if offset != db_upload.offset:
+        raise _offset_conflict(db_upload.offset)
+    received = offset
+    pending = bytearray()
+    target = await run_in_threadpool(open, _upload_path(upload_id), "r+b")
     try:
-        file_extension = file.filename.split(".")[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
+        await run_in_threadpool(target.seek, offset)
+        try:
+            async for chunk in chunks:
+                if received + len(pending) + len(chunk) > db_upload.size:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Chunk extends past the declared size of {db_upload.size} bytes")
+                pending += chunk
+                if len(pending) >= settings.image_upload_chunk_size:
+                    await run_in_threadpool(target.write, pending)
+                    received += len(pending)
+                    pending = bytearray()
+        except ClientDisconnect:
+            pass
+        if pending:
+            await run_in_threadpool(target.write, pending)
+            received += len(pending)
+    finally:
+        await run_in_threadpool(target.close)
+    if received != offset and not await run_db(db, advance_upload_session, upload_id, offset, received):
+        raise _offset_conflict((await get_upload(db, upload_id, user_id)).offset)
+    return await get_upload(db, upload_id, user_id)
 
-        with open(file_path, "wb") as buffer:
-            while content := await file.read(1024):
-                buffer.write(content)
+def _hash_file(path: str, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "r+b") as source:
+        source.truncate(size)
+        while chunk := source.read(settings.image_upload_chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        image_create = ImageCreate(filename=unique_filename, file_path=file_path, url=f"/{UPLOAD_DIRECTORY}/{unique_filename}")
-        db_image = create_image(db, image_create)
-        return ImageInDB.from_orm(db_image)
+async def complete_upload(db: Session, upload_id: str, user_id: str) -> ImageInDB:
+    """Turns a fully received upload into an Image, deduplicated by content hash."""
+    db_upload = await get_upload(db, upload_id, user_id)
+    if db_upload.offset != db_upload.size:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is incomplete: {db_upload.offset} of {db_upload.size} bytes received",
+            headers={UPLOAD_OFFSET_HEADER: str(db_upload.offset)},
+        )
+    if not await run_db(db, claim_upload_session, upload_id):
+        raise _upload_not_found()
+    temp_path = _upload_path(upload_id)
+    try:
+        content_hash = await run_in_threadpool(_hash_file, temp_path, db_upload.size)
+        db_image = await _store_file(db, temp_path, content_hash, db_upload.size)
+        return ImageInDB.model_validate(db_image)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not upload image: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not upload image: {e}")
+    finally:
+        await run_in_threadpool(_discard, temp_path)
+
+async def cancel_upload(db: Session, upload_id: str, user_id: str):
+    await get_upload(db, upload_id, user_id)
+    if not await run_db(db, claim_upload_session, upload_id):
+        raise _upload_not_found()
+    await run_in_threadpool(_discard, _upload_path(upload_id))
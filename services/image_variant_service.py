@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from database import open_session, run_db
+from models import Image as DBImage, ImageVariant
+from services import image_service
+from storage import sharded_key
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+VARIANT_WIDTHS = (128, 256, 512, 1024, 2048)
+# Built in the background after every upload; other widths are rendered on first request
+EAGER_VARIANTS = ("128.webp", "512.webp", "1024.jpeg")
+QUALITY = 82
+
+# Resizing is CPU bound and holds the GIL, so it runs in separate processes
+variant_pool = ProcessPoolExecutor(max_workers=settings.image_variant_workers)
+
+# Renders currently running in this worker, so concurrent requests share one
+_in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+def parse_variant(name: str) -> Tuple[int, str]:
+    """Splits a variant name like "512.webp" into its width and format."""
+    width, _, image_format = name.partition(".")
+    if not width.isdigit() or int(width) not in VARIANT_WIDTHS or image_format not in VARIANT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown variant; expected <width>.<format> with width in {list(VARIANT_WIDTHS)} and format in {list(VARIANT_FORMATS)}",
+        )
+    return int(width), image_format
+
+def render_variant(source_path: str, target_path: str, width: int, image_format: str) -> Tuple[int, int, int]:
+    """Writes a copy of the source scaled down to the given width; returns (width, height, size).
+
+    Runs in the process pool. Images narrower than the width are re-encoded, never upscaled.
+    """
+    with PILImage.open(source_path) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.width > width:
+            image = image.resize((width, max(round(image.height * width / image.width), 1)), PILImage.LANCZOS)
+        if image_format == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        image.save(target_path, format=image_format.upper(), quality=QUALITY)
+        return image.width, image.height, os.path.getsize(target_path)
+
+def get_variant(db: Session, image_id: str, name: str) -> Optional[ImageVariant]:
+    return db.query(ImageVariant).filter(ImageVariant.image_id == image_id, ImageVariant.name == name).first()
+
+def record_variant(db: Session, image_id: str, name: str, file_path: str, content_type: str, width: int, height: int, size: int) -> ImageVariant:
+    """Stores a rendered variant, returning the existing row if another worker recorded it first."""
+    variant = ImageVariant(image_id=image_id, name=name, file_path=file_path, content_type=content_type, width=width, height=height, size=size)
+    db.add(variant)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return get_variant(db, image_id, name)
+    db.refresh(variant)
+    return variant
+
+def variant_key(image: DBImage, width: int, image_format: str) -> str:
+    return sharded_key(f"{image.content_hash or image.id}-{width}.{image_format}", prefix="variants/")
+
+def _discard(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+async def _build_variant(source_key: str, key: str, width: int, image_format: str) -> Tuple[int, int, int]:
+    staged_path = os.path.join(image_service.UPLOAD_SESSION_DIRECTORY, f"{uuid.uuid4()}.{image_format}")
+    loop = asyncio.get_running_loop()
+    try:
+        async with image_service.storage.local_file(source_key) as source_path:
+            rendered = await loop.run_in_executor(variant_pool, render_variant, source_path, staged_path, width, image_format)
+        await image_service.storage.save(key, staged_path)
+        return rendered
+    finally:
+        await run_in_threadpool(_discard, staged_path)
+
+async def get_or_create_variant(db: Session, image: DBImage, name: str) -> ImageVariant:
+    """Returns the named variant of an image, rendering it in the process pool if it is not built yet."""
+    width, image_format = parse_variant(name)
+    variant = await run_db(db, get_variant, image.id, name)
+    if variant is not None:
+        return variant
+    in_flight_key = (image.id, name)
+    key = variant_key(image, width, image_format)
+    render = _in_flight.get(in_flight_key)
+    if render is None:
+        render = asyncio.ensure_future(_build_variant(image.file_path, key, width, image_format))
+        _in_flight[in_flight_key] = render
+        render.add_done_callback(lambda _: _in_flight.pop(in_flight_key, None))
+    try:
+        rendered_width, rendered_height, size = await asyncio.shield(render)
+    except (UnidentifiedImageError, OSError) as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Could not render variant: {e}")
+    return await run_db(
+        db, record_variant,
+        image_id=image.id, name=name, file_path=key, content_type=VARIANT_FORMATS[image_format],
+        width=rendered_width, height=rendered_height, size=size,
+    )
+
+async def generate_variants(get_session, image_id: str):
+    """Background task that builds the eager variants of a freshly uploaded image.
+
+    Takes the app's ``get_db`` dependency because the request session is
+    closed by the time background tasks run.
+    """
+    async with open_session(get_session) as db:
+        image = await run_db(db, image_service.get_image, image_id)
+        if image is None or not image.file_path:
+            return
+        for name in EAGER_VARIANTS:
+            try:
+                await get_or_create_variant(db, image, name)
+            except HTTPException as e:
+                logger.warning("Skipping variant %s of image %s: %s", name, image_id, e.detail)
+                return
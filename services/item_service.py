@@ -1,22 +1,46 @@
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from models import Item, ItemCreate, ItemUpdate
-from typing import List, Optional
-from uuid import uuid4
+from models import Item, ItemBatchUpdate, ItemCreate, ItemInDB, ItemUpdate
+from pagination import paginate
+from rows import bulk_insert, fetch_rows, schema_columns
+from services import search_service
+from typing import List, Optional, Set
+from datetime import datetime
+from operator import itemgetter
+from db_types import canonical_key, new_id, new_key
+
+SEARCH_ENTITY = "items"
 
 def create_item(db: Session, item: ItemCreate):
     """Create a new item in the database."""
-    db_item = Item(**item.model_dump(), id=str(uuid4()))
+    db_item = Item(**item.model_dump(), id=new_id())
     db.add(db_item)
+    search_service.index_document(db, SEARCH_ENTITY, db_item.id, db_item.name, replace=False)
     db.commit()
     db.refresh(db_item)
     return db_item
 
-def get_items(db: Session, skip: int = 0, limit: int = 100, name: Optional[str] = None):
-    """Retrieve a list of items from the database, with optional filtering by name."""
-    query = db.query(Item)
+ROW_COLUMNS = schema_columns(Item, ItemInDB)
+
+def _filter_items(query, name: Optional[str], cursor: Optional[str]):
     if name:
-        query = query.filter(Item.name.contains(name))
-    return query.offset(skip).limit(limit).all()
+        query = search_service.filter_contains(query, Item, Item.name, SEARCH_ENTITY, name)
+        if cursor is None:
+            query = search_service.order_by_relevance(query, Item, Item.name, name)
+    return query
+
+def get_items(db: Session, skip: int = 0, limit: int = 100, name: Optional[str] = None, cursor: Optional[str] = None):
+    """Retrieve a list of items from the database, with optional indexed substring filtering by name."""
+    return paginate(_filter_items(db.query(Item), name, cursor), Item, skip=skip, limit=limit, cursor=cursor).all()
+
+def get_item_rows(db: Session, skip: int = 0, limit: int = 100, name: Optional[str] = None, cursor: Optional[str] = None):
+    """Read-only get_items returning the ItemInDB columns as plain rows instead of ORM instances."""
+    return fetch_rows(db, paginate(_filter_items(select(*ROW_COLUMNS), name, cursor), Item, skip=skip, limit=limit, cursor=cursor))
+
+def export_statement(name: Optional[str] = None):
+    """Every item matching the list filters in (created_at, id) order, for streaming exports."""
+    # Any non-None cursor skips relevance ordering, which would defeat the index order
+    return _filter_items(select(*ROW_COLUMNS), name, cursor="").order_by(Item.created_at, Item.id)
 
 def get_item(db: Session, item_id: str):
     """Retrieve a single item by its ID from the database."""
@@ -26,8 +50,11 @@ def update_item(db: Session, item_id: str, item: ItemUpdate):
     """Update an existing item in the database."""
     db_item = db.query(Item).filter(Item.id == item_id).first()
     if db_item:
-        for key, value in item.model_dump(exclude_unset=True).items():
+        update_data = item.model_dump(exclude_unset=True)
+        for key, value in update_data.items():
             setattr(db_item, key, value)
+        if "name" in update_data:
+            search_service.index_document(db, SEARCH_ENTITY, db_item.id, db_item.name)
         db.commit()
         db.refresh(db_item)
     return db_item
@@ -36,6 +63,54 @@ def delete_item(db: Session, item_id: str):
     """Delete an item from the database."""
     db_item = db.query(Item).filter(Item.id == item_id).first()
     if db_item:
+        search_service.remove_document(db, SEARCH_ENTITY, db_item.id)
         db.delete(db_item)
         db.commit()
-    return db_item
\ No newline at end of file
+    return db_item
+
+def create_items(db: Session, items: List[ItemCreate]) -> List[str]:
+    """Create many items with one multi-row INSERT in a single transaction; returns their IDs."""
+    now = datetime.now()
+    rows = [{**item.model_dump(), "id": new_id(), "created_at": now, "updated_at": now} for item in items]
+    if rows:
+        db.execute(insert(Item), rows)
+        search_service.index_documents(db, SEARCH_ENTITY, [(row["id"], row["name"]) for row in rows], replace=False)
+        db.commit()
+    return [row["id"] for row in rows]
+
+def import_items(db: Session, items: List[dict], index_search: bool = True):
+    """Bulk-inserts already validated item fields in one transaction.
+
+    Rows go in primary key order through the driver's executemany. With
+    ``index_search=False`` the search index is left for rebuild_search_index.py.
+    """
+    rows = [{**item, "id": new_key()} for item in items]
+    rows.sort(key=itemgetter("id"))
+    now = datetime.now()
+    bulk_insert(db, Item, rows, created_at=now, updated_at=now)
+    if index_search:
+        search_service.index_new_documents(db, SEARCH_ENTITY, [(row["id"], row["name"]) for row in rows])
+    db.commit()
+
+def update_items(db: Session, items: List[ItemBatchUpdate]) -> Set[str]:
+    """Update many items by primary key in a single transaction; returns the IDs that existed."""
+    found_ids = set(db.scalars(select(Item.id).where(Item.id.in_([item.id for item in items]))))
+    now = datetime.now()
+    rows = [
+        {**item.model_dump(exclude_unset=True), "id": item.id, "updated_at": now}
+        for item in items if canonical_key(item.id) in found_ids
+    ]
+    if rows:
+        db.execute(update(Item), rows)
+        search_service.index_documents(db, SEARCH_ENTITY, [(row["id"], row["name"]) for row in rows if "name" in row])
+        db.commit()
+    return found_ids
+
+def delete_items(db: Session, item_ids: List[str]) -> Set[str]:
+    """Delete many items with one DELETE in a single transaction; returns the IDs that existed."""
+    found_ids = set(db.scalars(select(Item.id).where(Item.id.in_(item_ids))))
+    if found_ids:
+        search_service.remove_documents(db, SEARCH_ENTITY, list(found_ids))
+        db.execute(delete(Item).where(Item.id.in_(list(found_ids))))
+        db.commit()
+    return found_ids
@@ -0,0 +1,58 @@
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from cache import ReferenceSnapshot
+from db_types import canonical_key, new_id
+from pagination import paginate_sorted
+from typing import Optional
+
+# CRUD shared by the small named reference tables (categories, tags). Reads are
+# served from the table's ReferenceSnapshot, which every write refreshes.
+
+def _commit_name(db: Session, snapshot: ReferenceSnapshot):
+    """Commits a new or renamed row, turning a unique name violation into the usual 400.
+
+    The name check before writing reads the snapshot, which can be stale in
+    other workers and compares names less loosely than the database does.
+    """
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{snapshot.model.__name__} name already registered")
+
+def create(db: Session, snapshot: ReferenceSnapshot, fields: dict):
+    db_row = snapshot.model(id=new_id(), **fields)
+    db.add(db_row)
+    _commit_name(db, snapshot)
+    snapshot.refresh(db)
+    db.refresh(db_row)
+    return db_row
+
+def get(db: Session, snapshot: ReferenceSnapshot, row_id: str):
+    # The database matches any spelling of a UUID; the snapshot is keyed by the canonical one
+    return snapshot.get(db).by_id.get(canonical_key(row_id))
+
+def get_page(db: Session, snapshot: ReferenceSnapshot, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    current = snapshot.get(db)
+    return paginate_sorted(current.rows, current.keys, skip=skip, limit=limit, cursor=cursor)
+
+def update(db: Session, snapshot: ReferenceSnapshot, row_id: str, fields: dict):
+    model = snapshot.model
+    db_row = db.query(model).filter(model.id == row_id).first()
+    if db_row:
+        for key, value in fields.items():
+            setattr(db_row, key, value)
+        _commit_name(db, snapshot)
+        snapshot.refresh(db)
+        db.refresh(db_row)
+    return db_row
+
+def delete(db: Session, snapshot: ReferenceSnapshot, row_id: str):
+    model = snapshot.model
+    db_row = db.query(model).filter(model.id == row_id).first()
+    if db_row:
+        db.delete(db_row)
+        db.commit()
+        snapshot.refresh(db)
+    return db_row
@@ -0,0 +1,114 @@
+import unicodedata
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from models import SearchTrigram
+from rows import bulk_insert
+from typing import Iterable, List, Optional, Set, Tuple
+from operator import itemgetter
+
+TRIGRAM_LENGTH = 3
+
+def fold(text: str) -> str:
+    """Case and accent folded text, close to how MySQL's default utf8mb4_0900_ai_ci collation compares.
+
+    The trigram prefilter must keep every row that the LIKE filter matches
+    under that collation, so "cafe" has to find the trigrams of "Café".
+    """
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """Returns the set of case and accent folded trigrams contained in the given text."""
+    if not text:
+        return set()
+    text = fold(text)
+    return {text[i:i + TRIGRAM_LENGTH] for i in range(len(text) - TRIGRAM_LENGTH + 1)}
+
+def index_documents(db: Session, entity: str, documents: Iterable[Tuple[str, Optional[str]]], replace: bool = True):
+    """Indexes the trigrams of the given (id, text) documents. Does not commit.
+
+    Pass ``replace=False`` for freshly created rows to skip clearing old entries.
+    When an id appears more than once, its last text wins.
+    """
+    documents = dict(documents)
+    if not documents:
+        return
+    if replace:
+        remove_documents(db, entity, list(documents))
+    rows = [
+        {"entity": entity, "trigram": trigram, "entity_id": entity_id}
+        for entity_id, text in documents.items()
+        for trigram in trigrams(text)
+    ]
+    if rows:
+        db.execute(insert(SearchTrigram), rows)
+
+def index_document(db: Session, entity: str, entity_id: str, text: Optional[str], replace: bool = True):
+    """Indexes the trigrams of a single document. Does not commit."""
+    index_documents(db, entity, [(entity_id, text)], replace=replace)
+
+def index_new_documents(db: Session, entity: str, documents: Iterable[Tuple[str, Optional[str]]]):
+    """index_documents for a large batch of freshly created rows, through the bulk insert path.
+
+    Entries are written in primary key order so they land on neighbouring index pages. Does not commit.
+    """
+    rows = [
+        {"entity": entity, "trigram": trigram, "entity_id": entity_id}
+        for entity_id, text in documents
+        for trigram in trigrams(text)
+    ]
+    rows.sort(key=itemgetter("trigram", "entity_id"))
+    bulk_insert(db, SearchTrigram, rows)
+
+def remove_documents(db: Session, entity: str, entity_ids: List[str]):
+    """Drops the given documents from the index. Does not commit."""
+    if entity_ids:
+        db.execute(delete(SearchTrigram).where(SearchTrigram.entity == entity, SearchTrigram.entity_id.in_(entity_ids)))
+
+def remove_document(db: Session, entity: str, entity_id: str):
+    """Drops a single document from the index. Does not commit."""
+    remove_documents(db, entity, [entity_id])
+
+def filter_contains(query, model, column, entity: str, term: str):
+    """Filters a query to rows whose column contains the term.
+
+    Candidates are narrowed through the trigram index, so only rows holding
+    every trigram of the term are checked against the LIKE predicate. Terms
+    shorter than a trigram fall back to the plain LIKE filter.
+    """
+    candidates = candidate_ids(entity, term)
+    if candidates is not None:
+        query = query.filter(model.id.in_(candidates))
+    return query.filter(column.contains(term))
+
+def candidate_ids(entity: str, term: str):
+    """A select of the ids whose indexed text holds every trigram of the term, or None for terms too short to narrow."""
+    term_trigrams = trigrams(term)
+    if not term_trigrams:
+        return None
+    return (
+        select(SearchTrigram.entity_id)
+        .where(SearchTrigram.entity == entity, SearchTrigram.trigram.in_(term_trigrams))
+        .group_by(SearchTrigram.entity_id)
+        .having(func.count() == len(term_trigrams))
+    )
+
+def order_by_relevance(query, model, column, term: str):
+    """Ranks matches so shorter values and earlier occurrences of the term come first."""
+    return query.order_by(func.length(column), func.instr(func.lower(column), term.lower()), model.created_at, model.id)
+
+def rebuild_index(db: Session, entity: str, model, column, batch_size: int = 1000):
+    """Re-indexes every row of a table, committing once per batch."""
+    db.execute(delete(SearchTrigram).where(SearchTrigram.entity == entity))
+    last_id = ""
+    while True:
+        rows = db.execute(select(model.id, column).where(model.id > last_id).order_by(model.id).limit(batch_size)).all()
+        if not rows:
+            break
+        index_documents(db, entity, rows, replace=False)
+        db.commit()
+        last_id = rows[-1][0]
+    db.commit()
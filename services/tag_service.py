@@ -1,40 +1,26 @@
 from sqlalchemy.orm import Session
-from models import Tag, TagCreate, TagUpdate
-from typing import List, Optional
-import uuid
-from datetime import datetime
+from models import Tag, TagCreate, TagInDB, TagUpdate
+from cache import ReferenceSnapshot
+from config import settings
+from services import reference_service
+from typing import Optional
+
+tag_snapshot = ReferenceSnapshot(Tag, TagInDB, settings.reference_cache_ttl_seconds)
 
 def create_tag(db: Session, tag: TagCreate):
-    db_tag = Tag(
-        id=str(uuid.uuid4()),
-        name=tag.name,
-    )
-    db.add(db_tag)
-    db.commit()
-    db.refresh(db_tag)
-    return db_tag
+    return reference_service.create(db, tag_snapshot, {"name": tag.name})
 
 def get_tag(db: Session, tag_id: str):
-    return db.query(Tag).filter(Tag.id == tag_id).first()
+    return reference_service.get(db, tag_snapshot, tag_id)
 
 def get_tag_by_name(db: Session, name: str):
-    return db.query(Tag).filter(Tag.name == name).first()
+    return tag_snapshot.get_by_name(db, name)
 
-def get_tags(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Tag).offset(skip).limit(limit).all()
+def get_tags(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return reference_service.get_page(db, tag_snapshot, skip=skip, limit=limit, cursor=cursor)
 
 def update_tag(db: Session, tag_id: str, tag: TagUpdate):
-    db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if db_tag:
-        for key, value in tag.dict(exclude_unset=True).items():
-            setattr(db_tag, key, value)
-        db.commit()
-        db.refresh(db_tag)
-    return db_tag
+    return reference_service.update(db, tag_snapshot, tag_id, tag.dict(exclude_unset=True))
 
 def delete_tag(db: Session, tag_id: str):
-    db_tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if db_tag:
-        db.delete(db_tag)
-        db.commit()
-    return db_tag
\ No newline at end of file
+    return reference_service.delete(db, tag_snapshot, tag_id)
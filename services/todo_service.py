@@ -0,0 +1,120 @@
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from models import Todo, TodoBatchUpdate, TodoCreate, TodoInDB, TodoUpdate
+from pagination import paginate
+from rows import bulk_insert, fetch_rows, schema_columns
+from services import search_service
+from typing import List, Optional, Set
+from datetime import datetime
+from operator import itemgetter
+from db_types import canonical_key, new_id, new_key
+
+SEARCH_ENTITY = "todos"
+
+def create_todo(db: Session, todo: TodoCreate):
+    """Create a new todo in the database."""
+    db_todo = Todo(**todo.model_dump(), id=new_id())
+    db.add(db_todo)
+    search_service.index_document(db, SEARCH_ENTITY, db_todo.id, db_todo.title, replace=False)
+    db.commit()
+    db.refresh(db_todo)
+    return db_todo
+
+ROW_COLUMNS = schema_columns(Todo, TodoInDB)
+
+def _filter_todos(query, title: Optional[str], completed: Optional[bool], cursor: Optional[str]):
+    if title:
+        query = search_service.filter_contains(query, Todo, Todo.title, SEARCH_ENTITY, title)
+        if cursor is None:
+            query = search_service.order_by_relevance(query, Todo, Todo.title, title)
+    if completed is not None:
+        query = query.filter(Todo.completed == completed)
+    return query
+
+def get_todos(db: Session, skip: int = 0, limit: int = 100, title: Optional[str] = None, completed: Optional[bool] = None, cursor: Optional[str] = None):
+    """Retrieve a list of todos, with optional filtering by title and completion status."""
+    query = _filter_todos(db.query(Todo), title, completed, cursor)
+    return paginate(query, Todo, skip=skip, limit=limit, cursor=cursor).all()
+
+def get_todo_rows(db: Session, skip: int = 0, limit: int = 100, title: Optional[str] = None, completed: Optional[bool] = None, cursor: Optional[str] = None):
+    """Read-only get_todos returning the TodoInDB columns as plain rows instead of ORM instances."""
+    statement = _filter_todos(select(*ROW_COLUMNS), title, completed, cursor)
+    return fetch_rows(db, paginate(statement, Todo, skip=skip, limit=limit, cursor=cursor))
+
+def export_statement(title: Optional[str] = None, completed: Optional[bool] = None):
+    """Every todo matching the list filters in (created_at, id) order, for streaming exports."""
+    # Any non-None cursor skips relevance ordering, which would defeat the index order
+    return _filter_todos(select(*ROW_COLUMNS), title, completed, cursor="").order_by(Todo.created_at, Todo.id)
+
+def get_todo(db: Session, todo_id: str):
+    """Retrieve a single todo by its ID from the database."""
+    return db.query(Todo).filter(Todo.id == todo_id).first()
+
+def update_todo(db: Session, todo_id: str, todo: TodoUpdate):
+    """Update an existing todo in the database."""
+    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    if db_todo:
+        update_data = todo.model_dump(exclude_unset=True)
+        for key, value in update_data.items():
+            setattr(db_todo, key, value)
+        if "title" in update_data:
+            search_service.index_document(db, SEARCH_ENTITY, db_todo.id, db_todo.title)
+        db.commit()
+        db.refresh(db_todo)
+    return db_todo
+
+def delete_todo(db: Session, todo_id: str):
+    """Delete a todo from the database."""
+    db_todo = db.query(Todo).filter(Todo.id == todo_id).first()
+    if db_todo:
+        search_service.remove_document(db, SEARCH_ENTITY, db_todo.id)
+        db.delete(db_todo)
+        db.commit()
+    return db_todo
+
+def create_todos(db: Session, todos: List[TodoCreate]) -> List[str]:
+    """Create many todos with one multi-row INSERT in a single transaction; returns their IDs."""
+    now = datetime.now()
+    rows = [{**todo.model_dump(), "id": new_id(), "created_at": now, "updated_at": now} for todo in todos]
+    if rows:
+        db.execute(insert(Todo), rows)
+        search_service.index_documents(db, SEARCH_ENTITY, [(row["id"], row["title"]) for row in rows], replace=False)
+        db.commit()
+    return [row["id"] for row in rows]
+
+def import_todos(db: Session, todos: List[dict], index_search: bool = True):
+    """Bulk-inserts already validated todo fields in one transaction.
+
+    Rows go in primary key order through the driver's executemany. With
+    ``index_search=False`` the search index is left for rebuild_search_index.py.
+    """
+    rows = [{**todo, "id": new_key()} for todo in todos]
+    rows.sort(key=itemgetter("id"))
+    now = datetime.now()
+    bulk_insert(db, Todo, rows, created_at=now, updated_at=now)
+    if index_search:
+        search_service.index_new_documents(db, SEARCH_ENTITY, [(row["id"], row["title"]) for row in rows])
+    db.commit()
+
+def update_todos(db: Session, todos: List[TodoBatchUpdate]) -> Set[str]:
+    """Update many todos by primary key in a single transaction; returns the IDs that existed."""
+    found_ids = set(db.scalars(select(Todo.id).where(Todo.id.in_([todo.id for todo in todos]))))
+    now = datetime.now()
+    rows = [
+        {**todo.model_dump(exclude_unset=True), "id": todo.id, "updated_at": now}
+        for todo in todos if canonical_key(todo.id) in found_ids
+    ]
+    if rows:
+        db.execute(update(Todo), rows)
+        search_service.index_documents(db, SEARCH_ENTITY, [(row["id"], row["title"]) for row in rows if "title" in row])
+        db.commit()
+    return found_ids
+
+def delete_todos(db: Session, todo_ids: List[str]) -> Set[str]:
+    """Delete many todos with one DELETE in a single transaction; returns the IDs that existed."""
+    found_ids = set(db.scalars(select(Todo.id).where(Todo.id.in_(todo_ids))))
+    if found_ids:
+        search_service.remove_documents(db, SEARCH_ENTITY, list(found_ids))
+        db.execute(delete(Todo).where(Todo.id.in_(list(found_ids))))
+        db.commit()
+    return found_ids
@@ -1,23 +1,21 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from models import User, UserCreate, UserUpdate
-from uuid import uuid4
-from passlib.context import CryptContext
+from models import User, UserCreate, UserInDB, UserUpdate
+from pagination import paginate
+from rows import fetch_rows, schema_columns
+from cache import principal_cache
+from db_types import new_id
+from security import get_password_hash
 from typing import Optional, List
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    """Creates a new user in the database.
 
-def get_password_hash(password: str) -> str:
-    """Hashes the given password using bcrypt."""
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifies a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def create_user(db: Session, user: UserCreate) -> User:
-    """Creates a new user in the database."""
-    hashed_password = get_password_hash(user.password)
-    db_user = User(**user.model_dump(exclude={'password'}), hashed_password=hashed_password, id=str(uuid4()))
+    Pass a hashed_password computed off the event loop to skip hashing here.
+    """
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    db_user = User(**user.model_dump(exclude={'password'}), hashed_password=hashed_password, id=new_id())
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -35,28 +33,49 @@ def get_user(db: Session, user_id: str) -> Optional[User]:
     """Retrieves a user by their ID."""
     return db.query(User).filter(User.id == user_id).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[User]:
     """Retrieves a list of users from the database."""
-    return db.query(User).offset(skip).limit(limit).all()
+    return paginate(db.query(User), User, skip=skip, limit=limit, cursor=cursor).all()
+
+ROW_COLUMNS = schema_columns(User, UserInDB)
+
+def get_user_rows(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List:
+    """Read-only get_users returning the UserInDB columns as plain rows instead of ORM instances."""
+    return fetch_rows(db, paginate(select(*ROW_COLUMNS), User, skip=skip, limit=limit, cursor=cursor))
 
-def update_user(db: Session, user_id: str, user: UserUpdate) -> Optional[User]:
-    """Updates an existing user in the database."""
+def update_user(db: Session, user_id: str, user: UserUpdate, hashed_password: Optional[str] = None) -> Optional[User]:
+    """Updates an existing user in the database.
+
+    Pass a hashed_password computed off the event loop to skip hashing here.
+    """
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
+        username = db_user.username
         update_data = user.model_dump(exclude_unset=True)
         if "password" in update_data:
-            update_data["hashed_password"] = get_password_hash(update_data["password"])
+            update_data["hashed_password"] = hashed_password or get_password_hash(update_data["password"])
             del update_data["password"]
         for key, value in update_data.items():
             setattr(db_user, key, value)
         db.commit()
+        principal_cache.invalidate(username)
         db.refresh(db_user)
     return db_user
 
+def update_password_hash(db: Session, user_id: str, hashed_password: str) -> None:
+    """Replaces a user's password hash, e.g. after rehashing with new parameters."""
+    username = db.scalar(select(User.username).where(User.id == user_id))
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password}, synchronize_session=False)
+    db.commit()
+    if username is not None:
+        principal_cache.invalidate(username)
+
 def delete_user(db: Session, user_id: str) -> Optional[User]:
     """Deletes a user from the database."""
     db_user = db.query(User).filter(User.id == user_id).first()
     if db_user:
+        username = db_user.username
         db.delete(db_user)
         db.commit()
+        principal_cache.invalidate(username)
     return db_user
\ No newline at end of file
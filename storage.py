@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+def sharded_key(name: str, prefix: str = "") -> str:
+    """Fans names out over two levels of subdirectories taken from their first characters, e.g. ``ab/cd/abcdef.png``."""
+    return f"{prefix}{name[:2]}/{name[2:4]}/{name}"
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+class StorageBackend(ABC):
+    """Where image files live. Keys are relative, slash-separated paths such as ``ab/cd/<hash>.png``."""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the stored file on local disk, or None when it has to be fetched."""
+        return None
+
+    @abstractmethod
+    async def save(self, key: str, source_path: str):
+        """Moves a finished local file into storage; readers never see a partial file."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    async def fetch(self, key: str, target_path: str):
+        """Copies a stored file to a local path."""
+
+    async def download_url(self, key: str) -> str:
+        """URL clients can be redirected to when the file is not served from local disk."""
+        return self.url(key)
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        """Yields a local path for reading a stored file, downloading it to a temp file if needed."""
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+        handle, temp_path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        os.close(handle)
+        try:
+            await self.fetch(key, temp_path)
+            yield temp_path
+        finally:
+            await run_in_threadpool(_remove, temp_path)
+
+class LocalStorageBackend(StorageBackend):
+    """Stores files under a root directory, published at ``base_url``."""
+
+    def __init__(self, root: str, base_url: Optional[str] = None):
+        self.root = root
+        self.base_url = base_url if base_url is not None else f"/{root.strip('/')}"
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def _save(self, key: str, source_path: str):
+        target_path = self.local_path(key)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        # Land the file next to its target first, since the source may be on another filesystem
+        temp_path = f"{target_path}.{uuid.uuid4().hex}.part"
+        try:
+            shutil.move(source_path, temp_path)
+            os.replace(temp_path, target_path)
+        finally:
+            _remove(temp_path)
+
+    async def save(self, key: str, source_path: str):
+        await run_in_threadpool(self._save, key, source_path)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(_remove, self.local_path(key))
+
+    async def fetch(self, key: str, target_path: str):
+        await run_in_threadpool(shutil.copyfile, self.local_path(key), target_path)
+
+class S3StorageBackend(StorageBackend):
+    """Stores files in an S3-compatible bucket through a boto3-style client.
+
+    Only the client calls used here are required, so any object store with an
+    S3 API (or a stand-in in tests) can be plugged in.
+    """
+
+    def __init__(self, client, bucket: str, public_url: Optional[str] = None, url_expiry_seconds: int = 3600):
+        self.client = client
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") if public_url else f"https://{bucket}.s3.amazonaws.com"
+        self.url_expiry_seconds = url_expiry_seconds
+
+    def url(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def _save(self, key: str, source_path: str):
+        # Objects only become visible once the (multipart) upload completes
+        self.client.upload_file(source_path, self.bucket, key)
+        _remove(source_path)
+
+    async def save(self, key: str, source_path: str):
+        await run_in_threadpool(self._save, key, source_path)
+
+    async def delete(self, key: str):
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def fetch(self, key: str, target_path: str):
+        await run_in_threadpool(self.client.download_file, self.bucket, key, target_path)
+
+    async def download_url(self, key: str) -> str:
+        return await run_in_threadpool(
+            self.client.generate_presigned_url,
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.url_expiry_seconds,
+        )
+
+def create_storage_backend() -> StorageBackend:
+    """Builds the backend selected by IMAGE_STORAGE_BACKEND."""
+    if settings.image_storage_backend == "s3":
+        # boto3 is only needed when images are stored in S3
+        import boto3
+
+        client = boto3.client("s3", endpoint_url=settings.image_storage_endpoint_url)
+        return S3StorageBackend(client, settings.image_storage_bucket, settings.image_storage_public_url)
+    if settings.image_storage_backend != "local":
+        raise ValueError(f"Unknown image storage backend: {settings.image_storage_backend}")
+    return LocalStorageBackend(settings.image_storage_root)
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import pytest
+
+from base import Base
+from database import get_db
+from main import app
+from models import UserInDB
+from routers.users import get_current_user
+from services import category_service, tag_service
+
+
+class QueryBudget:
+    """Counts the SQL statements run on any engine and fails the test past a maximum.
+
+    Use as ``with query_budget(3): client.get(...)``. Statements from every
+    engine count, including the aiosqlite engine behind an AsyncSession.
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @contextmanager
+    def __call__(self, max_queries: int):
+        start = len(self.statements)
+        event.listen(Engine, "before_cursor_execute", self._record)
+        try:
+            yield
+        finally:
+            event.remove(Engine, "before_cursor_execute", self._record)
+        statements = self.statements[start:]
+        if len(statements) > max_queries:
+            listing = "\n".join(f"  {index}. {' '.join(statement.split())}" for index, statement in enumerate(statements, 1))
+            pytest.fail(f"Query budget exceeded: {len(statements)} queries, at most {max_queries} allowed:\n{listing}", pytrace=False)
+
+
+@pytest.fixture
+def query_budget():
+    return QueryBudget()
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield db
+    db.close()
+
+
+async def create_tables(async_engine):
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+# Every router test runs against both the sync Session and the aiosqlite AsyncSession path
+@pytest.fixture(scope="function", params=["sync", "async"])
+def client(request, db_session):
+    category_service.category_snapshot.invalidate()
+    tag_service.tag_snapshot.invalidate()
+    if request.param == "sync":
+        def override_get_db():
+            try:
+                yield db_session
+            finally:
+                db_session.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        with TestClient(app) as c:
+            yield c
+        app.dependency_overrides.clear()
+        return
+
+    async_engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_async_db
+    with TestClient(app) as c:
+        c.portal.call(create_tables, async_engine)
+        yield c
+        c.portal.call(async_engine.dispose)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def current_user():
+    """Authenticates every request as a fixed user without going through JWT and bcrypt."""
+    now = datetime.now()
+    user = UserInDB(id="author", username="author", email="author@example.com", hashed_password="", created_at=now, updated_at=now)
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,38 @@
+import asyncio
+
+from benchmarks import seed
+from benchmarks.run import compare, percentile, run_benchmarks
+
+
+def test_percentile():
+    values = [float(n) for n in range(1, 101)]
+    assert (percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)) == (50.0, 95.0, 99.0)
+    assert percentile([7.0], 0.99) == 7.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    def result(rps, p95, p99, errors=0):
+        return {"requests_per_second": rps, "errors": errors, "latency_ms": {"p95": p95, "p99": p99}}
+
+    baseline = {"scenarios": {"todos.list": result(1000, 10, 20), "todos.detail": result(2000, 1.0, 1.2), "gone": result(1, 1, 1)}}
+    results = {"scenarios": {
+        "todos.list": result(850, 12, 20, errors=1),
+        "todos.detail": result(1950, 1.3, 1.4),
+        "todos.create": result(10, 100, 100),
+    }}
+    assert compare(results, baseline, threshold=0.1) == [
+        "todos.list: 1000 -> 850 req/s",
+        "todos.list: p95 10 -> 12 ms",
+        "todos.list: 0 -> 1 errors",
+    ]
+
+
+def test_run_benchmarks_smoke(tmp_path):
+    results = asyncio.run(run_benchmarks(
+        f"sqlite:///{tmp_path}/benchmark.db", scale=0.0001, families=("list", "detail", "create", "update", "delete"),
+        requests=3, concurrency=2, warmup=1,
+    ))
+    assert results["meta"]["volumes"] == seed.scaled_volumes(0.0001)
+    assert {result["family"] for result in results["scenarios"].values()} == {"list", "detail", "create", "update", "delete"}
+    assert all(result["errors"] == 0 for result in results["scenarios"].values())
+    assert all(result["latency_ms"]["p99"] > 0 for result in results["scenarios"].values())
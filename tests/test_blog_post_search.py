@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker, Session
+from base import Base
+from models import BlogPostCreate, BlogPostTerm, BlogPostUpdate, SearchStats
+from services import blog_post_search_service, blog_post_service
+
+# Setup an in-memory SQLite database for testing
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def create_post(db: Session, title: str, content: str, published: bool = True):
+    return blog_post_service.create_blog_post(
+        db, BlogPostCreate(title=title, content=content, published=published), author_id="author-1"
+    )
+
+def test_search_ranks_by_relevance(db_session: Session):
+    create_post(db_session, "Cooking pasta", "Boil water and add salt. Pasta needs plenty of water.")
+    best = create_post(db_session, "FastAPI performance", "Profiling FastAPI apps: FastAPI and SQLAlchemy tuning.")
+    create_post(db_session, "Weekend notes", "Tried FastAPI once.")
+
+    results = blog_post_search_service.search_blog_posts(db_session, q="fastapi")
+    assert [result.id for result in results][0] == best.id
+    assert len(results) == 2
+    assert results[0].score > results[1].score
+    assert "FastAPI" in results[0].snippet
+
+def test_search_published_only(db_session: Session):
+    create_post(db_session, "Draft about caching", "Caching ideas", published=False)
+    published = create_post(db_session, "Caching in practice", "Caching layers")
+
+    results = blog_post_search_service.search_blog_posts(db_session, q="caching", published=True)
+    assert [result.id for result in results] == [published.id]
+
+def test_index_follows_updates_and_deletes(db_session: Session):
+    post = create_post(db_session, "Old title", "Original words")
+
+    blog_post_service.update_blog_post(db_session, post.id, BlogPostUpdate(content="Replacement text"))
+    assert blog_post_search_service.search_blog_posts(db_session, q="original") == []
+    assert [result.id for result in blog_post_search_service.search_blog_posts(db_session, q="replacement")] == [post.id]
+
+    blog_post_service.delete_blog_post(db_session, post.id)
+    assert db_session.query(BlogPostTerm).count() == 0
+    assert tuple(blog_post_search_service.corpus_stats(db_session)) == (0, 0)
+
+def test_accented_terms_and_stats_shards(db_session: Session):
+    posts = [create_post(db_session, f"Résumé tips {n}", "Write a resume") for n in range(20)]
+
+    assert db_session.query(BlogPostTerm).filter(BlogPostTerm.term.in_(["resume", "résumé"])).count() == 40
+    stats = blog_post_search_service.corpus_stats(db_session)
+    assert stats.document_count == len(posts)
+    # Three title terms weighted 3 each, two body terms
+    assert stats.total_length == len(posts) * (3 * 3 + 2)
+    assert db_session.query(SearchStats).count() > 1
+
+def test_stats_shards_are_written_with_an_upsert():
+    statement = blog_post_search_service.stats_upsert("mysql", 3, 1, 10)
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    assert sql.startswith("INSERT INTO search_stats")
+    assert "ON DUPLICATE KEY UPDATE document_count = (search_stats.document_count + VALUES(document_count))" in sql
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+from base import Base
+from db_types import new_id
+from models import BlogPostCreate, BlogPostImage, BlogPostTag, BlogPostUpdate, Image, Tag
+from services import blog_post_service
+
+# Setup an in-memory SQLite database for testing
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture(scope="function")
+def tags(db_session: Session):
+    tags = [Tag(id=f"tag-{i}", name=f"Tag {i}") for i in range(3)]
+    db_session.add_all(tags)
+    db_session.add(Image(id="image-1", url="/static/images/a.png"))
+    db_session.commit()
+    return tags
+
+def tag_ids(db: Session, blog_post_id: str):
+    return {row.tag_id for row in db.query(BlogPostTag).filter(BlogPostTag.blog_post_id == blog_post_id)}
+
+def test_create_blog_post_with_associations(db_session: Session, tags):
+    blog_post = blog_post_service.create_blog_post(
+        db_session,
+        BlogPostCreate(title="Post", content="Body", tag_ids=["tag-0", "tag-1", "unknown"], image_ids=["image-1"]),
+        author_id="author-1",
+    )
+    assert tag_ids(db_session, blog_post.id) == {"tag-0", "tag-1"}
+    assert [row.image_id for row in db_session.query(BlogPostImage)] == ["image-1"]
+
+def test_update_blog_post_syncs_tag_difference(db_session: Session, tags):
+    blog_post = blog_post_service.create_blog_post(
+        db_session, BlogPostCreate(title="Post", content="Body", tag_ids=["tag-0", "tag-1"]), author_id="author-1"
+    )
+
+    blog_post_service.update_blog_post(db_session, blog_post.id, BlogPostUpdate(tag_ids=["tag-1", "tag-2"]))
+    assert tag_ids(db_session, blog_post.id) == {"tag-1", "tag-2"}
+
+    blog_post_service.update_blog_post(db_session, blog_post.id, BlogPostUpdate(title="Renamed"))
+    assert tag_ids(db_session, blog_post.id) == {"tag-1", "tag-2"}
+
+    blog_post_service.update_blog_post(db_session, blog_post.id, BlogPostUpdate(tag_ids=[], image_ids=[]))
+    assert tag_ids(db_session, blog_post.id) == set()
+
+def test_delete_blog_post_with_associations(db_session: Session, tags):
+    blog_post = blog_post_service.create_blog_post(
+        db_session, BlogPostCreate(title="Post", content="Body", tag_ids=["tag-0"], image_ids=["image-1"]), author_id="author-1"
+    )
+
+    blog_post_service.delete_blog_post(db_session, blog_post.id)
+    assert blog_post_service.get_blog_post(db_session, blog_post.id) is None
+    assert db_session.query(BlogPostTag).count() == 0
+    assert db_session.query(BlogPostImage).count() == 0
+
+def test_get_blog_posts_loads_associations_in_fixed_queries(db_session: Session, tags):
+    for i in range(5):
+        blog_post_service.create_blog_post(
+            db_session,
+            BlogPostCreate(title=f"Post {i}", content="Body", tag_ids=["tag-0", "tag-1"], image_ids=["image-1"]),
+            author_id="author-1",
+        )
+    db_session.expunge_all()
+
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    blog_posts = blog_post_service.get_blog_posts(db_session, expand={"tags"})
+    read_models = [blog_post_service.to_read_model(blog_post, {"tags"}) for blog_post in blog_posts]
+
+    assert len(statements) == 3
+    assert all(sorted(read_model.tag_ids) == ["tag-0", "tag-1"] for read_model in read_models)
+    assert all(read_model.image_ids == ["image-1"] for read_model in read_models)
+    assert all(sorted(tag.name for tag in read_model.tags) == ["Tag 0", "Tag 1"] for read_model in read_models)
+
+def test_get_blog_post_rows_match_orm_fields(db_session: Session, tags):
+    for i in range(3):
+        blog_post_service.create_blog_post(
+            db_session, BlogPostCreate(title=f"Post {i}", content="Body", tag_ids=["tag-0", "tag-2"][:i], image_ids=["image-1"]), author_id="author-1"
+        )
+    db_session.expunge_all()
+
+    rows = blog_post_service.get_blog_post_rows(db_session, cursor="", limit=2)
+    expected = [blog_post_service.read_fields(blog_post) for blog_post in blog_post_service.get_blog_posts(db_session, cursor="", limit=2)]
+    assert [{**row, "tag_ids": sorted(row["tag_ids"])} for row in rows] == [{**fields, "tag_ids": sorted(fields["tag_ids"])} for fields in expected]
+    db_session.expunge_all()
+    blog_post_service.get_blog_post_rows(db_session)
+    assert len(db_session.identity_map) == 0
+
+def test_export_keeps_ids_that_are_not_uuids(db_session: Session, tags):
+    uuid_tag = Tag(id=new_id(), name="UUID tag")
+    db_session.add(uuid_tag)
+    db_session.commit()
+    blog_post_service.create_blog_post(db_session, BlogPostCreate(title="Post", content="Body", tag_ids=["tag-0", uuid_tag.id]), author_id="author-1")
+
+    [row] = db_session.execute(blog_post_service.export_statement()).all()
+    assert sorted(blog_post_service.export_fields(row)["tag_ids"]) == sorted(["tag-0", uuid_tag.id])
@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+import pytest
+
+
+@pytest.fixture
+def tag_ids(client: TestClient, current_user):
+    return [client.post("/api/v1/tags", json={"name": f"tag-{i}"}).json()["id"] for i in range(5)]
+
+
+def create_post(client: TestClient, title: str, tag_ids):
+    response = client.post("/api/v1/blog_posts", json={"title": title, "content": f"All about {title}", "tag_ids": tag_ids})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_create_blog_post(client: TestClient, tag_ids, query_budget):
+    # Tag links are written in one statement however many tags there are
+    with query_budget(10):
+        post = create_post(client, "Budgets", tag_ids)
+    assert sorted(post["tag_ids"]) == sorted(tag_ids)
+
+
+def test_read_blog_posts_expanded(client: TestClient, tag_ids, query_budget):
+    category_id = client.post("/api/v1/categories", json={"name": "Engineering"}).json()["id"]
+    for i in range(5):
+        client.post("/api/v1/blog_posts", json={"title": f"Post {i}", "content": "Body", "category_id": category_id, "tag_ids": tag_ids})
+
+    # The query count must not grow with the number of posts or tags
+    with query_budget(3):
+        response = client.get("/api/v1/blog_posts", params={"expand": "author,category,tags,images"})
+    posts = response.json()
+    assert len(posts) == 5
+    assert all(len(post["tags"]) == 5 and post["category"]["name"] == "Engineering" for post in posts)
+
+    with query_budget(3):
+        response = client.get("/api/v1/blog_posts")
+    assert all(sorted(post["tag_ids"]) == sorted(tag_ids) for post in response.json())
+
+    with query_budget(3):
+        response = client.get(f"/api/v1/blog_posts/{posts[0]['id']}", params={"expand": "tags"})
+    assert len(response.json()["tags"]) == 5
+
+
+def test_search_blog_posts(client: TestClient, tag_ids, query_budget):
+    for title in ("Query budget", "Connection pools", "Budget reviews"):
+        create_post(client, title, tag_ids)
+
+    with query_budget(4):
+        response = client.get("/api/v1/blog_posts/search", params={"q": "budget"})
+    assert sorted(result["title"] for result in response.json()) == ["Budget reviews", "Query budget"]
+
+
+def test_update_and_delete_blog_post(client: TestClient, tag_ids, query_budget):
+    post_id = create_post(client, "Draft", tag_ids[:2])["id"]
+
+    with query_budget(15):
+        response = client.put(f"/api/v1/blog_posts/{post_id}", json={"title": "Final", "tag_ids": tag_ids[2:]})
+    assert response.status_code == 200
+    assert sorted(response.json()["tag_ids"]) == sorted(tag_ids[2:])
+
+    with query_budget(10):
+        assert client.delete(f"/api/v1/blog_posts/{post_id}").status_code == 204
+    assert client.get(f"/api/v1/blog_posts/{post_id}").status_code == 404
+
+
+def test_export_blog_posts(client: TestClient, tag_ids, query_budget):
+    for i in range(3):
+        create_post(client, f"Post {i}", tag_ids[:i])
+
+    with query_budget(1):
+        response = client.get("/api/v1/blog_posts/export")
+    posts = [json.loads(line) for line in response.text.splitlines()]
+    assert [post["title"] for post in posts] == ["Post 0", "Post 1", "Post 2"]
+    assert [sorted(post["tag_ids"]) for post in posts] == [sorted(tag_ids[:i]) for i in range(3)]
+    assert all(post["image_ids"] == [] for post in posts)
+
+    with query_budget(1):
+        response = client.get("/api/v1/blog_posts/export", params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert sorted(rows[2]["tag_ids"].split(";")) == sorted(tag_ids[:2])
@@ -0,0 +1,27 @@
+import base64
+
+from fastapi.testclient import TestClient
+
+
+def test_category_endpoints(client: TestClient, current_user, query_budget):
+    with query_budget(4):
+        response = client.post("/api/v1/categories", json={"name": "News"})
+    assert response.status_code == 201
+    category_id = response.json()["id"]
+    client.post("/api/v1/categories", json={"name": "Sports"})
+
+    with query_budget(0):
+        assert [category["name"] for category in client.get("/api/v1/categories").json()] == ["News", "Sports"]
+    with query_budget(0):
+        assert client.get(f"/api/v1/categories/{category_id}").json()["name"] == "News"
+    with query_budget(4):
+        assert client.put(f"/api/v1/categories/{category_id}", json={"name": "World"}).json()["name"] == "World"
+    with query_budget(4):
+        assert client.delete(f"/api/v1/categories/{category_id}").status_code == 204
+    assert client.get(f"/api/v1/categories/{category_id}").status_code == 404
+
+
+def test_categories_reject_cursor_with_utc_offset(client: TestClient):
+    cursor = base64.urlsafe_b64encode(b"2024-01-01T00:00:00+00:00|x").decode()
+    response = client.get("/api/v1/categories", params={"cursor": cursor})
+    assert response.status_code == 400
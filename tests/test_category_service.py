@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+from base import Base
+from models import CategoryCreate, CategoryUpdate
+from pagination import encode_cursor
+from services import category_service
+
+# Setup an in-memory SQLite database for testing
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    category_service.category_snapshot.invalidate()
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def count_queries(db: Session):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_reads_are_served_from_snapshot(db_session: Session):
+    created = category_service.create_category(db_session, CategoryCreate(name="News"))
+    category_service.get_categories(db_session)
+
+    statements = count_queries(db_session)
+    assert [category.name for category in category_service.get_categories(db_session)] == ["News"]
+    assert category_service.get_category(db_session, created.id).name == "News"
+    assert category_service.get_category(db_session, created.id.upper()).id == created.id
+    assert category_service.get_category_by_name(db_session, "news").id == created.id
+    assert category_service.get_category_by_name(db_session, "Sports") is None
+    assert statements == []
+
+def test_writes_rebuild_snapshot(db_session: Session):
+    created = category_service.create_category(db_session, CategoryCreate(name="News"))
+    assert category_service.get_category(db_session, created.id).name == "News"
+
+    category_service.update_category(db_session, created.id, CategoryUpdate(name="World News"))
+    assert category_service.get_category(db_session, created.id).name == "World News"
+    assert category_service.get_category_by_name(db_session, "News") is None
+
+    category_service.delete_category(db_session, created.id)
+    assert category_service.get_category(db_session, created.id) is None
+    assert category_service.get_categories(db_session) == []
+
+def test_cursor_paging_from_snapshot(db_session: Session):
+    for name in ["A", "B", "C"]:
+        category_service.create_category(db_session, CategoryCreate(name=name))
+
+    first_page = category_service.get_categories(db_session, limit=2, cursor="")
+    assert [category.name for category in first_page] == ["A", "B"]
+    cursor = encode_cursor(first_page[-1].created_at, first_page[-1].id)
+    assert [category.name for category in category_service.get_categories(db_session, limit=2, cursor=cursor)] == ["C"]
+    assert [category.name for category in category_service.get_categories(db_session, skip=1, limit=1)] == ["B"]
+
+def test_cursors_with_utc_offsets_are_rejected(db_session: Session):
+    category_service.create_category(db_session, CategoryCreate(name="A"))
+
+    for raw in (f"{datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat()}|x", "not a cursor"):
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+        with pytest.raises(HTTPException) as excinfo:
+            category_service.get_categories(db_session, cursor=cursor)
+        assert excinfo.value.status_code == 400
+
+def test_duplicate_names_missed_by_the_snapshot_are_rejected(db_session: Session):
+    category_service.create_category(db_session, CategoryCreate(name="News"))
+    other = category_service.create_category(db_session, CategoryCreate(name="Sports"))
+
+    for write in (
+        lambda: category_service.create_category(db_session, CategoryCreate(name="News")),
+        lambda: category_service.update_category(db_session, other.id, CategoryUpdate(name="News")),
+    ):
+        with pytest.raises(HTTPException) as excinfo:
+            write()
+        assert (excinfo.value.status_code, excinfo.value.detail) == (400, "Category name already registered")
+    assert sorted(category.name for category in category_service.get_categories(db_session)) == ["News", "Sports"]
@@ -0,0 +1,37 @@
+import uuid
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from base import Base
+from db_types import new_id, uuid7
+from models import SearchTrigram, Todo
+
+
+def test_uuid7_is_time_ordered():
+    keys = [uuid7() for _ in range(1000)]
+    assert {(key.version, key.variant) for key in keys} == {(7, uuid.RFC_4122)}
+    timestamps = [key.int >> 80 for key in keys]
+    assert timestamps == sorted(timestamps)
+    # Stored bytes and API strings sort the same way
+    assert sorted(map(str, keys)) == [str(key) for key in sorted(keys, key=lambda key: key.bytes)]
+
+
+def test_uuid_key_stores_16_bytes_and_reads_strings():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Todo.__table__])
+    todo_id = new_id()
+    with Session(engine) as db:
+        db.add_all([Todo(id=todo_id, title="Binary"), Todo(id="not-a-uuid", title="Malformed")])
+        db.commit()
+        assert db.execute(text("SELECT length(id) FROM todos WHERE title = 'Binary'")).scalar() == 16
+        assert db.scalar(select(Todo.id).where(Todo.id == todo_id)) == todo_id
+        assert db.scalar(select(Todo.id).where(Todo.id == todo_id.upper())) == todo_id
+        assert db.scalar(select(Todo.title).where(Todo.id == "not-a-uuid")) == "Malformed"
+        assert db.scalar(select(Todo.id).where(Todo.id == "nonexistent_id")) is None
+
+
+def test_binary_string_uses_a_binary_collation_on_mysql():
+    assert "trigram VARCHAR(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin" in str(CreateTable(SearchTrigram.__table__).compile(dialect=mysql.dialect()))
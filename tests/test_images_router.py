@@ -0,0 +1,298 @@
+import asyncio
+from datetime import datetime, timedelta
+import hashlib
+import io
+import os
+import random
+
+from fastapi.testclient import TestClient
+from PIL import Image as PILImage
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import pytest
+
+from base import Base
+from config import settings
+from database import get_db
+from main import app
+from models import Image, ImageUpload, UserInDB
+from routers.users import get_current_user
+from services import image_service, image_variant_service
+from storage import LocalStorageBackend
+from uploads import MULTIPART_OVERHEAD_BYTES
+
+def make_noise_png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.frombytes("L", (width, height), random.Random(0).randbytes(width * height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+PNG_BYTES = make_noise_png(48, 48)
+
+
+@pytest.fixture(scope="function")
+def client(tmp_path, monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(image_service, "storage", LocalStorageBackend(str(tmp_path / "images"), base_url="/static/images"))
+    monkeypatch.setattr(image_service, "UPLOAD_SESSION_DIRECTORY", str(tmp_path / "sessions"))
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def override_get_current_user():
+        now = datetime.now()
+        return UserInDB(id="user", username="user", email="user@example.com", hashed_password="", created_at=now, updated_at=now)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    with TestClient(app) as c:
+        c.session_factory = TestingSessionLocal
+        yield c
+    app.dependency_overrides.clear()
+
+
+def stored_files(root) -> list:
+    return sorted(
+        os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+        for directory, _, names in os.walk(root) for name in names
+    )
+
+
+def upload(client: TestClient, content: bytes, filename: str = "photo.png"):
+    return client.post("/api/v1/images/upload", files={"file": (filename, content, "image/png")})
+
+
+def test_upload_is_stored_by_content_hash(client: TestClient, tmp_path, query_budget):
+    # Includes the background task that builds the eager variants
+    with query_budget(15):
+        response = upload(client, PNG_BYTES)
+    assert response.status_code == 201
+    data = response.json()
+    content_hash = hashlib.sha256(PNG_BYTES).hexdigest()
+    assert data["content_hash"] == content_hash
+    assert data["content_type"] == "image/png"
+    assert data["size"] == len(PNG_BYTES)
+    assert data["url"] == f"/static/images/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png"
+    assert stored_files(tmp_path / "images")[0] == f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png"
+    assert len(stored_files(tmp_path / "images" / "variants")) == len(image_variant_service.EAGER_VARIANTS)
+
+
+def test_duplicate_upload_returns_existing_image(client: TestClient, tmp_path):
+    first = upload(client, PNG_BYTES).json()
+    second = upload(client, PNG_BYTES, filename="copy.png").json()
+    assert second["id"] == first["id"]
+    assert len(stored_files(tmp_path / "images")) == 1 + len(image_variant_service.EAGER_VARIANTS)
+    assert len(client.get("/api/v1/images").json()) == 1
+
+
+def test_upload_type_is_detected_from_content(client: TestClient, tmp_path):
+    response = client.post("/api/v1/images/upload", files={"file": ("photo.html", PNG_BYTES, "text/html")})
+    assert response.status_code == 201
+    assert response.json()["content_type"] == "image/png"
+    assert response.json()["url"].endswith(".png")
+
+    response = client.post("/api/v1/images/upload", files={"file": ("x.png", b"<script>alert(1)</script>", "image/png")})
+    assert response.status_code == 415
+    assert len(stored_files(tmp_path / "images")) == 1 + len(image_variant_service.EAGER_VARIANTS)
+
+
+def test_upload_over_limit_is_rejected(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "image_upload_max_bytes", 1024)
+    monkeypatch.setattr(settings, "image_upload_chunk_size", 256)
+    response = upload(client, PNG_BYTES)
+    assert response.status_code == 413
+    assert stored_files(tmp_path) == []
+
+
+def test_upload_with_oversized_content_length_is_rejected_before_reading(client: TestClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "image_upload_max_bytes", 1024)
+    response = upload(client, b"\x00" * (1024 + MULTIPART_OVERHEAD_BYTES))
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Request body exceeds")
+    assert stored_files(tmp_path) == []
+
+
+def test_download_serves_file_with_caching_headers(client: TestClient, query_budget):
+    image = upload(client, PNG_BYTES).json()
+    with query_budget(1):
+        response = client.get(f"/api/v1/images/{image['id']}/file")
+    assert response.status_code == 200
+    assert response.content == PNG_BYTES
+    assert response.headers["etag"] == f'"{image["content_hash"]}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "max-age" in response.headers["cache-control"]
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "content-disposition" not in response.headers
+
+    with query_budget(1):
+        revalidated = client.get(f"/api/v1/images/{image['id']}/file", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    since = client.get(f"/api/v1/images/{image['id']}/file", headers={"If-Modified-Since": response.headers["last-modified"]})
+    assert since.status_code == 304
+
+
+def test_download_range(client: TestClient):
+    image = upload(client, PNG_BYTES).json()
+    url = f"/api/v1/images/{image['id']}/file"
+
+    response = client.get(url, headers={"Range": "bytes=0-7"})
+    assert response.status_code == 206
+    assert response.content == PNG_BYTES[:8]
+    assert response.headers["content-range"] == f"bytes 0-7/{len(PNG_BYTES)}"
+
+    suffix = client.get(url, headers={"Range": "bytes=-100"})
+    assert suffix.status_code == 206
+    assert suffix.content == PNG_BYTES[-100:]
+
+    stale = client.get(url, headers={"Range": "bytes=0-7", "If-Range": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == PNG_BYTES
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(PNG_BYTES)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(PNG_BYTES)}"
+
+
+def test_delete_removes_files(client: TestClient, tmp_path, query_budget):
+    image = upload(client, make_png(600, 400)).json()
+    assert stored_files(tmp_path / "images") != []
+    # Includes the background task that checks the files are no longer referenced
+    with query_budget(6):
+        assert client.delete(f"/api/v1/images/{image['id']}").status_code == 204
+    assert stored_files(tmp_path / "images") == []
+    assert client.get(f"/api/v1/images/{image['id']}").status_code == 404
+
+
+def test_delete_keeps_files_of_content_uploaded_again(client: TestClient, tmp_path):
+    image = upload(client, PNG_BYTES).json()
+    with client.session_factory() as db:
+        keys = image_service.delete_image(db, image["id"])
+    # The same content arrives again before the background task removes the files
+    again = upload(client, PNG_BYTES).json()
+    asyncio.run(image_service.delete_stored_files(app.dependency_overrides[get_db], keys))
+
+    assert f"{again['content_hash'][:2]}/{again['content_hash'][2:4]}/{again['content_hash']}.png" in stored_files(tmp_path / "images")
+    assert client.get(f"/api/v1/images/{again['id']}/file").content == PNG_BYTES
+
+
+def test_download_missing_image(client: TestClient):
+    assert client.get("/api/v1/images/missing/file").status_code == 404
+
+
+def make_png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (width, height), (200, 30, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_upload_builds_eager_variants(client: TestClient, tmp_path):
+    image = upload(client, make_png(1200, 600)).json()
+    assert len(stored_files(tmp_path / "images" / "variants")) == len(image_variant_service.EAGER_VARIANTS)
+    for name in image_variant_service.EAGER_VARIANTS:
+        response = client.get(f"/api/v1/images/{image['id']}/file", params={"variant": name})
+        assert response.status_code == 200
+        width, image_format = image_variant_service.parse_variant(name)
+        assert response.headers["content-type"] == image_variant_service.VARIANT_FORMATS[image_format]
+        assert response.headers["etag"] == f'"{image["content_hash"]}-{name}"'
+        with PILImage.open(io.BytesIO(response.content)) as variant:
+            assert variant.size == (width, width // 2)
+
+
+def test_variant_is_rendered_on_demand(client: TestClient, tmp_path):
+    image = upload(client, make_png(300, 300)).json()
+    response = client.get(f"/api/v1/images/{image['id']}/file", params={"variant": "256.jpeg"})
+    assert response.status_code == 200
+    with PILImage.open(io.BytesIO(response.content)) as variant:
+        assert variant.size == (256, 256)
+    content_hash = image["content_hash"]
+    assert f"variants/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}-256.jpeg" in stored_files(tmp_path / "images")
+
+    # Narrower originals are re-encoded but never upscaled
+    response = client.get(f"/api/v1/images/{image['id']}/file", params={"variant": "1024.jpeg"})
+    with PILImage.open(io.BytesIO(response.content)) as variant:
+        assert variant.size == (300, 300)
+
+
+def test_unknown_variant_is_rejected(client: TestClient):
+    image = upload(client, make_png(64, 64)).json()
+    assert client.get(f"/api/v1/images/{image['id']}/file", params={"variant": "100.gif"}).status_code == 400
+
+
+def start_upload(client: TestClient, size: int):
+    response = client.post("/api/v1/images/uploads", json={"filename": "large.png", "content_type": "image/png", "size": size})
+    assert response.status_code == 201
+    return response
+
+
+def test_resumable_upload(client: TestClient, tmp_path, query_budget):
+    content = make_png(640, 480)
+    half = len(content) // 2
+    response = start_upload(client, len(content))
+    url = response.headers["location"]
+    assert response.headers["upload-offset"] == "0"
+
+    with query_budget(3):
+        response = client.patch(url, content=content[:half], headers={"Upload-Offset": "0"})
+    assert response.status_code == 200
+    assert response.json()["offset"] == half
+    assert client.get(url).headers["upload-offset"] == str(half)
+
+    conflict = client.patch(url, content=content[half:], headers={"Upload-Offset": "0"})
+    assert conflict.status_code == 409
+    assert conflict.headers["upload-offset"] == str(half)
+
+    assert client.post(f"{url}/complete").status_code == 409
+    assert client.patch(url, content=content[half:], headers={"Upload-Offset": str(half)}).json()["offset"] == len(content)
+
+    # Includes the background task that builds the eager variants
+    with query_budget(17):
+        response = client.post(f"{url}/complete")
+    assert response.status_code == 201
+    image = response.json()
+    assert image["content_hash"] == hashlib.sha256(content).hexdigest()
+    assert image["size"] == len(content)
+    assert client.get(f"/api/v1/images/{image['id']}/file").content == content
+    assert client.get(url).status_code == 404
+    assert os.listdir(tmp_path / "sessions") == []
+
+
+def test_resumable_upload_rejects_bytes_past_declared_size(client: TestClient):
+    url = start_upload(client, 10).headers["location"]
+    assert client.patch(url, content=b"x" * 11, headers={"Upload-Offset": "0"}).status_code == 413
+    assert client.get(url).json()["offset"] == 0
+    assert client.delete(url).status_code == 204
+    assert client.get(url).status_code == 404
+
+
+def test_expired_uploads_are_collected(client: TestClient, tmp_path):
+    stale_id = start_upload(client, 10).json()["id"]
+    with client.session_factory() as db:
+        db.query(ImageUpload).filter(ImageUpload.id == stale_id).update({ImageUpload.expires_at: datetime.now() - timedelta(seconds=1)})
+        db.commit()
+    assert client.get(f"/api/v1/images/uploads/{stale_id}").status_code == 404
+
+    fresh_id = start_upload(client, 10).json()["id"]
+    with client.session_factory() as db:
+        assert [upload.id for upload in db.query(ImageUpload)] == [fresh_id]
+    assert os.listdir(tmp_path / "sessions") == [f"{fresh_id}.part"]
+
+
+def test_non_image_content_type_is_served_as_attachment(client: TestClient):
+    image = upload(client, PNG_BYTES).json()
+    with client.session_factory() as db:
+        db.query(Image).filter(Image.id == image["id"]).update({Image.content_type: "text/html"})
+        db.commit()
+    response = client.get(f"/api/v1/images/{image['id']}/file")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert response.headers["content-disposition"] == "attachment"
+    assert response.headers["x-content-type-options"] == "nosniff"
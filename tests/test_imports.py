@@ -0,0 +1,90 @@
+import asyncio
+import io
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+import imports
+from base import Base
+from config import settings
+from imports import import_body, import_records, open_records
+from models import Item, SearchTrigram
+
+
+def session_factory(tmp_path, tables=None):
+    engine = create_engine(f"sqlite:///{tmp_path}/import.db")
+    Base.metadata.create_all(engine, tables=tables)
+    return sessionmaker(bind=engine)
+
+
+def test_import_records_commits_each_chunk(tmp_path):
+    source = io.BytesIO(b"name,price,tax\n" + b"".join(f"Item {i},{i},\n".encode() for i in range(5)) + b"Extra,1,2,3\n")
+    progress = []
+    with session_factory(tmp_path)() as db:
+        report = import_records(db, "items", open_records(source, "csv"), chunk_size=2, on_progress=lambda report: progress.append(report.imported))
+        assert db.scalar(select(func.count()).select_from(Item)) == 5
+        assert db.scalar(select(Item.tax).where(Item.name == "Item 3")) is None
+        assert db.scalar(select(func.count()).select_from(SearchTrigram)) > 0
+
+    assert progress == [2, 4, 5]
+    assert (report.imported, report.failed) == (5, 1)
+    assert report.errors[0].index == 5
+    assert "header has 3" in report.errors[0].detail
+
+
+def test_import_records_reports_failed_inserts_and_goes_on(tmp_path):
+    # Without the search index table every insert fails after the items are written
+    session = session_factory(tmp_path, tables=[Item.__table__])
+    source = io.BytesIO(b"".join(b'{"name": "Item %d", "price": 1}\n' % i for i in range(3)))
+    with session() as db:
+        report = import_records(db, "items", open_records(source, "ndjson"), chunk_size=2, index_search=True)
+        assert db.scalar(select(func.count()).select_from(Item)) == 0
+
+    assert (report.imported, report.failed) == (0, 3)
+    assert [(error.index, error.status) for error in report.errors] == [(0, 500), (1, 500), (2, 500)]
+    assert report.errors[0].detail.startswith("Insert failed: no such table")
+
+
+@pytest.mark.parametrize("import_format, body", [
+    ("csv", b"name,price\nCaf\xc3\xa9,1\nCaf\xe9,2\nTea,3\n"),
+    ("ndjson", b'{"name": "Caf\xc3\xa9", "price": 1}\n{"name": "Caf\xe9", "price": 2}\n{"name": "Tea", "price": 3}\n'),
+])
+def test_rows_that_are_not_utf8_are_reported_not_replaced(tmp_path, import_format, body):
+    with session_factory(tmp_path)() as db:
+        report = import_records(db, "items", open_records(io.BytesIO(body), import_format))
+        assert sorted(db.scalars(select(Item.name))) == ["Café", "Tea"]
+
+    assert (report.imported, report.failed) == (2, 1)
+    assert (report.errors[0].index, report.errors[0].status) == (1, 422)
+    assert "UTF-8" in report.errors[0].detail
+
+
+async def chunks_of(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def test_import_body_runs_chunks_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    import_chunk = imports.import_chunk
+    monkeypatch.setattr(imports, "import_chunk", lambda *args: threads.append(threading.current_thread()) or import_chunk(*args))
+    body = chunks_of(b'{"name": "Chair", "price": 1}\n', b'{"name": "Table", "price": 2}\n')
+    with session_factory(tmp_path)() as db:
+        report = asyncio.run(import_body(db, "items", body, "ndjson"))
+
+    assert report.imported == 2
+    assert threads and threading.main_thread() not in threads
+
+
+def test_import_body_over_limit_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "import_max_bytes", 64)
+    body = chunks_of(b'{"name": "Chair", "price": 1}\n' * 2, b'{"name": "Table", "price": 2}\n')
+    with session_factory(tmp_path)() as db:
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(import_body(db, "items", body, "ndjson"))
+        assert db.scalar(select(func.count()).select_from(Item)) == 0
+
+    assert excinfo.value.status_code == 413
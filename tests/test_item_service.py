@@ -2,8 +2,8 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from base import Base
-from models import Item, ItemCreate, ItemUpdate
-from services import item_service
+from models import Item, ItemCreate, ItemInDB, ItemUpdate, SearchTrigram
+from services import item_service, search_service
 
 # Setup an in-memory SQLite database for testing
 @pytest.fixture(scope="function")
@@ -37,6 +37,18 @@ def test_get_items(db_session: Session):
     assert items[0].name == "Item 1"
     assert items[1].name == "Item 2"
 
+def test_get_item_rows_match_get_items(db_session: Session):
+    for name in ("Red chair", "Blue chair", "Red table"):
+        item_service.create_item(db_session, ItemCreate(name=name, price=10.0))
+    db_session.expunge_all()
+
+    for filters in ({}, {"name": "chair"}, {"cursor": "", "limit": 2}):
+        rows = item_service.get_item_rows(db_session, **filters)
+        assert [ItemInDB.model_validate(row) for row in rows] == [ItemInDB.model_validate(item) for item in item_service.get_items(db_session, **filters)]
+    db_session.expunge_all()
+    item_service.get_item_rows(db_session)
+    assert len(db_session.identity_map) == 0
+
 def test_get_item(db_session: Session):
     item_data = ItemCreate(name="Single Item", price=15.0)
     created_item = item_service.create_item(db_session, item_data)
@@ -64,4 +76,41 @@ def test_delete_item(db_session: Session):
     assert deleted_item.id == created_item.id
 
     fetched_item = item_service.get_item(db_session, created_item.id)
-    assert fetched_item is None
\ No newline at end of file
+    assert fetched_item is None
+
+def test_get_items_by_name(db_session: Session):
+    item_service.create_item(db_session, ItemCreate(name="Red Widget Deluxe", price=10.0))
+    item_service.create_item(db_session, ItemCreate(name="Blue Gadget", price=20.0))
+    item_service.create_item(db_session, ItemCreate(name="Widget", price=30.0))
+
+    items = item_service.get_items(db_session, name="widget")
+    assert [item.name for item in items] == ["Widget", "Red Widget Deluxe"]
+
+    assert [item.name for item in item_service.get_items(db_session, name="ad")] == ["Blue Gadget"]
+
+def test_search_index_follows_updates_and_deletes(db_session: Session):
+    created_item = item_service.create_item(db_session, ItemCreate(name="Old Name", price=5.0))
+
+    item_service.update_item(db_session, created_item.id, ItemUpdate(name="New Name"))
+    assert item_service.get_items(db_session, name="Old") == []
+    assert [item.id for item in item_service.get_items(db_session, name="New")] == [created_item.id]
+
+    item_service.delete_item(db_session, created_item.id)
+    assert db_session.query(SearchTrigram).count() == 0
+
+def test_index_documents_keeps_the_last_text_of_a_repeated_id(db_session: Session):
+    created_item = item_service.create_item(db_session, ItemCreate(name="Cafe", price=5.0))
+
+    search_service.index_documents(db_session, item_service.SEARCH_ENTITY, [(created_item.id, "Old"), (created_item.id, "Café")])
+    db_session.commit()
+    assert sorted(row.trigram for row in db_session.query(SearchTrigram)) == ["afe", "caf"]
+
+def test_trigrams_fold_case_and_accents_like_the_mysql_collation():
+    assert search_service.trigrams("CAFÉ") == search_service.trigrams("cafe") == {"caf", "afe"}
+    assert search_service.trigrams("Straße") == search_service.trigrams("STRASSE")
+
+def test_name_filter_prefilter_keeps_accented_rows(db_session: Session):
+    created_item = item_service.create_item(db_session, ItemCreate(name="Café crème", price=5.0))
+    # SQLite's LIKE is accent sensitive, so check the candidates handed to LIKE, which is not on MySQL
+    candidates = search_service.candidate_ids(item_service.SEARCH_ENTITY, "CAFE CREME")
+    assert db_session.scalars(candidates).all() == [created_item.id]
@@ -1,56 +1,20 @@
+import json
+
 from fastapi.testclient import TestClient
-from main import app
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from base import Base
-from database import get_db
-import pytest
-
-# Setup an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base.metadata.create_all(bind=engine)
-
-
-@pytest.fixture(scope="function")
-def db_session():
-    connection = engine.connect()
-    transaction = connection.begin()
-    db = TestingSessionLocal(bind=connection)
-    yield db
-    db.close()
-    transaction.rollback()
-    connection.close()
-
-
-@pytest.fixture(scope="function")
-def client(db_session):
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            db_session.close()
-
-    app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as c:
-        yield c
-
-
-def test_create_item(client: TestClient):
-    response = client.post(
-        "/api/v1/items",
-        json={
-            "name": "Test Item",
-            "description": "A test item description",
-            "price": 10.0,
-            "tax": 1.0,
-        },
-    )
+from config import settings
+
+
+def test_create_item(client: TestClient, query_budget):
+    with query_budget(3):
+        response = client.post(
+            "/api/v1/items",
+            json={
+                "name": "Test Item",
+                "description": "A test item description",
+                "price": 10.0,
+                "tax": 1.0,
+            },
+        )
     assert response.status_code == 201
     data = response.json()
     assert data["name"] == "Test Item"
@@ -60,7 +24,7 @@ def test_create_item(client: TestClient):
     assert "id" in data
 
 
-def test_read_items(client: TestClient):
+def test_read_items(client: TestClient, query_budget):
     client.post(
         "/api/v1/items",
         json={"name": "Item 1", "price": 10.0},
@@ -70,7 +34,8 @@ def test_read_items(client: TestClient):
         json={"name": "Item 2", "price": 20.0},
     )
 
-    response = client.get("/api/v1/items")
+    with query_budget(1):
+        response = client.get("/api/v1/items")
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 2
@@ -78,14 +43,15 @@ def test_read_items(client: TestClient):
     assert data[1]["name"] == "Item 2"
 
 
-def test_read_single_item(client: TestClient):
+def test_read_single_item(client: TestClient, query_budget):
     post_response = client.post(
         "/api/v1/items",
         json={"name": "Single Item", "price": 15.0},
     )
     item_id = post_response.json()["id"]
 
-    get_response = client.get(f"/api/v1/items/{item_id}")
+    with query_budget(1):
+        get_response = client.get(f"/api/v1/items/{item_id}")
     assert get_response.status_code == 200
     data = get_response.json()
     assert data["name"] == "Single Item"
@@ -98,17 +64,18 @@ def test_read_nonexistent_item(client: TestClient):
     assert response.json() == {"detail": "Item not found"}
 
 
-def test_update_item(client: TestClient):
+def test_update_item(client: TestClient, query_budget):
     post_response = client.post(
         "/api/v1/items",
         json={"name": "Old Name", "price": 5.0},
     )
     item_id = post_response.json()["id"]
 
-    update_response = client.put(
-        f"/api/v1/items/{item_id}",
-        json={"name": "New Name", "price": 7.5},
-    )
+    with query_budget(5):
+        update_response = client.put(
+            f"/api/v1/items/{item_id}",
+            json={"name": "New Name", "price": 7.5},
+        )
     assert update_response.status_code == 200
     data = update_response.json()
     assert data["name"] == "New Name"
@@ -125,14 +92,15 @@ def test_update_nonexistent_item(client: TestClient):
     assert response.json() == {"detail": "Item not found"}
 
 
-def test_delete_item(client: TestClient):
+def test_delete_item(client: TestClient, query_budget):
     post_response = client.post(
         "/api/v1/items",
         json={"name": "Item to Delete", "price": 25.0},
     )
     item_id = post_response.json()["id"]
 
-    delete_response = client.delete(f"/api/v1/items/{item_id}")
+    with query_budget(3):
+        delete_response = client.delete(f"/api/v1/items/{item_id}")
     assert delete_response.status_code == 204
 
     get_response = client.get(f"/api/v1/items/{item_id}")
@@ -142,4 +110,138 @@ def test_delete_item(client: TestClient):
 def test_delete_nonexistent_item(client: TestClient):
     response = client.delete("/api/v1/items/nonexistent_id")
     assert response.status_code == 404
-    assert response.json() == {"detail": "Item not found"}
\ No newline at end of file
+    assert response.json() == {"detail": "Item not found"}
+
+def test_read_items_with_cursor(client: TestClient, query_budget):
+    for i in range(3):
+        client.post("/api/v1/items", json={"name": f"Item {i}", "price": 10.0})
+
+    with query_budget(1):
+        first_page = client.get("/api/v1/items", params={"cursor": "", "limit": 2})
+    assert first_page.status_code == 200
+    assert [item["name"] for item in first_page.json()] == ["Item 0", "Item 1"]
+    next_cursor = first_page.headers["X-Next-Cursor"]
+
+    second_page = client.get("/api/v1/items", params={"cursor": next_cursor, "limit": 2})
+    assert [item["name"] for item in second_page.json()] == ["Item 2"]
+    assert "X-Next-Cursor" not in second_page.headers
+
+
+def test_read_items_with_invalid_cursor(client: TestClient):
+    response = client.get("/api/v1/items", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_batch_create_items(client: TestClient, query_budget):
+    with query_budget(2):
+        response = client.post(
+            "/api/v1/items:batch",
+            json=[{"name": "Item 1", "price": 10.0}, {"name": "Missing price"}, {"name": "Item 2", "price": 20.0}],
+        )
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == [201, 422, 201]
+    assert results[1]["id"] is None
+
+    data = client.get("/api/v1/items").json()
+    assert sorted(item["id"] for item in data) == sorted([results[0]["id"], results[2]["id"]])
+    with query_budget(1):
+        found = client.get("/api/v1/items", params={"name": "Item"}).json()
+    assert sorted(item["name"] for item in found) == ["Item 1", "Item 2"]
+
+
+def test_batch_update_items(client: TestClient, query_budget):
+    item_id = client.post("/api/v1/items", json={"name": "Old Name", "price": 5.0}).json()["id"]
+
+    with query_budget(4):
+        response = client.patch(
+            "/api/v1/items:batch",
+            json=[{"id": item_id, "name": "New Name"}, {"id": "nonexistent_id", "price": 1.0}],
+        )
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == [200, 404]
+
+    data = client.get(f"/api/v1/items/{item_id}").json()
+    assert data["name"] == "New Name"
+    assert data["price"] == 5.0
+    assert [item["id"] for item in client.get("/api/v1/items", params={"name": "New"}).json()] == [item_id]
+
+
+def test_batch_update_items_reports_repeated_ids(client: TestClient):
+    item_id = client.post("/api/v1/items", json={"name": "Old Name", "price": 5.0}).json()["id"]
+
+    response = client.patch(
+        "/api/v1/items:batch",
+        json=[{"id": item_id, "name": "New Name"}, {"id": item_id, "name": "New Name"}, {"id": item_id, "price": 9.0}],
+    )
+    assert response.status_code == 200
+    assert [(result["status"], result["id"]) for result in response.json()] == [(200, item_id), (409, item_id), (409, item_id)]
+
+    data = client.get(f"/api/v1/items/{item_id}").json()
+    assert (data["name"], data["price"]) == ("New Name", 5.0)
+    assert [item["id"] for item in client.get("/api/v1/items", params={"name": "New"}).json()] == [item_id]
+
+
+def test_batch_update_and_delete_accept_any_spelling_of_a_uuid(client: TestClient):
+    item_id = client.post("/api/v1/items", json={"name": "Old Name", "price": 5.0}).json()["id"]
+    upper, braced = item_id.upper(), f"{{{item_id}}}"
+
+    response = client.patch("/api/v1/items:batch", json=[{"id": upper, "name": "New Name"}, {"id": braced, "price": 9.0}])
+    assert [(result["status"], result["id"]) for result in response.json()] == [(200, upper), (409, braced)]
+    assert client.get(f"/api/v1/items/{item_id}").json()["name"] == "New Name"
+
+    response = client.request("DELETE", "/api/v1/items:batch", json=[braced])
+    assert [(result["status"], result["id"]) for result in response.json()] == [(204, braced)]
+    assert client.get(f"/api/v1/items/{item_id}").status_code == 404
+
+
+def test_batch_delete_items(client: TestClient, query_budget):
+    item_id = client.post("/api/v1/items", json={"name": "Item to Delete", "price": 25.0}).json()["id"]
+
+    with query_budget(3):
+        response = client.request("DELETE", "/api/v1/items:batch", json=[item_id, "nonexistent_id"])
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == [204, 404]
+    assert client.get(f"/api/v1/items/{item_id}").status_code == 404
+
+
+def test_export_items(client: TestClient, query_budget):
+    for name in ("Red chair", "Blue chair", "Red table"):
+        client.post("/api/v1/items", json={"name": name, "price": 10.0})
+
+    with query_budget(1):
+        response = client.get("/api/v1/items/export", params={"name": "chair"})
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["Red chair", "Blue chair"]
+
+    with query_budget(1):
+        response = client.get("/api/v1/items/export", params={"format": "csv"})
+    assert response.text.splitlines()[0] == "name,description,price,tax,id,created_at,updated_at"
+    assert len(response.text.splitlines()) == 4
+
+
+def test_import_items(client: TestClient, query_budget):
+    body = "\n".join([
+        json.dumps({"name": "Imported chair", "price": 10.0}),
+        "{not json",
+        json.dumps({"name": "No price"}),
+        "",
+        json.dumps({"name": "Imported table", "price": 20.0, "tax": 2.0}),
+    ])
+    with query_budget(2):
+        response = client.post("/api/v1/items:import", content=body)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 2)
+    assert [(error["index"], error["status"]) for error in report["errors"]] == [(1, 422), (2, 422)]
+    assert report["errors"][1]["detail"][0]["loc"] == ["price"]
+
+    found = client.get("/api/v1/items", params={"name": "Imported"}).json()
+    assert sorted(item["name"] for item in found) == ["Imported chair", "Imported table"]
+
+
+def test_import_items_with_oversized_content_length_is_rejected(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "import_max_bytes", 16)
+    response = client.post("/api/v1/items:import", content=json.dumps({"name": "Imported chair", "price": 10.0}))
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Request body exceeds 16 bytes"
@@ -0,0 +1,60 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+import pytest
+
+from config import settings
+from main import app
+from metrics import Histogram, PoolMetrics, instrumented_pool_class
+
+
+def test_histogram_is_cumulative():
+    histogram = Histogram([0.1, 1])
+    for value in [0.05, 0.1, 0.5, 3]:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 2, "1": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == pytest.approx(3.65)
+
+
+def test_pool_metrics(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented_pool_class(QueuePool, metrics),
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    metrics.attach(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("select 1"))
+        stats = metrics.stats()
+        assert (stats["size"], stats["checked_out"], stats["connects"]) == (1, 1, 1)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    stats = metrics.stats()
+    assert stats["checked_out"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_time_seconds"]["count"] == 2
+
+    # Disposing recreates the pool; the instrumentation carries over
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert metrics.stats()["connects"] == 2
+    assert metrics.stats()["wait_time_seconds"]["count"] == 3
+
+
+def test_internal_stats_endpoint(monkeypatch):
+    with TestClient(app) as client:
+        assert client.get("/internal/stats").status_code == 404
+        monkeypatch.setattr(settings, "internal_token", "s3cret")
+        assert client.get("/internal/stats").status_code == 401
+        assert client.get("/internal/stats", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        data = client.get("/internal/stats", headers={"Authorization": "Bearer s3cret"}).json()
+    assert "primary" in data["db_pools"]
+    assert set(data["db_pools"]["primary"]) >= {"checked_out", "overflow", "timeouts", "connect_errors", "wait_time_seconds"}
+    assert "hits" in data["principal_cache"]
+    assert "in_flight" in data["password_hash_pool"]
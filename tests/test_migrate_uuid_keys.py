@@ -0,0 +1,57 @@
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from base import Base
+from migrate_uuid_keys import migrate, pending_steps
+from models import ItemCreate
+from services import blog_post_service, item_service
+
+USER_ID, CATEGORY_ID, TAG_ID, POST_ID = (str(uuid.uuid4()) for _ in range(4))
+
+
+def legacy_database(tmp_path):
+    """A database whose keys were written as 36-character strings."""
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (?, 'ann', 'ann@example.com', 'x', 1)", (USER_ID,))
+        connection.exec_driver_sql("INSERT INTO categories (id, name) VALUES (?, 'News')", (CATEGORY_ID,))
+        connection.exec_driver_sql("INSERT INTO tags (id, name) VALUES (?, 'python')", (TAG_ID,))
+        connection.exec_driver_sql(
+            "INSERT INTO blog_posts (id, title, content, author_id, category_id, published) VALUES (?, 'Old post', 'Body', ?, ?, 1)",
+            (POST_ID, USER_ID, CATEGORY_ID),
+        )
+        connection.exec_driver_sql("INSERT INTO blog_post_tags (blog_post_id, tag_id) VALUES (?, ?)", (POST_ID, TAG_ID))
+        connection.exec_driver_sql("INSERT INTO items (id, name, price) VALUES (?, 'Old lamp', 5)", (str(uuid.uuid4()),))
+        connection.exec_driver_sql("INSERT INTO search_trigrams (entity, trigram, entity_id) SELECT 'items', 'lam', id FROM items")
+    return engine
+
+
+def test_migrate_converts_keys_in_place(tmp_path):
+    engine = legacy_database(tmp_path)
+    with Session(engine) as db:
+        assert blog_post_service.get_blog_post(db, POST_ID) is None
+
+    counts = migrate(engine)
+    assert counts["blog_posts"] == 3
+    assert counts["blog_post_tags"] == 2
+    assert counts["search_trigrams"] == 1
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT DISTINCT length(id) FROM blog_posts").scalars().all() == [16]
+    with Session(engine) as db:
+        post = blog_post_service.get_blog_post(db, POST_ID)
+        assert (post.author_id, post.category_id, post.tag_ids) == (USER_ID, CATEGORY_ID, [TAG_ID])
+        assert [item.name for item in item_service.get_items(db, name="lam")] == ["Old lamp"]
+        item_service.create_item(db, ItemCreate(name="New lamp", price=7))
+
+    assert set(migrate(engine).values()) == {0}
+
+
+def test_mysql_conversion_resumes_from_the_column_type():
+    assert pending_steps("VARCHAR(36)") == ("varbinary", "rewrite", "binary")
+    # Interrupted after the first ALTER: values may be half rewritten
+    assert pending_steps("VARBINARY(36)") == ("rewrite", "binary")
+    assert pending_steps("BINARY(16)") == ()
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from base import Base
+from cache import PrincipalCache, principal_cache
+from models import User, UserInDB, UserUpdate
+from services import user_service
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_principal(username: str) -> UserInDB:
+    now = datetime.now()
+    return UserInDB(id=f"id-{username}", username=username, email=f"{username}@example.com", hashed_password="x", created_at=now, updated_at=now)
+
+# Setup an in-memory SQLite database for testing
+@pytest.fixture(scope="function")
+def db_session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        principal_cache.clear()
+
+def test_hit_miss_and_expiry():
+    clock = FakeClock()
+    cache = PrincipalCache(max_size=10, ttl_seconds=30, clock=clock)
+    assert cache.get("alice") is None
+    cache.put("alice", make_principal("alice"))
+    assert cache.get("alice").username == "alice"
+
+    clock.now = 31
+    assert cache.get("alice") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2}
+
+def test_evicts_least_recently_used():
+    cache = PrincipalCache(max_size=2, ttl_seconds=30)
+    cache.put("alice", make_principal("alice"))
+    cache.put("bob", make_principal("bob"))
+    cache.get("alice")
+    cache.put("carol", make_principal("carol"))
+
+    assert cache.get("bob") is None
+    assert cache.get("alice") is not None
+    assert cache.get("carol") is not None
+
+def test_put_after_invalidation_is_dropped():
+    cache = PrincipalCache(max_size=10, ttl_seconds=30)
+    version = cache.version
+    cache.invalidate("alice")
+    cache.put("alice", make_principal("alice"), version=version)
+    assert cache.get("alice") is None
+
+def test_user_updates_and_deletes_invalidate(db_session: Session):
+    db_session.add(User(id="user-1", username="alice", email="alice@example.com", hashed_password="x"))
+    db_session.commit()
+
+    principal_cache.put("alice", make_principal("alice"))
+    user_service.update_user(db_session, "user-1", UserUpdate(is_active=False))
+    assert principal_cache.get("alice") is None
+
+    principal_cache.put("alice", make_principal("alice"))
+    user_service.update_password_hash(db_session, "user-1", "rehashed")
+    assert principal_cache.get("alice") is None
+
+    principal_cache.put("alice", make_principal("alice"))
+    user_service.delete_user(db_session, "user-1")
+    assert principal_cache.get("alice") is None
@@ -0,0 +1,68 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from main import app
+from metrics import Histogram, MetricsMiddleware, RequestMetrics, instrument_queries
+
+
+def test_histogram_renders_prometheus_lines():
+    histogram = Histogram([0.1, 1])
+    histogram.observe(0.5)
+    assert histogram.render("latency", 'route="/a",') == [
+        'latency_bucket{route="/a",le="0.1"} 0',
+        'latency_bucket{route="/a",le="1"} 1',
+        'latency_bucket{route="/a",le="+Inf"} 1',
+        'latency_sum{route="/a"} 0.5',
+        'latency_count{route="/a"} 1',
+    ]
+
+
+def test_middleware_attributes_queries_to_routes():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    instrument_queries(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    registry = RequestMetrics()
+    small_app = FastAPI()
+    small_app.add_middleware(MetricsMiddleware, registry=registry)
+
+    def get_session():
+        with SessionLocal() as db:
+            yield db
+
+    @small_app.get("/things/{thing_id}")
+    def read_thing(thing_id: int, db: Session = Depends(get_session)):
+        for _ in range(thing_id):
+            db.execute(text("select 1"))
+        return {}
+
+    with TestClient(small_app) as client:
+        client.get("/things/3")
+        client.get("/things/1")
+        client.get("/nowhere")
+
+    things = registry.routes[("GET", "/things/{thing_id}")]
+    assert things.statuses == {200: 2}
+    assert things.queries.snapshot()["sum"] == 4
+    assert things.latency.snapshot()["count"] == 2
+    assert registry.routes[("GET", "unmatched")].statuses == {404: 1}
+
+    lines = registry.render()
+    assert 'http_requests_total{method="GET",route="/things/{thing_id}",status="200"} 2' in lines
+    assert 'http_request_db_queries_count{method="GET",route="/things/{thing_id}"} 2' in lines
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+    with TestClient(app) as client:
+        client.get("/")
+        assert client.get("/metrics").status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+    assert 'db_pool_checked_out{pool="primary"}' in response.text
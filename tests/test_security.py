@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+import security
+from security import PasswordHashPool
+
+def test_pool_rejects_when_saturated():
+    pool = PasswordHashPool(workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as excinfo:
+            await pool.run(lambda: None)
+        assert excinfo.value.status_code == 503
+        assert pool.stats()["in_flight"] == 1
+        release.set()
+        await busy
+
+    asyncio.run(scenario())
+    assert pool.stats() == {"workers": 1, "in_flight": 0, "queued": 0, "completed": 1, "rejected": 1}
+
+def test_outdated_hash_is_replaced(monkeypatch):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret")
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=5, bcrypt__min_rounds=5, bcrypt__max_rounds=5)
+    monkeypatch.setattr(security, "pwd_context", context)
+
+    verified, new_hash = asyncio.run(security.verify_and_update_password("secret", old_hash))
+    assert verified
+    assert new_hash.startswith("$2b$05$")
+
+    verified, new_hash = asyncio.run(security.verify_and_update_password("secret", new_hash))
+    assert verified
+    assert new_hash is None
+
+    verified, _ = asyncio.run(security.verify_and_update_password("wrong", old_hash))
+    assert not verified
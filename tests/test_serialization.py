@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+
+from models import BlogPost, BlogPostRead, BlogPostTag, Category, Image, Item, ItemInDB, Tag, User
+from pagination import NEXT_CURSOR_HEADER
+from serialization import list_adapter, list_response
+from services import blog_post_service
+
+CREATED_AT = datetime(2024, 5, 17, 9, 30, 0)
+UPDATED_AT = datetime(2024, 5, 17, 9, 30, 0, 123456)
+
+
+def make_items():
+    return [
+        Item(id="1", name="Plain", description=None, price=10, tax=None, created_at=CREATED_AT, updated_at=UPDATED_AT),
+        Item(id="2", name="Ünïcødé — 東京 \"quoted\" \\ back\nslash\t\x01", description="emoji 🎉", price=19.99, tax=0.1, created_at=UPDATED_AT, updated_at=CREATED_AT),
+        Item(id="3", name="", description="</script>", price=1234567.5, tax=0, created_at=CREATED_AT, updated_at=CREATED_AT),
+    ]
+
+
+def make_blog_post():
+    author = User(id="u1", username="writer", email="writer@example.com", full_name=None)
+    category = Category(id="c1", name="Café", description=None, created_at=CREATED_AT, updated_at=UPDATED_AT)
+    tags = [Tag(id=f"t{i}", name=f"tag {i}", created_at=CREATED_AT, updated_at=UPDATED_AT) for i in range(2)]
+    image = Image(id="i1", url="/static/images/a.png", alt_text="A", content_hash="ab", content_type="image/png", size=3, created_at=CREATED_AT, updated_at=UPDATED_AT)
+    return BlogPost(
+        id="p1", title="Title", content="Body ✓", author_id="u1", category_id="c1", published=True, published_at=UPDATED_AT,
+        created_at=CREATED_AT, updated_at=UPDATED_AT, author=author, category=category,
+        blog_post_tags=[BlogPostTag(tag_id=tag.id, tag=tag) for tag in tags], images=[image],
+    )
+
+
+# The same rows through FastAPI's response_model path and through list_response
+app = FastAPI()
+
+
+@app.get("/items/model", response_model=List[ItemInDB])
+def items_through_response_model(response: Response):
+    response.headers[NEXT_CURSOR_HEADER] = "next"
+    return make_items()
+
+
+@app.get("/items/fast", response_model=List[ItemInDB])
+def items_through_list_response(response: Response):
+    response.headers[NEXT_CURSOR_HEADER] = "next"
+    return list_response(ItemInDB, make_items(), response)
+
+
+@app.get("/blog_posts/model", response_model=List[BlogPostRead], response_model_exclude_unset=True)
+def blog_posts_through_response_model(expand: str = ""):
+    return [blog_post_service.to_read_model(make_blog_post(), set(expand.split(",")))]
+
+
+@app.get("/blog_posts/fast", response_model=List[BlogPostRead], response_model_exclude_unset=True)
+def blog_posts_through_list_response(expand: str = ""):
+    return list_response(BlogPostRead, [blog_post_service.read_fields(make_blog_post(), set(expand.split(",")))], exclude_unset=True)
+
+
+def test_list_response_matches_response_model_output():
+    client = TestClient(app)
+    expected, actual = client.get("/items/model"), client.get("/items/fast")
+    assert actual.content == expected.content
+    assert actual.headers["content-type"] == expected.headers["content-type"]
+    assert actual.headers[NEXT_CURSOR_HEADER] == "next"
+
+    for expand in ("", "author", "category,tags", "author,category,tags,images"):
+        expected = client.get("/blog_posts/model", params={"expand": expand})
+        assert client.get("/blog_posts/fast", params={"expand": expand}).content == expected.content
+    assert set(client.get("/blog_posts/fast", params={"expand": "tags"}).json()[0]) == set(BlogPostRead.model_fields) - {"author", "category", "images"}
+
+
+def test_floats_in_exponent_form_use_the_short_spelling():
+    # The stdlib encoder writes 1e-07 and 1e+16; orjson and pydantic-core write 1e-7 and 1e16.
+    # The app answers in the short form everywhere, through list_response and ORJSONResponse alike.
+    items = [Item(id="1", name="Tiny", price=1e16, tax=1e-07, created_at=CREATED_AT, updated_at=CREATED_AT)]
+    exponent_app = FastAPI(default_response_class=ORJSONResponse)
+    exponent_app.get("/model", response_model=List[ItemInDB])(lambda: items)
+    exponent_app.get("/fast", response_model=List[ItemInDB])(lambda: list_response(ItemInDB, items))
+    client = TestClient(exponent_app)
+    expected, actual = client.get("/model"), client.get("/fast")
+    assert actual.content == expected.content
+    assert b'"price":1e16,"tax":1e-7' in actual.content
+    assert actual.json()[0]["tax"] == 1e-07
+
+
+def test_list_adapter_is_reused():
+    assert list_adapter(ItemInDB) is list_adapter(ItemInDB)
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+from base import Base
+from db_types import new_id
+from migrate_image_storage import add_image_columns
+from models import Image as DBImage
+from services import image_service
+from storage import LocalStorageBackend, S3StorageBackend, StorageBackend, sharded_key
+from test_images_router import PNG_BYTES, client, make_png, stored_files, upload
+
+
+class FakeS3Client:
+    """Local stand-in for the boto3 S3 client calls the backend uses."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+
+    def upload_file(self, filename, bucket, key):
+        os.makedirs(os.path.dirname(self._path(bucket, key)), exist_ok=True)
+        shutil.copyfile(filename, self._path(bucket, key))
+
+    def download_file(self, bucket, key, filename):
+        shutil.copyfile(self._path(bucket, key), filename)
+
+    def delete_object(self, Bucket, Key):
+        if os.path.exists(self._path(Bucket, Key)):
+            os.remove(self._path(Bucket, Key))
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://objects.example.com/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+@pytest.fixture
+def s3_storage(tmp_path, monkeypatch):
+    backend = S3StorageBackend(FakeS3Client(str(tmp_path / "s3")), "images", public_url="https://cdn.example.com")
+    monkeypatch.setattr(image_service, "storage", backend)
+    return backend
+
+
+def test_sharded_key():
+    assert sharded_key("abcdef.png") == "ab/cd/abcdef.png"
+    assert sharded_key("abcdef-128.webp", prefix="variants/") == "variants/ab/cd/abcdef-128.webp"
+
+
+def test_backends_must_implement_the_storage_operations():
+    class UrlOnlyBackend(StorageBackend):
+        def url(self, key: str) -> str:
+            return key
+
+    with pytest.raises(TypeError):
+        UrlOnlyBackend()
+
+
+def test_local_backend_moves_files_into_place(tmp_path):
+    backend = LocalStorageBackend(str(tmp_path / "store"))
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"data")
+
+    asyncio.run(backend.save("ab/cd/abcd.png", str(source)))
+    assert not source.exists()
+    assert stored_files(tmp_path / "store") == ["ab/cd/abcd.png"]
+    assert backend.url("ab/cd/abcd.png") == f"/{str(tmp_path).strip('/')}/store/ab/cd/abcd.png"
+
+    asyncio.run(backend.delete("ab/cd/abcd.png"))
+    asyncio.run(backend.delete("ab/cd/abcd.png"))
+    assert stored_files(tmp_path / "store") == []
+
+
+def test_s3_backend_round_trip(tmp_path, s3_storage):
+    source = tmp_path / "upload.part"
+    source.write_bytes(b"data")
+    asyncio.run(s3_storage.save("ab/cd/abcd.png", str(source)))
+    assert not source.exists()
+    assert s3_storage.url("ab/cd/abcd.png") == "https://cdn.example.com/ab/cd/abcd.png"
+
+    async def read_back():
+        async with s3_storage.local_file("ab/cd/abcd.png") as path:
+            with open(path, "rb") as copy:
+                return path, copy.read()
+
+    path, content = asyncio.run(read_back())
+    assert content == b"data"
+    assert not os.path.exists(path)
+
+    asyncio.run(s3_storage.delete("ab/cd/abcd.png"))
+    assert stored_files(tmp_path / "s3") == []
+
+
+def test_images_on_s3_are_redirected(client: TestClient, tmp_path, s3_storage):
+    image = upload(client, make_png(800, 400)).json()
+    content_hash = image["content_hash"]
+    key = f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png"
+    assert image["url"] == f"https://cdn.example.com/{key}"
+    assert key in stored_files(tmp_path / "s3" / "images")
+    assert len(stored_files(tmp_path / "s3" / "images" / "variants")) == 3
+
+    response = client.get(f"/api/v1/images/{image['id']}/file", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"].startswith(f"https://objects.example.com/images/{key}")
+
+    assert client.delete(f"/api/v1/images/{image['id']}").status_code == 204
+    assert stored_files(tmp_path / "s3") == []
+
+
+def test_migrate_legacy_files(tmp_path, monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    monkeypatch.setattr(image_service, "storage", LocalStorageBackend(str(tmp_path / "store")))
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "photo.png").write_bytes(b"first")
+    (legacy / "copy.png").write_bytes(b"first")
+    db.add_all([
+        DBImage(id="1", url="/static/images/photo.png", file_path=str(legacy / "photo.png")),
+        DBImage(id="2", url="/static/images/copy.png", file_path=str(legacy / "copy.png")),
+        DBImage(id="3", url="/static/images/gone.png", file_path=str(legacy / "gone.png")),
+    ])
+    db.commit()
+
+    assert asyncio.run(image_service.migrate_legacy_files(db, str(legacy))) == 2
+    content_hash = hashlib.sha256(b"first").hexdigest()
+    assert stored_files(tmp_path / "store") == sorted([f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png", "co/py/copy.png"])
+    assert os.listdir(legacy) == []
+    first = db.get(DBImage, "1")
+    assert (first.file_path, first.content_hash, first.size) == (f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png", content_hash, 5)
+    assert db.get(DBImage, "2").content_hash is None
+    assert asyncio.run(image_service.migrate_legacy_files(db, str(legacy))) == 0
+    db.close()
+
+
+def test_migrate_images_from_before_file_paths(tmp_path, monkeypatch):
+    # The images table as it was before uploads recorded their file: only the public URL
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    ids = [new_id() for _ in range(3)]
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE images (id BINARY(16) PRIMARY KEY, url VARCHAR(1024) NOT NULL, alt_text VARCHAR(512), created_at DATETIME, updated_at DATETIME)"
+        ))
+        connection.execute(text("INSERT INTO images (id, url) VALUES (:id, :url)"), [
+            {"id": uuid.UUID(image_id).bytes, "url": url}
+            for image_id, url in zip(ids, ["/static/images/old.png", "/static/images/notes.txt", "https://cdn.example.com/x.png"])
+        ])
+    Base.metadata.create_all(engine)
+    assert add_image_columns(engine) == ["file_path", "content_hash", "content_type", "size"]
+    assert add_image_columns(engine) == []
+
+    monkeypatch.setattr(image_service, "storage", LocalStorageBackend(str(tmp_path / "store")))
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "old.png").write_bytes(PNG_BYTES)
+    (legacy / "notes.txt").write_bytes(b"plain text")
+    db = sessionmaker(bind=engine)()
+    assert asyncio.run(image_service.migrate_legacy_files(db, str(legacy))) == 2
+
+    content_hash = hashlib.sha256(PNG_BYTES).hexdigest()
+    image = db.get(DBImage, ids[0])
+    assert (image.file_path, image.content_hash, image.content_type, image.size) == (
+        f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.png", content_hash, "image/png", len(PNG_BYTES),
+    )
+    assert db.get(DBImage, ids[1]).content_type == "application/octet-stream"
+    assert db.get(DBImage, ids[2]).file_path is None
+    db.close()
@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+
+
+def test_tag_endpoints(client: TestClient, current_user, query_budget):
+    with query_budget(4):
+        response = client.post("/api/v1/tags", json={"name": "python"})
+    assert response.status_code == 201
+    tag_id = response.json()["id"]
+    client.post("/api/v1/tags", json={"name": "sqlite"})
+
+    with query_budget(0):
+        assert [tag["name"] for tag in client.get("/api/v1/tags").json()] == ["python", "sqlite"]
+    with query_budget(0):
+        assert client.get(f"/api/v1/tags/{tag_id}").json()["name"] == "python"
+    with query_budget(4):
+        assert client.put(f"/api/v1/tags/{tag_id}", json={"name": "fastapi"}).json()["name"] == "fastapi"
+    with query_budget(4):
+        assert client.delete(f"/api/v1/tags/{tag_id}").status_code == 204
+    assert client.get(f"/api/v1/tags/{tag_id}").status_code == 404
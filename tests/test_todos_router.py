@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+
+def create_todo(client: TestClient, title: str, **fields):
+    response = client.post("/api/v1/todos", json={"title": title, **fields})
+    assert response.status_code == 201
+    return response.json()
+
+
+def test_create_todo(client: TestClient, query_budget):
+    with query_budget(3):
+        todo = create_todo(client, "Write tests", description="With query budgets")
+    assert todo["title"] == "Write tests"
+    assert todo["completed"] is False
+
+
+def test_read_todos(client: TestClient, query_budget):
+    for i in range(3):
+        create_todo(client, f"Todo {i}", completed=i == 1)
+
+    with query_budget(1):
+        response = client.get("/api/v1/todos", params={"cursor": "", "limit": 2})
+    assert [todo["title"] for todo in response.json()] == ["Todo 0", "Todo 1"]
+
+    with query_budget(1):
+        response = client.get("/api/v1/todos", params={"completed": True})
+    assert [todo["title"] for todo in response.json()] == ["Todo 1"]
+
+
+def test_read_update_delete_todo(client: TestClient, query_budget):
+    todo_id = create_todo(client, "Old title")["id"]
+
+    with query_budget(1):
+        assert client.get(f"/api/v1/todos/{todo_id}").json()["title"] == "Old title"
+    with query_budget(3):
+        response = client.put(f"/api/v1/todos/{todo_id}", json={"completed": True})
+    assert response.json()["completed"] is True
+    with query_budget(3):
+        assert client.delete(f"/api/v1/todos/{todo_id}").status_code == 204
+    assert client.get(f"/api/v1/todos/{todo_id}").status_code == 404
+
+
+def test_todo_batches(client: TestClient, query_budget):
+    with query_budget(2):
+        response = client.post("/api/v1/todos:batch", json=[{"title": f"Todo {i}"} for i in range(10)])
+    todo_ids = [result["id"] for result in response.json()]
+
+    with query_budget(2):
+        response = client.patch("/api/v1/todos:batch", json=[{"id": todo_id, "completed": True} for todo_id in todo_ids])
+    assert {result["status"] for result in response.json()} == {200}
+
+    with query_budget(3):
+        response = client.request("DELETE", "/api/v1/todos:batch", json=todo_ids)
+    assert {result["status"] for result in response.json()} == {204}
+
+
+def test_export_todos(client: TestClient, query_budget):
+    for i in range(5):
+        create_todo(client, f"Todo {i}", description="Line one\nline, two" if i == 0 else None, completed=i % 2 == 0)
+
+    with query_budget(1):
+        response = client.get("/api/v1/todos/export", params={"completed": True})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="todos.ndjson"'
+    lines = response.text.splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Todo 0", "Todo 2", "Todo 4"]
+    # Each line is encoded like the elements of the list endpoint
+    listed = client.get("/api/v1/todos", params={"completed": True, "cursor": ""}).json()
+    assert [json.loads(line) for line in lines] == listed
+
+    with query_budget(1):
+        response = client.get("/api/v1/todos/export", params={"format": "csv", "title": "Todo"})
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == [f"Todo {i}" for i in range(5)]
+    assert (rows[0]["description"], rows[0]["completed"], rows[1]["description"], rows[1]["completed"]) == ("Line one\nline, two", "true", "", "false")
+
+    assert client.get("/api/v1/todos/export", params={"format": "xml"}).status_code == 422
+
+
+def test_import_todos_csv(client: TestClient, query_budget):
+    body = "title,description,completed\nWater plants,,true\n,Missing title,false\nCall home,Evening,\n"
+    with query_budget(2):
+        response = client.post("/api/v1/todos:import", params={"format": "csv"}, content=body)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["index"] == 1
+
+    todos = {todo["title"]: todo for todo in client.get("/api/v1/todos").json()}
+    assert todos["Water plants"]["completed"] is True
+    assert todos["Water plants"]["description"] is None
+    assert todos["Call home"]["completed"] is False
+    assert [todo["title"] for todo in client.get("/api/v1/todos", params={"title": "plant"}).json()] == ["Water plants"]
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+from uploads import MultipartFileReader
+
+BOUNDARY = "test-boundary"
+HEADERS = Headers({"content-type": f"multipart/form-data; boundary={BOUNDARY}"})
+
+
+def multipart_body(*parts: bytes) -> bytes:
+    return b"".join(f"--{BOUNDARY}\r\n".encode() + part + b"\r\n" for part in parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def read_file(body: bytes, piece_size: int = 7):
+    consumed = []
+
+    async def stream():
+        for start in range(0, len(body), piece_size):
+            consumed.append(start)
+            yield body[start:start + piece_size]
+
+    async def read():
+        reader = MultipartFileReader(HEADERS, stream())
+        await reader.open()
+        data = b"".join([chunk async for chunk in reader.chunks()])
+        return reader, data
+
+    reader, data = asyncio.run(read())
+    return reader, data, len(consumed) * piece_size
+
+
+def test_reads_the_file_field_as_it_arrives():
+    content = bytes(range(256)) * 4
+    body = multipart_body(
+        b'Content-Disposition: form-data; name="alt_text"\r\n\r\nA caption',
+        b'Content-Disposition: form-data; name="file"; filename="photo.png"\r\nContent-Type: image/png\r\n\r\n' + content,
+        b'Content-Disposition: form-data; name="trailing"\r\n\r\n' + b"x" * 4096,
+    )
+    reader, data, consumed = read_file(body)
+    assert (reader.filename, reader.content_type, data) == ("photo.png", "image/png", content)
+    # Reading stops at the end of the file field
+    assert consumed < len(body) - 4096
+
+
+def test_missing_file_field_is_rejected():
+    body = multipart_body(b'Content-Disposition: form-data; name="other"; filename="a.png"\r\n\r\nabc')
+    with pytest.raises(HTTPException) as excinfo:
+        read_file(body)
+    assert excinfo.value.status_code == 422
+
+
+def test_non_multipart_body_is_rejected():
+    with pytest.raises(HTTPException) as excinfo:
+        MultipartFileReader(Headers({"content-type": "application/json"}), iter([]))
+    assert excinfo.value.status_code == 400
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+import pytest
+
+from cache import principal_cache
+
+
+@pytest.fixture
+def auth_headers(client: TestClient):
+    principal_cache.clear()
+    client.post("/api/v1/users", json={"username": "alice", "email": "alice@example.com", "password": "secret"})
+    token = client.post("/api/v1/users/login", data={"username": "alice", "password": "secret"}).json()["access_token"]
+    yield {"Authorization": f"Bearer {token}"}
+    principal_cache.clear()
+
+
+def test_register_and_login(client: TestClient, query_budget):
+    with query_budget(4):
+        response = client.post("/api/v1/users", json={"username": "bob", "email": "bob@example.com", "password": "secret"})
+    assert response.status_code == 201
+
+    with query_budget(1):
+        response = client.post("/api/v1/users/login", data={"username": "bob", "password": "secret"})
+    assert response.json()["token_type"] == "bearer"
+
+
+def test_user_endpoints(client: TestClient, auth_headers, query_budget):
+    with query_budget(2):
+        users = client.get("/api/v1/users", headers=auth_headers).json()
+    assert [user["username"] for user in users] == ["alice"]
+    user_id = users[0]["id"]
+
+    with query_budget(1):
+        assert client.get(f"/api/v1/users/{user_id}", headers=auth_headers).json()["username"] == "alice"
+    with query_budget(3):
+        response = client.put(f"/api/v1/users/{user_id}", json={"full_name": "Alice Liddell"}, headers=auth_headers)
+    assert response.json()["full_name"] == "Alice Liddell"
+    with query_budget(4):
+        assert client.delete(f"/api/v1/users/{user_id}", headers=auth_headers).status_code == 204
@@ -0,0 +1,134 @@
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+
+try:
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart, which FastAPI's File() parameters need as well
+    MultipartParser = None
+
+# Bytes a multipart body may carry besides the file itself: boundaries, part headers and small form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Longest header block accepted for a single part
+MAX_PART_HEADER_BYTES = 16 * 1024
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+def check_content_length(headers: Headers, max_bytes: int):
+    """Rejects a body whose declared length already exceeds the limit, before any of it is read."""
+    try:
+        content_length = int(headers.get("content-length", ""))
+    except ValueError:
+        return
+    if content_length > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Request body exceeds {max_bytes} bytes")
+
+class MultipartFileReader:
+    """Reads one file field of a multipart/form-data body while the body arrives.
+
+    Unlike a ``File()`` parameter, which only runs once Starlette has spooled the
+    whole body to a temporary file, the file's bytes are handed over chunk by
+    chunk, so the caller can hash, write and size-check them as they come in.
+    Other fields are skipped.
+    """
+
+    def __init__(self, headers: Headers, stream: AsyncIterator[bytes], field_name: str = "file"):
+        if MultipartParser is None:
+            raise RuntimeError("python-multipart must be installed to read multipart uploads")
+        content_type, options = parse_options_header(headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in options:
+            raise _bad_request("Expected a multipart/form-data body")
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._stream = stream.__aiter__()
+        self._parser = MultipartParser(options[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+        self._headers: List[tuple] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._header_bytes = 0
+        self._in_file = False
+        self._file_found = False
+        self._file_finished = False
+        self._pending: List[bytes] = []
+
+    def _on_part_begin(self):
+        self._headers, self._header_bytes = [], 0
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+        self._count_header_bytes(end - start)
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+        self._count_header_bytes(end - start)
+
+    def _count_header_bytes(self, count: int):
+        self._header_bytes += count
+        if self._header_bytes > MAX_PART_HEADER_BYTES:
+            raise _bad_request("Multipart part headers are too long")
+
+    def _on_header_end(self):
+        self._headers.append((self._header_name.lower(), self._header_value))
+        self._header_name, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        headers = dict(self._headers)
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        if self._file_found or options.get(b"name", b"").decode("latin-1") != self.field_name or b"filename" not in options:
+            return
+        self._in_file = self._file_found = True
+        self.filename = options[b"filename"].decode("utf-8", errors="replace")
+        if b"content-type" in headers:
+            self.content_type = headers[b"content-type"].decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_file:
+            self._pending.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._file_finished = True
+
+    async def _feed(self) -> bool:
+        """Passes the next piece of the body to the parser; False once the body has ended."""
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._parser.finalize()
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise _bad_request(f"Invalid multipart body: {e}")
+        return True
+
+    async def open(self):
+        """Reads up to the start of the file field, setting filename and content_type."""
+        while not self._file_found:
+            if not await self._feed():
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Missing file field '{self.field_name}'")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The file's bytes in the pieces they arrived in; call open() first."""
+        while True:
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending = []
+                yield data
+            if self._file_finished:
+                return
+            if not await self._feed():
+                raise _bad_request("Multipart body ended inside the file")